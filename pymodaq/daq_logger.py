@@ -562,6 +562,7 @@ class DAQ_Logging(QObject):
         self.modules_manager = modules_manager
 
         self.logger = logger
+        self.h5arrays = OrderedDict([])  # enlargeable arrays (and their buffers) kept from one data to the other
         if isinstance(self.logger, H5Saver):
             self.logger_type = "h5saver"
         elif isinstance(self.logger, DbLoggerGUI):
@@ -605,9 +606,14 @@ class DAQ_Logging(QObject):
         try:
             det_name = datas['name']
             if self.logger_type == 'h5saver':
+                buffer_size = self.logger.settings.child(('buffer_size')).value()
                 det_group = self.logger.get_group_by_title(self.logger.raw_group, det_name)
-                time_array = self.logger.get_node(det_group, 'Logger_time_axis')
-                time_array.append(np.array([datas['acq_time_s']]))
+                if det_name not in self.h5arrays:
+                    self.h5arrays[det_name] = OrderedDict([])
+                    time_array = self.logger.get_node(det_group, 'Logger_time_axis')
+                    self.logger.set_array_buffer(time_array, buffer_size)
+                    self.h5arrays[det_name]['time'] = time_array
+                self.h5arrays[det_name]['time'].append(np.array([datas['acq_time_s']]))
 
                 data_types = ['data0D', 'data1D']
                 if self.logger.settings.child(('save_2D')).value():
@@ -620,13 +626,19 @@ class DAQ_Logging(QObject):
                         else:
                             data_group = self.logger.get_node(det_group, utils.capitalize(data_type))
                         for ind_channel, channel in enumerate(datas[data_type]):
-                            channel_group = self.logger.get_group_by_title(data_group, channel)
-                            if channel_group is None:
-                                channel_group = self.logger.add_CH_group(data_group, title=channel)
-                                data_array = self.logger.add_data(channel_group, datas[data_type][channel],
-                                                                   scan_type='scan1D', enlargeable=True)
+                            if (data_type, channel) in self.h5arrays[det_name]:
+                                data_array = self.h5arrays[det_name][(data_type, channel)]
                             else:
-                                data_array = self.logger.get_node(channel_group, 'Data')
+                                channel_group = self.logger.get_group_by_title(data_group, channel)
+                                if channel_group is None:
+                                    channel_group = self.logger.add_CH_group(data_group, title=channel)
+                                    data_array = self.logger.add_data(channel_group, datas[data_type][channel],
+                                                                      scan_type='scan1D', enlargeable=True,
+                                                                      buffer_size=buffer_size)
+                                else:
+                                    data_array = self.logger.get_node(channel_group, 'Data')
+                                    self.logger.set_array_buffer(data_array, buffer_size)
+                                self.h5arrays[det_name][(data_type, channel)] = data_array
                             if data_type == 'data0D':
                                 data_array.append(np.array([datas[data_type][channel]['data']]))
                             else:
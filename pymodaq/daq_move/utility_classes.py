@@ -390,6 +390,9 @@ class DAQ_Move_TCP_server(DAQ_Move_base, TCPServer):
             data = custom_tree.parameter_to_xml_string(param)
             actuator_socket.send_string(data)
 
+        elif param.name() in ['codec', 'delta', 'shared_memory', 'shared_memory_slots']:
+            self.send_codec_request()
+
     def ini_stage(self, controller=None):
         """
             | Initialisation procedure of the detector updating the status dictionnary.
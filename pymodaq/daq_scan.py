@@ -7,10 +7,11 @@ Contains all objects related to the DAQ_Scan module, to do automated scans, savi
 """
 
 import sys
-from collections import OrderedDict
+from collections import OrderedDict, deque
 import numpy as np
 from pathlib import Path
 import os
+import time
 
 from pyqtgraph.dockarea import Dock
 from pyqtgraph.parametertree import Parameter, ParameterTree
@@ -28,7 +29,7 @@ from pymodaq.daq_utils.plotting.qled import QLED
 from pymodaq.daq_utils import daq_utils as utils
 from pymodaq.daq_utils import gui_utils as gutils
 from pymodaq.daq_utils.managers.modules_manager import ModulesManager
-from pymodaq.daq_utils.h5modules import H5Saver
+from pymodaq.daq_utils.h5modules import H5Saver, H5Writer, H5WriterError
 
 logger = utils.set_logger(utils.get_module_name(__file__))
 
@@ -68,7 +69,19 @@ class DAQ_Scan(QObject):
         ]},
         {'title': 'Scan options', 'name': 'scan_options', 'type': 'group', 'children': [
             {'title': 'Naverage:', 'name': 'scan_average', 'type': 'int', 'value': 1, 'min': 1},
-            {'title': 'Plot from:', 'name': 'plot_from', 'type': 'list'},]},
+            {'title': 'Plot from:', 'name': 'plot_from', 'type': 'list'},
+            {'title': 'Pipelined moves:', 'name': 'pipelined', 'type': 'bool', 'value': False,
+             'tooltip': 'if True, actuators move to the next position as soon as the current one has been acquired, '
+                        'while data are saved and plotted (not used for adaptive scans)'},
+        ]},
+        {'title': 'Saving options:', 'name': 'saving_options', 'type': 'group', 'expanded': False, 'children': [
+            {'title': 'Threaded writing:', 'name': 'threaded_writing', 'type': 'bool', 'value': True,
+             'tooltip': 'if True, data are written in the h5 file by a dedicated thread, not by the scan loop'},
+            {'title': 'Queue size (points):', 'name': 'queue_size', 'type': 'int', 'value': 100, 'min': 1,
+             'tooltip': 'Maximum number of scan points waiting to be written, the scan waits when it is full'},
+            {'title': 'Flush every (points):', 'name': 'flush_points', 'type': 'int', 'value': 50, 'min': 1},
+            {'title': 'Flush every (s):', 'name': 'flush_time', 'type': 'float', 'value': 1., 'min': 0.},
+        ]},
     ]
 
     def __init__(self, dockarea=None, dashboard=None):
@@ -95,10 +108,17 @@ class DAQ_Scan(QObject):
         self.scan_data_1D_average = np.array([])
         self.scan_data_2D = []
         self.scan_data_2D_average = []
-        self.curvilinear_values = []
+        self.curvilinear_values = utils.GrowingBuffer()
         self.ind_scan = 0
         self.ind_average = 0
-        self.scan_positions = []
+        self.scan_positions = utils.GrowingBuffer()
+        # rows of the adaptive scans, as (data0D channels) in 1D and (x, y, data) in 2D
+        self.scan_data_1D_buffer = utils.GrowingBuffer()
+        self.scan_data_2D_buffer = utils.GrowingBuffer()
+        # adaptive scans are redrawn from all the points acquired so far: limit the redraw rate
+        self.display_throttle_1D = gutils.DisplayThrottle(self.display_1D_graph, max_fps=10)
+        self.display_throttle_2D = gutils.DisplayThrottle(self.display_spread_2D_graph, max_fps=10)
+        self.gui_update_durations = deque(maxlen=100)
         self.scan_data_2D_to_save = []
         self.scan_data_1D_to_save = []
         self.plot_1D_ini = False
@@ -227,6 +247,9 @@ class DAQ_Scan(QObject):
         try:
             scan_type = self.scanner.scan_parameters.scan_type
             isadaptive = self.scanner.scan_parameters.scan_subtype == 'Adaptive'
+            # make sure the last points are displayed before grabbing the graphs
+            self.display_throttle_1D.flush()
+            self.display_throttle_2D.flush()
 
             self.h5saver.current_scan_group.attrs['scan_done'] = True
             self.h5saver.init_file(addhoc_file_path=self.h5saver.settings.child(('current_h5_file')).value())
@@ -910,8 +933,9 @@ class DAQ_Scan(QObject):
         self.dashboard.overshoot = False
         self.plot_2D_ini = False
         self.plot_1D_ini = False
-        self.scan_positions = []
-        self.curvilinear_values = []
+        self.scan_positions = utils.GrowingBuffer()
+        self.curvilinear_values = utils.GrowingBuffer()
+        self.gui_update_durations = deque(maxlen=100)
         res = self.set_scan()
         if res:
 
@@ -1021,6 +1045,7 @@ class DAQ_Scan(QObject):
                 * *"Update_scan_index"* : Set the value of the User Interface - indice_scan_sb attribute.
                 * *"Scan_done"* : Save the scan and init the positions
                 * *"Timeout"* : Set the "Timeout occured" in the User Interface-log message
+                * *"Scan_timing"* : Show the timing summary of the scan points (see ScanTiming)
 
             See Also
             --------
@@ -1053,6 +1078,12 @@ class DAQ_Scan(QObject):
         elif status[0] == "Timeout":
             self.ui.status_message.setText('Timeout occurred')
 
+        elif status[0] == "Scan_timing":
+            msg = status[1]
+            if len(self.gui_update_durations) != 0:
+                msg += f', GUI update: {np.mean(self.gui_update_durations) * 1000:.1f} ms'
+            self.ui.statusbar.showMessage(msg)
+
     def update_1D_graph(self, datas, display_as_sequence=False, isadaptive=False):
         """
             Update the 1D graphic window in the Graphic Interface with the given datas.
@@ -1083,23 +1114,14 @@ class DAQ_Scan(QObject):
                 if display_as_sequence:
                     self.ui.scan1D_subgraph.show()
                 if isadaptive:
-                    self.scan_data_1D = np.expand_dims(np.array([datas[key]['data'] for key in datas]), 0)
+                    self.scan_data_1D_buffer.clear()
+                    self.scan_data_1D_buffer.append(np.array([datas[key]['data'] for key in datas]))
+                    self.scan_data_1D = self.scan_data_1D_buffer.data
                 else:
+                    # the x axis only is taken from the plan, without building the positions of a lazy plan
+                    self.scan_x_axis = self.get_scan_x_axis(display_as_sequence)
                     if not display_as_sequence:
                         self.ui.scan1D_subgraph.show(False)
-                        if self.scanner.scan_parameters.scan_subtype == 'Linear back to start':
-                            self.scan_x_axis = np.array(self.scanner.scan_parameters.positions[0::2, 0])
-                        else:
-                            self.scan_x_axis = np.array(self.scanner.scan_parameters.positions[:, 0])
-
-                    else:
-                        self.scan_x_axis = np.linspace(0, len(self.scanner.scan_parameters.positions)-1,
-                                                       len(self.scanner.scan_parameters.positions))
-                        self.ui.scan1D_subgraph.show_data(
-                                [positions for positions in self.scanner.scan_parameters.positions.T])
-                        self.ui.scan1D_subgraph.update_labels(self.scanner.actuators)
-                        self.ui.scan1D_subgraph.set_axis_label(axis_settings=dict(orientation='bottom',
-                                                label='Scan index', units=''))
 
                     self.scan_data_1D = np.zeros((self.scanner.scan_parameters.Nsteps, len(datas)))
                     if self.settings.child('scan_options', 'scan_average').value() > 1:
@@ -1110,7 +1132,7 @@ class DAQ_Scan(QObject):
 
             if display_as_sequence:
                 self.ui.scan1D_subgraph.show_data(
-                    [positions for positions in np.array(self.scan_positions).T])
+                    [positions for positions in self.scan_positions.data.T])
                 self.ui.scan1D_subgraph.update_labels(self.scanner.actuators)
                 self.ui.scan1D_subgraph.set_axis_label(axis_settings=dict(orientation='bottom',
                                                                           label='Scan index', units=''))
@@ -1122,12 +1144,13 @@ class DAQ_Scan(QObject):
 
             if isadaptive:
                 if self.ind_scan != 0:
-                    self.scan_data_1D = np.vstack((self.scan_data_1D, np.array([datas[key]['data'] for key in datas])))
+                    self.scan_data_1D_buffer.append(np.array([datas[key]['data'] for key in datas]))
+                    self.scan_data_1D = self.scan_data_1D_buffer.data
                 if not display_as_sequence:
-                    self.scan_x_axis = np.array(self.scan_positions)
+                    self.scan_x_axis = self.scan_positions.data
                 else:
                     if isadaptive:
-                        self.scan_x_axis = np.array(self.curvilinear_values)
+                        self.scan_x_axis = self.curvilinear_values.data
                     else:
                         self.scan_x_axis = np.linspace(0, len(self.scan_positions)-1,
                                                        len(self.scan_positions))
@@ -1147,7 +1170,23 @@ class DAQ_Scan(QObject):
                             (self.ind_average * self.scan_data_1D_average[self.ind_scan, :] +
                              self.scan_data_1D[self.ind_scan, :]) / (self.ind_average+1)
 
+            if isadaptive:
+                self.display_throttle_1D.submit(display_as_sequence, isadaptive)
+            else:
+                self.display_1D_graph(display_as_sequence, isadaptive)
+
+        except Exception as e:
+            logger.exception(str(e))
 
+    def display_1D_graph(self, display_as_sequence=False, isadaptive=False):
+        """
+            Display the 1D scan data (and their average) sorted along the scan axis
+
+            See Also
+            --------
+            update_1D_graph
+        """
+        try:
             x_axis_sorted, indices = np.unique(self.scan_x_axis, return_index=True)
             data_sorted = list(self.scan_data_1D.T)
             data_sorted = [data[indices] for data in data_sorted]
@@ -1207,10 +1246,13 @@ class DAQ_Scan(QObject):
                     self.ui.scan1D_subgraph.show(False)
                     self.plot_2D_ini = True
                     if isadaptive:
-                        self.scan_x_axis = np.array(self.scan_positions)[:, 0]
-                        self.scan_y_axis = np.array(self.scan_positions)[:, 1]
+                        self.scan_x_axis = self.scan_positions.data[:, 0]
+                        self.scan_y_axis = self.scan_positions.data[:, 1]
                         key = list(datas.keys())[0]
-                        self.scan_data_2D = np.hstack((self.scan_positions[-1], datas[key]['data']))
+                        self.scan_data_2D_buffer.clear()
+                        self.scan_data_2D_buffer.append(np.hstack((self.scan_positions.data[-1],
+                                                                   datas[key]['data'])))
+                        self.scan_data_2D = self.scan_data_2D_buffer.data
 
                     else:
                         self.scan_x_axis = self.scanner.scan_parameters.axes_unique[0]
@@ -1241,8 +1283,7 @@ class DAQ_Scan(QObject):
                                                      for ind in range(min((3, len(datas))))]
 
                 if not isadaptive:
-                    ind_pos_axis_1 = self.scanner.scan_parameters.axes_indexes[self.ind_scan, 0]
-                    ind_pos_axis_2 = self.scanner.scan_parameters.axes_indexes[self.ind_scan, 1]
+                    ind_pos_axis_1, ind_pos_axis_2 = self.scanner.scan_parameters.plan.get_indexes(self.ind_scan)[:2]
                     for ind_plot in range(min((3, len(datas)))):
                         keys = list(datas.keys())
                         self.scan_data_2D[ind_plot][ind_pos_axis_2, ind_pos_axis_1] = datas[keys[ind_plot]]['data']
@@ -1259,10 +1300,11 @@ class DAQ_Scan(QObject):
                 else:
                     if self.ind_scan != 0:
                         key = list(datas.keys())[0]
-                        self.scan_data_2D = np.vstack((self.scan_data_2D,
-                                                       np.hstack((self.scan_positions[-1], datas[key]['data']))))
+                        self.scan_data_2D_buffer.append(np.hstack((self.scan_positions.data[-1],
+                                                                   datas[key]['data'])))
+                        self.scan_data_2D = self.scan_data_2D_buffer.data
                     if len(self.scan_data_2D) > 3: #at least 3 point to make a triangulation image
-                        self.ui.scan2D_graph.setImage(data_spread=self.scan_data_2D)
+                        self.display_throttle_2D.submit()
 
 
             else: # scan 1D with concatenation of vectors making a 2D image
@@ -1270,23 +1312,21 @@ class DAQ_Scan(QObject):
                     self.plot_2D_ini = True
                     if display_as_sequence:
                         self.ui.scan2D_subgraph.show(True)
-                        self.ui.scan2D_subgraph.show_data(
-                            [positions for positions in self.scanner.scan_parameters.positions.T])
-                        self.ui.scan2D_subgraph.update_labels(self.scanner.actuators)
 
                     data = datas[list(datas.keys())[0]]
                     Ny = len(data[list(data.keys())[0]])
 
                     self.scan_y_axis = np.array([])
 
-                    Nx = len(self.scanner.scan_parameters.positions)
+                    # columns are filled at the index of the position within the sorted unique positions of the
+                    # axis (see below), except in sequence or back to start mode where they follow the scan order
+                    if not display_as_sequence and \
+                            self.scanner.scan_parameters.scan_subtype != 'Linear back to start':
+                        self.scan_x_axis = np.array(self.scanner.scan_parameters.axes_unique[0])
+                    else:
+                        self.scan_x_axis = self.get_scan_x_axis(display_as_sequence)
+                    Nx = len(self.scan_x_axis)
                     if not display_as_sequence:
-
-                        if self.scanner.scan_parameters.scan_subtype == 'Linear back to start':
-                            self.scan_x_axis = np.array(self.scanner.scan_parameters.positions[0::2, 0])
-                        else:
-                            self.scan_x_axis = np.array(self.scanner.scan_parameters.positions[:, 0])
-
                         x_axis = utils.Axis(data=self.scan_x_axis,
                                             label=self.modules_manager.actuators[0].title,
                                             units=self.modules_manager.actuators[0].settings.child('move_settings',
@@ -1296,7 +1336,6 @@ class DAQ_Scan(QObject):
                         x_axis = utils.Axis(data=self.scan_x_axis,
                                             label='Scan index',
                                             units='')
-                        self.scan_x_axis = np.linspace(0, Nx-1, Nx)
 
                     self.ui.scan2D_graph.x_axis = x_axis
                     self.ui.scan2D_subgraph.x_axis = x_axis
@@ -1342,7 +1381,7 @@ class DAQ_Scan(QObject):
 
                 else:
                     if not display_as_sequence:
-                        ind_pos_axis = self.scanner.scan_parameters.axes_indexes[self.ind_scan, 0]
+                        ind_pos_axis = self.scanner.scan_parameters.plan.get_indexes(self.ind_scan)[0]
                     else:
                         ind_pos_axis = self.ind_scan
 
@@ -1351,10 +1390,14 @@ class DAQ_Scan(QObject):
                             break
                         self.scan_data_2D[ind_plot][:, ind_pos_axis] = datas[key]['data']
                         if self.settings.child('scan_options', 'scan_average').value() > 1:
-                            self.scan_data_2D_average[ind_plot][:, self.ind_scan] = \
+                            self.scan_data_2D_average[ind_plot][:, ind_pos_axis] = \
                                 (self.ind_average*self.scan_data_2D_average[ind_plot][:, ind_pos_axis]+datas[key]['data'])\
                                 / (self.ind_average+1)
 
+                if display_as_sequence:
+                    self.ui.scan2D_subgraph.show_data([positions for positions in self.scan_positions.data.T])
+                    self.ui.scan2D_subgraph.update_labels(self.scanner.actuators)
+
                 self.ui.scan2D_graph.setImage(*self.scan_data_2D)
                 if self.settings.child('scan_options', 'scan_average').value() > 1:
                     self.ui.average2D_graph.setImage(*self.scan_data_2D_average)
@@ -1362,6 +1405,37 @@ class DAQ_Scan(QObject):
         except Exception as e:
             logger.exception(str(e))
 
+    def get_scan_x_axis(self, display_as_sequence=False):
+        """Get the x axis of the 1D scan graphs from the scan plan
+
+        The positions of the first actuator in the scan order (only the even points in 'Linear back to start' mode)
+        or the scan indexes when displayed as a sequence. Only this axis is computed from a lazy plan.
+
+        Returns
+        -------
+        ndarray: the x axis
+        """
+        plan = self.scanner.scan_parameters.plan
+        if display_as_sequence:
+            return np.linspace(0, plan.Nsteps - 1, plan.Nsteps)
+        elif self.scanner.scan_parameters.scan_subtype == 'Linear back to start':
+            return plan.get_scan_positions(0, step=2)
+        else:
+            return plan.get_scan_positions(0)
+
+    def display_spread_2D_graph(self):
+        """
+            Display the points of an adaptive 2D scan as a triangulated image
+
+            See Also
+            --------
+            update_2D_graph
+        """
+        try:
+            self.ui.scan2D_graph.setImage(data_spread=self.scan_data_2D)
+        except Exception as e:
+            logger.exception(str(e))
+
     def update_file_settings(self,new_file=False):
         try:
             if self.h5saver.current_scan_group is None:
@@ -1414,7 +1488,7 @@ class DAQ_Scan(QObject):
             --------
             update_2D_graph, update_1D_graph, update_status
         """
-
+        tstart = time.perf_counter()
         self.scan_positions.append(self.modules_manager.order_positions(datas['positions']))
         scan_type = utils.capitalize(self.scanner.scan_parameters.scan_type)
 
@@ -1453,7 +1527,7 @@ class DAQ_Scan(QObject):
                     else:
                         self.scan_data_2D = []
 
-
+            self.gui_update_durations.append(time.perf_counter() - tstart)
 
         except Exception as e:
             logger.exception(str(e))
@@ -1526,6 +1600,9 @@ class DAQ_Scan_Acquisition(QObject):
 
         self.det_done_datas = OrderedDict()
 
+        self.timing = utils.ScanTiming()
+        self.timing_emit_time = time.perf_counter()
+
         self.h5saver = H5Saver()
         self.h5saver.settings.restoreState(h5saver.saveState())
         self.h5saver.init_file(addhoc_file_path=self.h5saver.settings.child(('current_h5_file')).value())
@@ -1533,6 +1610,7 @@ class DAQ_Scan_Acquisition(QObject):
         self.h5_det_groups = []
         self.h5_move_groups = []
         self.channel_arrays = OrderedDict([])
+        self.h5writer = None
 
         # save settings from move modules
         for ind_move in range(self.modules_manager.Nactuators):
@@ -1587,7 +1665,7 @@ class DAQ_Scan_Acquisition(QObject):
         """
         try:
             if self.scan_parameters.scan_subtype != 'Adaptive':
-                self.modules_manager.move_actuators(list(self.scan_parameters.positions[0]))
+                self.modules_manager.move_actuators(list(self.scan_parameters.plan.get_position(0)))
 
         except Exception as e:
             logger.exception(str(e))
@@ -1628,7 +1706,41 @@ class DAQ_Scan_Acquisition(QObject):
                                                         enlargeable=self.isadaptive)
             pass
 
-    def det_done(self, det_done_datas, positions=[]):
+    def start_writer(self):
+        """Start the thread writing data in the h5 file (if activated in the saving options)"""
+        if self.settings.child('saving_options', 'threaded_writing').value():
+            self.h5writer = H5Writer(self.h5saver,
+                                     queue_size=self.settings.child('saving_options', 'queue_size').value(),
+                                     flush_points=self.settings.child('saving_options', 'flush_points').value(),
+                                     flush_time=self.settings.child('saving_options', 'flush_time').value())
+            self.h5writer.start()
+        else:
+            self.h5writer = None
+
+    def stop_writer(self):
+        """Wait for all queued data to be written and stop the writing thread"""
+        if self.h5writer is not None:
+            h5writer = self.h5writer
+            self.h5writer = None
+            try:
+                h5writer.stop()
+            except H5WriterError as e:
+                logger.exception(str(e))
+                self.status_sig.emit(["Update_Status", str(e), 'log'])
+
+    def save_point(self, operations):
+        """Write the data of a scan point either directly or through the writing thread
+
+        Parameters
+        ----------
+        operations: (list of tuple) see H5Writer.write_operations
+        """
+        if self.h5writer is not None:
+            self.h5writer.put_point(operations)
+        else:
+            H5Writer.write_operations(operations)
+
+    def det_done(self, det_done_datas, positions=[], move_done_positions=None):
         """
             | Initialize 0D/1D/2D datas from given data parameter.
             | Update h5_file group and array.
@@ -1638,7 +1750,12 @@ class DAQ_Scan_Acquisition(QObject):
         det_done_datas: (OrderedDict) on the form OrderedDict
                     (det0=OrderedDict(data0D=None, data1D=None, data2D=None, dataND=None),
                      det1=OrderedDict(data0D=None, data1D=None, data2D=None, dataND=None),...)
+        positions: (list) the positions of the actuators for this scan point
+        move_done_positions: (OrderedDict) the positions as returned by the modules manager, default to the ones of
+            the last move (not valid if the next move has already been started)
         """
+        if move_done_positions is None:
+            move_done_positions = self.modules_manager.move_done_positions
         try:
             self.scan_read_datas = det_done_datas[
                 self.settings.child('scan_options', 'plot_from').value()].copy()
@@ -1648,18 +1765,21 @@ class DAQ_Scan_Acquisition(QObject):
 
             if not self.isadaptive:
                 if self.scan_parameters.scan_type == 'Tabular':
-                    indexes = np.array([self.ind_scan])
+                    indexes = [self.ind_scan]
                 else:
-                    indexes = self.scan_parameters.axes_indexes[self.ind_scan]
+                    indexes = list(self.scan_parameters.plan.get_indexes(self.ind_scan))
 
                 if self.Naverage > 1:
                     indexes.append(self.ind_average)
 
                 indexes = tuple(indexes)
 
+            operations = []
             if self.isadaptive:
                 for ind_ax, nav_axis in enumerate(self.navigation_axes):
-                    nav_axis.append(np.array(positions[ind_ax]))
+                    operations.append((nav_axis, None, np.array(positions[ind_ax])))
+                if self.scan_parameters.scan_type == 'Tabular':
+                    operations.append((self.curvilinear_array, None, np.array([self.curvilinear])))
 
             for ind_det, det_name in enumerate(self.modules_manager.get_names(self.modules_manager.detectors)):
                 datas = det_done_datas[det_name]
@@ -1676,23 +1796,50 @@ class DAQ_Scan_Acquisition(QObject):
                                     if not (self.h5saver.settings.child(('save_raw_only')).value() and
                                             datas[data_type][channel]['source'] != 'raw'):
                                         if not self.isadaptive:
-                                            self.channel_arrays[det_name][data_type][channel].__setitem__(indexes,
-                                              value=det_done_datas[det_name][data_type][channel]['data'])
+                                            operations.append((self.channel_arrays[det_name][data_type][channel],
+                                                               indexes,
+                                                               det_done_datas[det_name][data_type][channel]['data']))
                                         else:
                                             data = det_done_datas[det_name][data_type][channel]['data']
                                             if isinstance(data, float) or isinstance(data, int):
                                                 data = np.array([data])
-                                            self.channel_arrays[det_name][data_type][channel].append(data)
+                                            operations.append((self.channel_arrays[det_name][data_type][channel],
+                                                               None, data))
 
+            self.save_point(operations)
             self.det_done_flag = True
+            # with the writing thread, this only times the enqueuing of the point, the write runs concurrently
+            self.timing.stamp('saved')
 
-            self.scan_data_tmp.emit(OrderedDict(positions=self.modules_manager.move_done_positions,
+            self.scan_data_tmp.emit(OrderedDict(positions=move_done_positions,
                                                 datas=self.scan_read_datas,
                                                 curvilinear=self.curvilinear))
+            self.timing.stamp('emitted')
+        except H5WriterError as e:
+            logger.exception(str(e))
+            self.stop_scan_flag = True
+            self.status_sig.emit(["Update_Status", str(e), 'log'])
         except Exception as e:
             logger.exception(str(e))
             #self.status_sig.emit(["Update_Status", getLineInfo() + str(e), 'log'])
 
+    def end_timing_point(self):
+        """Close the timing of the current scan point and send the timing summary every second"""
+        self.timing.end_point()
+        if time.perf_counter() - self.timing_emit_time > 1.:
+            self.timing_emit_time = time.perf_counter()
+            self.status_sig.emit(["Scan_timing", self.timing.summary_as_str()])
+
+    def save_timing(self):
+        """Save the timing of the scan points (see ScanTiming) as a node of the scan group, with its own 'scan_timing'
+        type so that it is not read as a data channel"""
+        if self.timing.Npoints != 0 and \
+                not self.h5saver.is_node_in_group(self.h5saver.current_scan_group, 'Scan_timing'):
+            self.h5saver.add_array(self.h5saver.current_scan_group, 'scan_timing', 'scan_timing', data_dimension='2D',
+                                   array_to_save=self.timing.to_array(),
+                                   title='Timestamps of the scan points stages',
+                                   metadata=dict(columns=list(utils.ScanTiming.dtype.names), units='s'))
+
     def timeout(self):
         """
             Send the status signal *'Time out during acquisition'*.
@@ -1720,7 +1867,7 @@ class DAQ_Scan_Acquisition(QObject):
                     self.scan_x_axis = np.array([0.0, ])
                     self.scan_x_axis_unique = np.array([0.0, ])
                 else:
-                    self.scan_x_axis = self.scan_parameters.positions[:, 0]
+                    self.scan_x_axis = self.scan_parameters.plan.get_axis_positions(0)
                     self.scan_x_axis_unique = self.scan_parameters.axes_unique[0]
 
                 if not self.h5saver.is_node_in_group(self.h5saver.current_scan_group, 'scan_x_axis'):
@@ -1745,7 +1892,7 @@ class DAQ_Scan_Acquisition(QObject):
                         self.scan_y_axis = np.array([0.0,])
                         self.scan_y_axis_unique = np.array([0.0,])
                     else:
-                        self.scan_y_axis = self.scan_parameters.positions[:, 1]
+                        self.scan_y_axis = self.scan_parameters.plan.get_axis_positions(1)
                         self.scan_y_axis_unique = self.scan_parameters.axes_unique[1]
 
                     if not self.h5saver.is_node_in_group(self.h5saver.current_scan_group, 'scan_y_axis'):
@@ -1777,7 +1924,7 @@ class DAQ_Scan_Acquisition(QObject):
                 """Creates axes labelled by the index within the sequence"""
                 if not self.isadaptive:
                     self.scan_shape = [self.scan_parameters.Nsteps, ]
-                    nav_axes = [self.scan_parameters.positions[:, ind] for ind in range(Naxes)]
+                    nav_axes = [self.scan_parameters.plan.get_axis_positions(ind) for ind in range(Naxes)]
                 else:
                     self.scan_shape = [0, Naxes]
                     nav_axes = [np.array([0.0, ]) for ind in range(Naxes)]
@@ -1850,18 +1997,28 @@ class DAQ_Scan_Acquisition(QObject):
                 else:
                     logger.warning('Adaptive for more than 2 axis is not currently done (sequential adaptive)')
 
+            # in pipelined mode, the move to the next point is started as soon as the current one is acquired, and
+            # the current point is saved and plotted meanwhile. Points are still processed in the ind_scan order
+            pipelined = self.settings.child('scan_options', 'pipelined').value() and not self.isadaptive
+            # bounded preallocation: the timing array grows by doubling, lazy plans may have a huge number of points
+            self.timing = utils.ScanTiming(0 if self.isadaptive else
+                                           min(self.scan_parameters.Nsteps * self.Naverage, 4096))
+            self.timing_emit_time = time.perf_counter()
+            self.start_writer()
             self.status_sig.emit(["Update_Status", "Acquisition has started", 'log'])
             self.ind_scan = -1
             self.timeout_scan_flag = False
             for ind_average in range(self.Naverage):
                 self.ind_average = ind_average
+                moving = False  # True if the move to the current point has been started during the previous one
 
                 while True:
                     self.ind_scan += 1
                     if not self.isadaptive:
-                        if self.ind_scan >= len(self.scan_parameters.positions):
+                        if self.ind_scan >= self.scan_parameters.plan.Nsteps:
                             break
-                        positions = self.scan_parameters.positions[self.ind_scan]  # move motors of modules
+                        # positions are computed chunk by chunk by the scan plan
+                        positions = self.scan_parameters.plan.get_position(self.ind_scan)  # move motors of modules
                     else:
                         positions = learner.ask(1)[0][-1]  #next point to probe
                         if self.scan_parameters.scan_type == 'Tabular': #translate normalized curvilinear position to real coordinates
@@ -1880,17 +2037,35 @@ class DAQ_Scan_Acquisition(QObject):
                     self.status_sig.emit(["Update_scan_index", [self.ind_scan, ind_average]])
 
                     if self.stop_scan_flag or self.timeout_scan_flag:
+                        if moving:
+                            self.modules_manager.wait_move_actuators()
                         break
 
-                    positions = self.modules_manager.order_positions(self.modules_manager.move_actuators(positions))
+                    self.timing.start_point(self.ind_scan, ind_average)
+                    if moving:
+                        move_done_positions = self.modules_manager.wait_move_actuators()
+                    else:
+                        move_done_positions = self.modules_manager.move_actuators(positions)
+                    positions = self.modules_manager.order_positions(move_done_positions)
+                    self.timing.stamp('moved')
+
+                    det_done_datas = self.modules_manager.grab_datas(positions=positions)
+                    self.timing.stamp('grabbed')
+
+                    moving = False
+                    if pipelined and not (self.stop_scan_flag or self.timeout_scan_flag) and \
+                            self.ind_scan + 1 < self.scan_parameters.plan.Nsteps:
+                        self.modules_manager.move_actuators(self.scan_parameters.plan.get_position(self.ind_scan + 1),
+                                                            polling=False)
+                        moving = True
 
-                    self.det_done(self.modules_manager.grab_datas(positions=positions), positions)
+                    self.det_done(det_done_datas, positions, move_done_positions=move_done_positions)
+                    self.end_timing_point()
 
                     if self.isadaptive:
                         det_channel = self.modules_manager.get_selected_probed_data()
                         det, channel = det_channel[0].split('/')
                         if self.scan_parameters.scan_type == 'Tabular':
-                            self.curvilinear_array.append(np.array([self.curvilinear]))
                             new_positions = self.curvilinear
                         elif self.scan_parameters.scan_type == 'Scan1D':
                             new_positions = positions[0]
@@ -1899,23 +2074,25 @@ class DAQ_Scan_Acquisition(QObject):
 
                         learner.tell(new_positions, self.modules_manager.det_done_datas[det]['data0D'][channel]['data'])
 
+            self.stop_writer()
+            self.save_timing()
             self.h5saver.h5_file.flush()
             self.modules_manager.connect_actuators(False)
             self.modules_manager.connect_detectors(False)
+            self.status_sig.emit(["Update_Status", f'Scan timing: {self.timing.summary_as_str()}', 'log'])
 
             self.status_sig.emit(["Update_Status", "Acquisition has finished", 'log'])
             self.status_sig.emit(["Scan_done"])
 
         except Exception as e:
             logger.exception(str(e))
+            self.stop_writer()
             #self.status_sig.emit(["Update_Status", getLineInfo() + str(e), 'log'])
 
     def wait_for_det_done(self):
         self.timeout_scan_flag = False
-        self.timer.start(self.settings.child('time_flow', 'timeout').value())
-        while not(self.det_done_flag or self.timeout_scan_flag):
-            #wait for grab done signals to end
-            QtWidgets.QApplication.processEvents()
+        if not self.modules_manager.wait_for_det_done(self.settings.child('time_flow', 'timeout').value()):
+            self.timeout()
 
 
 
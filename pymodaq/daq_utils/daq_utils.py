@@ -21,6 +21,8 @@ import logging
 from logging.handlers import TimedRotatingFileHandler
 import inspect
 import json
+import time
+from functools import lru_cache
 
 
 plot_colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (14, 207, 189), (207, 14, 166), (207, 204, 14)]
@@ -376,6 +378,66 @@ class ThreadCommand(object):
         self.attributes = attributes
 
 
+class EventWaiter(QtCore.QObject):
+    """Flag on which a thread can wait (without polling) until it is set, possibly from another thread
+
+    The waiting is done in a local QEventLoop, so that the events (and queued signals) of the waiting thread are still
+    processed while waiting, but no CPU is used in between.
+
+    Examples
+    --------
+    >>> waiter = EventWaiter()
+    >>> waiter.clear()
+    >>> some_signal.connect(waiter.set)  # or waiter.set() called from any slot/thread
+    >>> if not waiter.wait(timeout=10000):
+    >>>     print('timeout')
+    """
+    _is_set_signal = QtCore.pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self._flag = False
+
+    def is_set(self):
+        return self._flag
+
+    def set(self, *args):
+        """Set the flag and wake up the waiting threads (arguments are ignored so that it can be used as a slot)"""
+        self._flag = True
+        self._is_set_signal.emit()
+
+    def clear(self):
+        self._flag = False
+
+    def wait(self, timeout=None):
+        """Wait until the flag is set
+
+        Parameters
+        ----------
+        timeout: (int) maximum waiting time in ms, None or 0 to wait indefinitely
+
+        Returns
+        -------
+        bool: True if the flag has been set, False if the timeout has been reached
+        """
+        if self._flag:
+            return True
+        loop = QtCore.QEventLoop()
+        timer = QtCore.QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(loop.quit)
+        self._is_set_signal.connect(loop.quit)
+        try:
+            if not self._flag:  # the flag could have been set (from another thread) before the connection
+                if timeout:
+                    timer.start(int(timeout))
+                loop.exec_()
+        finally:
+            timer.stop()
+            self._is_set_signal.disconnect(loop.quit)
+        return self._flag
+
+
 
 class Axis(dict):
     """
@@ -555,6 +617,72 @@ class DataToExport(Data):
                 dim = 'Data0D'
         self['dim'] = dim
 
+@lru_cache(maxsize=32)
+def default_axis_data(Npts):
+    """Read-only default axis data for Npts points: np.linspace(0, Npts-1, Npts), cached per number of points
+
+    Parameters
+    ----------
+    Npts: (int) number of points
+
+    Returns
+    -------
+    ndarray: read-only array
+    """
+    axis_data = np.linspace(0, Npts - 1, Npts)
+    axis_data.flags.writeable = False
+    return axis_data
+
+
+def read_only_view(array):
+    """Returns a read-only view on a ndarray (sharing its memory, the array itself stays writeable) or the object itself
+    if it is not an ndarray. The view only protects the array from its consumers: the data seen through it changes if
+    the owner of the array modifies it"""
+    if isinstance(array, np.ndarray):
+        array = array.view()
+        array.flags.writeable = False
+    return array
+
+
+def datas_to_export(title, datas):
+    """Split the channels of a list of DataFromPlugins (as emitted by a detector) into DataToExport objects sorted by
+    dimensionality. The data arrays are not copied but shared as read-only views, default axes are set from
+    default_axis_data for 1D and 2D data without axes. The arrays should therefore not be modified afterwards by their
+    producer: DAQ_Detector.data_ready copies the arrays emitted by the plugins once, so that plugins may reuse their
+    acquisition buffers.
+
+    Parameters
+    ----------
+    title: (str) the title of the detector
+    datas: (list of DataFromPlugins)
+
+    Returns
+    -------
+    OrderedDict: with keys 'data0D', 'data1D', 'data2D' and 'dataND', each an OrderedDict of DataToExport whose keys are
+                 f'{title}_{name}_CH{ind:03}'
+    """
+    data_export = OrderedDict([(key, OrderedDict([])) for key in ['data0D', 'data1D', 'data2D', 'dataND']])
+    for data in datas:
+        data_dim = data['dim'].lower()
+        metadata = OrderedDict([(key, data[key]) for key in data if key not in ['data', 'name', 'labels']])
+        for ind_sub_data, dat in enumerate(data['data']):
+            subdata = DataToExport(name=title, data=read_only_view(dat), **metadata)
+            sub_name = f"{title}_{data['name']}_CH{ind_sub_data:03}"
+            if data_dim == 'data0d':
+                subdata['data'] = subdata['data'][0]
+            elif data_dim == 'data1d':
+                if 'x_axis' not in subdata:
+                    subdata['x_axis'] = Axis(data=default_axis_data(len(dat)))
+            elif data_dim == 'data2d':
+                if 'x_axis' not in subdata:
+                    subdata['x_axis'] = Axis(data=default_axis_data(dat.shape[1]))
+                if 'y_axis' not in subdata:
+                    subdata['y_axis'] = Axis(data=default_axis_data(dat.shape[0]))
+            if data_dim in ['data0d', 'data1d', 'data2d', 'datand']:
+                data_export['data' + data_dim[4:].upper()][sub_name] = subdata
+    return data_export
+
+
 class ScaledAxis(Axis):
     def __init__(self, label='', units='', offset=0, scaling=1):
         super().__init__(label=label, units=units)
@@ -1038,6 +1166,378 @@ def get_new_file_name(base_path=Path('C:\Data'), base_name='tttr_data'):
 
 ###############
 ##Math utilities
+class DataAccumulator:
+    """Running average of a list of arrays (for instance the channels of a detector), accumulated in place
+
+    Each new list of arrays is summed into preallocated buffers, the division by the number of accumulated lists being
+    done only when the average is requested. Optionally, the mean and the sum of squared differences are updated in place
+    with the Welford algorithm, giving the variance and the standard error of the mean.
+
+    Parameters
+    ----------
+    dtype: (numpy dtype) dtype of the sum buffers (for instance int64 for an exact sum of integer data)
+    variance: (bool) if True, compute the mean and variance with the Welford algorithm (in float64 if dtype is not a
+              floating type) instead of summing
+
+    Examples
+    --------
+    >>> accumulator = DataAccumulator(variance=True)
+    >>> for ind in range(Naverage):
+    >>>     accumulator.add([channel1, channel2])
+    >>> averages = accumulator.average()
+    >>> std_errors = accumulator.std_error()
+    """
+
+    def __init__(self, dtype=np.float64, variance=False):
+        self.dtype = np.dtype(dtype)
+        self.variance = variance
+        if variance and not np.issubdtype(self.dtype, np.floating):
+            self.dtype = np.dtype(np.float64)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self._sums = []  # or means if variance
+        self._m2s = []
+        self._deltas = []
+        self._tmps = []
+
+    def add(self, arrays):
+        """Accumulate a list of arrays, with same number of arrays and same shapes as the previously added ones
+
+        Parameters
+        ----------
+        arrays: (list of ndarray)
+        """
+        if self.count == 0:
+            self._sums = [np.zeros(np.shape(array), dtype=self.dtype) for array in arrays]
+            if self.variance:
+                self._m2s = [np.zeros_like(buffer) for buffer in self._sums]
+                self._deltas = [np.zeros_like(buffer) for buffer in self._sums]
+                self._tmps = [np.zeros_like(buffer) for buffer in self._sums]
+        elif len(arrays) != len(self._sums) or \
+                any([np.shape(array) != buffer.shape for array, buffer in zip(arrays, self._sums)]):
+            raise ValueError('The arrays to accumulate should have the same number and shapes as the previous ones')
+        self.count += 1
+
+        if self.variance:
+            for array, mean, m2, delta, tmp in zip(arrays, self._sums, self._m2s, self._deltas, self._tmps):
+                np.subtract(array, mean, out=delta)
+                np.divide(delta, self.count, out=tmp)
+                mean += tmp
+                np.subtract(array, mean, out=tmp)
+                tmp *= delta
+                m2 += tmp
+        else:
+            for array, buffer in zip(arrays, self._sums):
+                np.add(buffer, array, out=buffer, casting='unsafe')
+
+    def average(self):
+        """Returns the list of averaged arrays (new arrays)"""
+        if self.variance:
+            return [mean.copy() for mean in self._sums]
+        else:
+            return [buffer / self.count for buffer in self._sums]
+
+    def get_variance(self):
+        """Returns the list of the (unbiased) variance arrays, only available if variance is True"""
+        if not self.variance:
+            raise ValueError('The variance is only computed by a DataAccumulator created with variance=True')
+        if self.count < 2:
+            return [np.zeros_like(m2) for m2 in self._m2s]
+        return [m2 / (self.count - 1) for m2 in self._m2s]
+
+    def std_error(self):
+        """Returns the list of standard error of the mean arrays, only available if variance is True"""
+        return [np.sqrt(variance / self.count) for variance in self.get_variance()]
+
+
+class RingBuffer:
+    """History of the last Nmax samples of a scalar stream, stored in a preallocated circular buffer
+
+    Appending a sample is O(1) whatever the history length: each sample is written twice, at index i and i + Nmax of a
+    buffer of length 2 * Nmax, so that the kept samples are always contiguous and returned in chronological order as a
+    view, without copy.
+
+    Parameters
+    ----------
+    Nmax: (int) maximum number of samples kept
+    dtype: (numpy dtype) dtype of the samples
+
+    Examples
+    --------
+    >>> history = RingBuffer(1000)
+    >>> history.append(value)
+    >>> indexes, data = history.decimated(max_points=5000)
+    """
+
+    def __init__(self, Nmax, dtype=np.float64):
+        if Nmax < 1:
+            raise ValueError('A RingBuffer should keep at least one sample')
+        self.Nmax = int(Nmax)
+        self._buffer = np.zeros((2 * self.Nmax,), dtype=dtype)
+        self.clear()
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self.Ntotal = 0  # number of samples appended since the creation or the last clear
+        self._size = 0  # number of kept samples
+        self._index = 0  # position of the next sample in the first half of the buffer
+
+    def append(self, value):
+        """Append a sample, the oldest one being dropped if Nmax samples are already kept"""
+        self._buffer[self._index] = value
+        self._buffer[self._index + self.Nmax] = value
+        self._index = (self._index + 1) % self.Nmax
+        self._size = min(self._size + 1, self.Nmax)
+        self.Ntotal += 1
+
+    def extend(self, values):
+        """Append several samples at once
+
+        Parameters
+        ----------
+        values: (iterable of scalars)
+        """
+        values = np.asarray(values).reshape((-1,))
+        Nvalues = values.size
+        if Nvalues > self.Nmax:
+            self._index = (self._index + Nvalues - self.Nmax) % self.Nmax
+            self.Ntotal += Nvalues - self.Nmax
+            values = values[Nvalues - self.Nmax:]
+        positions = (self._index + np.arange(values.size)) % self.Nmax
+        self._buffer[positions] = values
+        self._buffer[positions + self.Nmax] = values
+        self._index = (self._index + values.size) % self.Nmax
+        self._size = min(self._size + values.size, self.Nmax)
+        self.Ntotal += values.size
+
+    @property
+    def data(self):
+        """Read only view of the kept samples in chronological order"""
+        view = self._buffer[self._index + self.Nmax - len(self):self._index + self.Nmax]
+        view.flags.writeable = False
+        return view
+
+    def indexes(self):
+        """Returns the indexes of the kept samples since the creation or the last clear of the buffer"""
+        return np.arange(self.Ntotal - len(self), self.Ntotal, dtype=np.float64)
+
+    def decimated(self, max_points=10000, peak=False):
+        """Returns at most max_points of the kept samples for display
+
+        The samples are either taken with a constant stride or, if peak is True, replaced by the minimum and maximum of
+        blocks of samples so that the peaks are kept. The stride (or the blocks) is aligned on the sample indexes so
+        that the displayed samples don't change from one call to the next when the history scrolls.
+
+        Parameters
+        ----------
+        max_points: (int) maximum number of returned samples
+        peak: (bool) if True, use a min/max decimation instead of a constant stride
+
+        Returns
+        -------
+        tuple of ndarray: the sample indexes and the corresponding data
+        """
+        Npts = len(self)
+        if Npts <= max_points:
+            return self.indexes(), self.data
+        if not peak:
+            step = int(np.ceil(Npts / max_points))
+            start = (-(self.Ntotal - Npts)) % step
+            return self.indexes()[start::step], self.data[start::step]
+
+        step = int(np.ceil(Npts / max(max_points // 2 - 1, 1)))
+        start = (-(self.Ntotal - Npts)) % step
+        block_starts = np.concatenate(([0], np.arange(start, Npts, step)))[int(start == 0):]
+        block_ends = np.append(block_starts[1:], Npts) - 1
+        data = np.empty((2 * len(block_starts),), dtype=self._buffer.dtype)
+        data[0::2] = np.minimum.reduceat(self.data, block_starts)
+        data[1::2] = np.maximum.reduceat(self.data, block_starts)
+        indexes = np.empty((2 * len(block_starts),))
+        indexes[0::2] = block_starts
+        indexes[1::2] = block_ends
+        return indexes + self.Ntotal - Npts, data
+
+    def resize(self, Nmax):
+        """Change the maximum number of kept samples, keeping the last ones"""
+        data = self.data[-Nmax:].copy()
+        Ntotal = self.Ntotal
+        self.__init__(Nmax, dtype=self._buffer.dtype)
+        self.extend(data)
+        self.Ntotal = Ntotal
+
+
+class GrowingBuffer:
+    """Preallocated array of rows whose capacity is doubled whenever it is full
+
+    Appending a row is amortized O(1) (instead of O(N) when using np.vstack or converting a list to an array at each
+    new row) and the appended rows are returned as a view, without copy.
+
+    Parameters
+    ----------
+    capacity: (int) number of rows preallocated at the first append
+    dtype: (numpy dtype) dtype of the rows
+
+    Examples
+    --------
+    >>> positions = GrowingBuffer()
+    >>> positions.append([x, y])
+    >>> positions.data[:, 0]  # all x values
+    """
+
+    def __init__(self, capacity=256, dtype=np.float64):
+        self.capacity = max(1, int(capacity))
+        self.dtype = np.dtype(dtype)
+        self._buffer = None  # allocated at the first append, when the shape of the rows is known
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        """Remove all rows, the shape of the rows being reset"""
+        self._buffer = None
+        self._size = 0
+
+    def _reserve(self, Nrows, row_shape):
+        if self._buffer is None:
+            self._buffer = np.zeros((max(self.capacity, Nrows), *row_shape), dtype=self.dtype)
+        elif self._size + Nrows > self._buffer.shape[0]:
+            buffer = np.zeros((max(2 * self._buffer.shape[0], self._size + Nrows), *self._buffer.shape[1:]),
+                              dtype=self.dtype)
+            buffer[:self._size] = self._buffer[:self._size]
+            self._buffer = buffer
+
+    def append(self, row):
+        """Append a row (scalar or array), all rows should have the same shape"""
+        row = np.asarray(row, dtype=self.dtype)
+        self._reserve(1, row.shape)
+        self._buffer[self._size] = row
+        self._size += 1
+
+    def extend(self, rows):
+        """Append several rows at once
+
+        Parameters
+        ----------
+        rows: (iterable) the rows stacked along the first dimension
+        """
+        rows = np.asarray(rows, dtype=self.dtype)
+        self._reserve(len(rows), rows.shape[1:])
+        self._buffer[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    @property
+    def data(self):
+        """Read only view of the appended rows"""
+        if self._buffer is None:
+            return np.zeros((0,), dtype=self.dtype)
+        view = self._buffer[:self._size]
+        view.flags.writeable = False
+        return view
+
+
+class ScanTiming:
+    """
+    Record the timestamps (time.perf_counter, in s from the start of the scan) of each stage of the scan points in a
+    numpy structured array
+
+    Each point is recorded between start_point and end_point, its stages being timestamped with stamp:
+        * *start*: beginning of the point
+        * *moved*: actuators reached their positions
+        * *grabbed*: all detectors returned their data
+        * *saved*: data written to the h5 file or, when saving through the writing thread (H5Writer), only queued to
+          it: the *save* stage is then the enqueue time, the actual write being done concurrently
+        * *emitted*: data sent to the GUI
+    The duration of a stage is the difference between its timestamp and the previous one, missing stamps are NaN.
+    """
+    stamps = ['start', 'moved', 'grabbed', 'saved', 'emitted']
+    stages = ['move', 'grab', 'save', 'emit']
+    dtype = np.dtype([('ind_scan', np.int32), ('ind_average', np.int32)] + [(stamp, np.float64) for stamp in stamps])
+
+    def __init__(self, Npoints=0):
+        """
+
+        Parameters
+        ----------
+        Npoints: (int) expected number of points, the array grows if more points are recorded
+        """
+        self._timings = np.zeros((max(Npoints, 16),), dtype=self.dtype)
+        self.Npoints = 0
+        self.tzero = time.perf_counter()
+
+    @property
+    def timings(self):
+        """ndarray: the structured array of the recorded points"""
+        return self._timings[:self.Npoints]
+
+    def start_point(self, ind_scan, ind_average=0):
+        if self.Npoints >= len(self._timings):
+            self._timings = np.concatenate((self._timings, np.zeros_like(self._timings)))
+        point = self._timings[self.Npoints:self.Npoints + 1]
+        point['ind_scan'] = ind_scan
+        point['ind_average'] = ind_average
+        for stamp in self.stamps[1:]:
+            point[stamp] = np.nan
+        point['start'] = time.perf_counter() - self.tzero
+
+    def stamp(self, stamp):
+        self._timings[self.Npoints][stamp] = time.perf_counter() - self.tzero
+
+    def end_point(self):
+        self.Npoints += 1
+
+    def durations(self):
+        """Get the duration of each stage (in s) for all the recorded points
+
+        Returns
+        -------
+        OrderedDict: with the stages as keys and 1D ndarray of durations as values
+        """
+        timings = self.timings
+        return OrderedDict([(stage, timings[self.stamps[ind + 1]] - timings[self.stamps[ind]])
+                            for ind, stage in enumerate(self.stages)])
+
+    def summary(self):
+        """Get statistics on the recorded points
+
+        Returns
+        -------
+        OrderedDict: with keys:
+            * *Npoints*: number of recorded points
+            * *throughput*: number of points per second
+            * *dead_time*: fraction of the elapsed time not spent grabbing data
+            * the stages: mean duration (in s) of the stage per point
+        """
+        summary = OrderedDict(Npoints=self.Npoints, throughput=np.nan, dead_time=np.nan)
+        if self.Npoints == 0:
+            return summary
+        timings = self.timings
+        durations = self.durations()
+        ends = np.stack([timings[stamp] for stamp in self.stamps[1:]])
+        elapsed = np.nanmax(ends) - timings['start'][0] if np.any(np.isfinite(ends)) else 0.
+        if elapsed > 0:
+            summary['throughput'] = self.Npoints / elapsed
+            summary['dead_time'] = 1 - np.nansum(durations['grab']) / elapsed
+        for stage in self.stages:
+            summary[stage] = np.nanmean(durations[stage]) if np.any(np.isfinite(durations[stage])) else np.nan
+        return summary
+
+    def summary_as_str(self):
+        summary = self.summary()
+        stages = ', '.join([f'{stage}: {summary[stage] * 1000:.1f} ms' for stage in self.stages])
+        return f'{summary["Npoints"]} points, {summary["throughput"]:.2f} points/s, ' \
+               f'dead time: {summary["dead_time"] * 100:.0f}% ({stages})'
+
+    def to_array(self):
+        """Get the recorded timings as a 2D float array (one column per field of the structured array)"""
+        timings = self.timings
+        return np.stack([timings[name].astype(np.float64) for name in self.dtype.names], axis=1)
+
+
 def my_moment(x, y):
     """Returns the moments of a distribution y over an axe x
 
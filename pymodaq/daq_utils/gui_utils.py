@@ -2,6 +2,7 @@ from collections import OrderedDict
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QEvent, QBuffer, QIODevice, QLocale, Qt, QVariant, QModelIndex
 from PyQt5 import QtGui, QtWidgets, QtCore
 import numpy as np
+import time
 from pathlib import Path
 from pyqtgraph.dockarea.DockArea import DockArea, TempAreaWindow
 
@@ -83,6 +84,59 @@ def h5tree_to_QTree(base_node, base_tree_elt=None, pixmap_items=[]):
     return base_tree_elt, pixmap_items
 
 
+class DisplayThrottle(QObject):
+    """Limit the rate at which a display function is called, the intermediate calls being dropped
+
+    A call coming less than 1/max_fps after the previous display is delayed (using a single shot timer) and replaced by
+    any newer call in the meantime, so that the latest data is always displayed eventually.
+
+    Parameters
+    ----------
+    display_fun: (callable) the display function
+    max_fps: (float) the maximum number of displays per second, 0 or None for no limit
+
+    Examples
+    --------
+    >>> throttle = DisplayThrottle(image_item.setImage, max_fps=25)
+    >>> throttle.submit(data)  # instead of image_item.setImage(data)
+    """
+
+    def __init__(self, display_fun, max_fps=25):
+        super().__init__()
+        self.display_fun = display_fun
+        self.max_fps = max_fps
+        self.Ndropped = 0
+        self._last_display = None
+        self._pending = None
+        self._timer = QtCore.QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def submit(self, *args, **kwargs):
+        """Call the display function with the given arguments now, or later if the maximum rate has been reached"""
+        if self._pending is not None:
+            self.Ndropped += 1
+        self._pending = (args, kwargs)
+        if self._timer.isActive():
+            return
+        remaining = 0
+        if self.max_fps and self._last_display is not None:
+            remaining = 1 / self.max_fps - (time.perf_counter() - self._last_display)
+        if remaining <= 0:
+            self.flush()
+        else:
+            self._timer.start(int(np.ceil(remaining * 1000)))
+
+    def flush(self):
+        """Call immediately the display function with the latest submitted arguments if not already displayed"""
+        self._timer.stop()
+        if self._pending is not None:
+            args, kwargs = self._pending
+            self._pending = None
+            self._last_display = time.perf_counter()
+            self.display_fun(*args, **kwargs)
+
+
 class ListPicker(QObject):
 
     def __init__(self, list_str):
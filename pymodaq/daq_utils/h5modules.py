@@ -14,6 +14,7 @@ from pymodaq.daq_utils.tree_layout.tree_layout_main import Tree_layout
 from pymodaq.daq_utils.daq_utils import capitalize, Axis, JsonConverter
 from pymodaq.daq_utils.gui_utils import h5tree_to_QTree, pngbinary2Qlabel, select_file, DockArea
 from pymodaq.daq_utils.plotting.viewerND.viewerND_main import ViewerND
+from pymodaq.daq_utils.plotting.viewerND.signal_manager import LazyArray
 import pickle
 from PyQt5 import QtWidgets
 from pymodaq.daq_utils import daq_utils as utils
@@ -26,6 +27,8 @@ import numpy as np
 from pathlib import Path
 import copy
 import importlib
+import queue
+import time
 from packaging import version as version_mod
 
 logger = utils.set_logger(utils.get_module_name(__file__))
@@ -62,7 +65,7 @@ version = '0.0.1'
 save_types = ['scan', 'detector', 'logger', 'custom']
 group_types = ['raw_datas', 'scan', 'detector', 'move', 'data', 'ch', '', 'external_h5']
 group_data_types = ['data0D', 'data1D', 'data2D', 'dataND']
-data_types = ['data', 'axis', 'live_scan', 'navigation_axis', 'external_h5', 'strings']
+data_types = ['data', 'axis', 'live_scan', 'navigation_axis', 'external_h5', 'strings', 'scan_timing']
 data_dimensions = ['0D', '1D', '2D', 'ND']
 scan_types = ['']
 scan_types.extend(stypes)
@@ -114,6 +117,35 @@ def get_attr(node, attr_name, backend='tables'):
                 attrs[attr_name] = JsonConverter.json2object(attrval)
             return attrs
 
+def get_chunk_shape(scan_shape, data_shape, dtype=np.float64, min_chunk_size=65536):
+    """Get the chunk shape of a scan array such as each scan point (a full data array) is written within a single chunk
+
+    The chunk is made of one data array: (1, ..., 1, *data_shape). For small data (0D for instance), the innermost
+    scan dimension is grouped so that the chunk size reaches at least min_chunk_size bytes (a point still lies within a
+    single chunk)
+
+    Parameters
+    ----------
+    scan_shape: (iterable) the shape of the scan dimensions
+    data_shape: (iterable) the shape of the data taken at each scan point
+    dtype: (np.dtype or numpy types) type of the array elements
+    min_chunk_size: (int) minimum chunk size in bytes
+
+    Returns
+    -------
+    tuple: the chunk shape
+    """
+    scan_shape = [int(s) for s in scan_shape]
+    data_shape = [int(s) for s in data_shape]
+    chunk_shape = [1 for s in scan_shape]
+    if len(chunk_shape) != 0:
+        data_size = int(np.prod(data_shape)) * np.dtype(dtype).itemsize
+        if data_size < min_chunk_size:
+            chunk_shape[-1] = max(1, min(scan_shape[-1], int(np.ceil(min_chunk_size / max(data_size, 1)))))
+    chunk_shape.extend(data_shape)
+    return tuple(chunk_shape)
+
+
 def set_attr(node, attr_name, attr_value, backend='tables'):
         if backend == 'tables':
             node._v_attrs[attr_name] = JsonConverter.object2json(attr_value)
@@ -132,6 +164,8 @@ class InvalidDataDimension(Exception):
     pass
 class InvalidScanType(Exception):
     pass
+class H5WriterError(Exception):
+    pass
 
 class Node(object):
     def __init__(self, node, backend):
@@ -298,6 +332,14 @@ class CARRAY(Node):
     def __getitem__(self, item):
         return self._array.__getitem__(item)
 
+    @property
+    def shape(self):
+        return tuple(self._array.shape)
+
+    @property
+    def dtype(self):
+        return self._array.dtype
+
     def __setitem__(self, key, value):
         self._array.__setitem__(key, value)
 
@@ -307,6 +349,14 @@ class CARRAY(Node):
         else:
             return self._array[:]
 
+    @property
+    def chunk_shape(self):
+        """return the chunk shape of the array (None if not chunked)"""
+        if self.backend == 'tables':
+            return self._array.chunkshape
+        else:
+            return self._array.chunks
+
     def __len__(self):
         if self.backend == 'tables':
             return self.array.nrows
@@ -314,33 +364,108 @@ class CARRAY(Node):
             return len(self.array)
 
 class EARRAY(CARRAY):
+    """Enlargeable array along its first dimension
+
+    Data can be appended row by row (append) or by blocks of rows (append_rows). If a buffer is set (see set_buffer)
+    appended rows are accumulated in a preallocated numpy block and committed to the file in a single append once
+    the buffer is full, when commit is called (the h5 backend flush or close_file call it) or before any reading.
+    """
     def __init__(self, array, backend):
         super().__init__(array, backend)
+        self._buffer = None
+        self._buffer_index = 0
+
+    @property
+    def buffer_size(self):
+        """number of rows that can be accumulated before being committed to the file (0 if unbuffered)"""
+        if self._buffer is None:
+            return 0
+        return self._buffer.shape[0]
+
+    def set_buffer(self, buffer_size=100, max_memory=64e6):
+        """Preallocate a buffer in which appended rows are accumulated
+
+        Parameters
+        ----------
+        buffer_size: (int) number of rows in the buffer, if 0 rows are directly appended to the file
+        max_memory: (float) the number of rows is reduced so that the buffer memory is lower than max_memory bytes
+        """
+        self.commit()
+        row_shape = self.array.shape[1:]
+        dtype = self.array.dtype
+        row_size = max(1, int(np.prod(row_shape)) * dtype.itemsize)
+        buffer_size = min(int(buffer_size), int(max_memory // row_size))
+        if buffer_size <= 1:
+            self._buffer = None
+        else:
+            self._buffer = np.zeros((buffer_size, *row_shape), dtype=dtype)
 
     def append(self, data):
-        if isinstance(data, np.ndarray):
-            if data.shape != (1,):
-                shape = [1]
-                shape.extend(data.shape)
-                data = data.reshape(shape)
+        data = np.asarray(data)
+        if data.shape != (1,):
+            shape = [1]
+            shape.extend(data.shape)
+            data = data.reshape(shape)
+
+        if self._buffer is None:
+            self.append_rows(data)
+        else:
+            self._buffer[self._buffer_index] = data.reshape(self._buffer.shape[1:])
+            self._buffer_index += 1
+            if self._buffer_index == self._buffer.shape[0]:
+                self.commit()
+
+    def append_rows(self, data):
+        """Append a block of rows (the first dimension of data) in a single operation
 
+        Parameters
+        ----------
+        data: (ndarray) array of shape (Nrows, *array.shape[1:])
+        """
         self.append_backend(data)
 
         sh = list(self.attrs['shape'])
-        sh[0] += 1
+        sh[0] += len(data)
         self.attrs['shape'] = tuple(sh)
 
+    def commit(self):
+        """Write the rows accumulated in the buffer into the file"""
+        if self._buffer_index != 0:
+            Nrows = self._buffer_index
+            self._buffer_index = 0
+            self.append_rows(self._buffer[:Nrows])
+
     def append_backend(self, data):
         if self.backend == 'tables':
             self.array.append(data)
         else:
-            self.array.resize(self.array.len() + 1, axis=0)
-            self.array[-1] = data
+            self.array.resize(self.array.len() + len(data), axis=0)
+            self.array[-len(data):] = data
+
+    def __getitem__(self, item):
+        self.commit()
+        return super().__getitem__(item)
+
+    @property
+    def shape(self):
+        self.commit()
+        return super().shape
+
+    def read(self):
+        self.commit()
+        return super().read()
+
+    def __len__(self):
+        self.commit()
+        return super().__len__()
 
 class VLARRAY(EARRAY):
     def __init__(self, array, backend):
         super().__init__(array, backend)
 
+    def set_buffer(self, buffer_size=100, max_memory=64e6):
+        raise NotImplementedError('Variable length arrays cannot be buffered')
+
     def append(self, data):
         self.append_backend(data)
 
@@ -348,6 +473,13 @@ class VLARRAY(EARRAY):
         sh[0] += 1
         self.attrs['shape'] = tuple(sh)
 
+    def append_backend(self, data):
+        if self.backend == 'tables':
+            self.array.append(data)
+        else:
+            self.array.resize(self.array.len() + 1, axis=0)
+            self.array[-1] = data
+
 class StringARRAY(VLARRAY):
     def __init__(self, array, backend):
         super().__init__(array, backend)
@@ -427,6 +559,7 @@ class H5Backend:
         self.backend = backend
         self.file_path = None
         self.compression = None
+        self._buffered_arrays = []
         if backend == 'tables':
             if is_tables:
                 self.h5module = tables
@@ -472,6 +605,7 @@ class H5Backend:
                     self._h5file.close()
         except Exception as e:
             print(e) #no big deal
+        self._buffered_arrays = []
 
     def open_file(self, fullpathname, mode='r', title='PyMoDAQ file', **kwargs):
         self.file_path = fullpathname
@@ -512,7 +646,10 @@ class H5Backend:
         return set_attr(node, attr_name, attr_value, self.backend)
 
     def flush(self):
+        """Commit the buffered rows of enlargeable arrays and flush the h5file"""
         if self._h5file is not None:
+            for array in self._buffered_arrays:
+                array.commit()
             self._h5file.flush()
 
     def define_compression(self, compression, compression_opts):
@@ -748,32 +885,83 @@ class H5Backend:
         else:
             return array[:]
 
-    def create_carray(self, where, name, obj=None, title=''):
+    def create_carray(self, where, name, obj=None, title='', shape=None, dtype=None, chunk_shape=None):
+        """create a fixed size array either from data (obj) or from a given shape and type. In the latter case, the
+        array is chunked and lazily allocated: elements are zero until written
+
+        Parameters
+        ----------
+        where: (str or node) group location in the file where to create the array node
+        name: (str) name of the array
+        obj: (ndarray) data to be saved. If None, shape and dtype should be specified
+        title: (str) node title attribute (written in capitals)
+        shape: (iterable) shape of the array, used only if obj is None
+        dtype: (dtype) numpy dtype of the array elements, used only if obj is None
+        chunk_shape: (iterable) shape of the HDF5 chunks, see get_chunk_shape. If None, let the backend decides
+
+        Returns
+        -------
+        array (CARRAY)
+        """
         if isinstance(where, Node):
             where = where.node
         if obj is None:
-            raise ValueError('Data to be saved as carray cannot be None')
-        dtype = obj.dtype
+            if shape is None:
+                raise ValueError('Data to be saved as carray cannot be None')
+            shape = tuple(shape)
+            dtype = np.dtype(np.float64 if dtype is None else dtype)
+        else:
+            shape = obj.shape
+            dtype = obj.dtype
+        if chunk_shape is not None:
+            chunk_shape = tuple(chunk_shape)
+
         if self.backend == 'tables':
-            array = CARRAY(self._h5file.create_carray(where, name, obj=obj,
-                                               title=title,
-                                               filters=self.compression), self.backend)
+            if obj is None:
+                atom = self.h5module.Atom.from_dtype(dtype)
+                array = CARRAY(self._h5file.create_carray(where, name, atom, shape=shape, title=title,
+                                                          filters=self.compression, chunkshape=chunk_shape),
+                               self.backend)
+            else:
+                array = CARRAY(self._h5file.create_carray(where, name, obj=obj,
+                                                          title=title,
+                                                          filters=self.compression, chunkshape=chunk_shape),
+                               self.backend)
         else:
+            kwargs = dict(chunks=chunk_shape)
             if self.compression is not None:
-                array = CARRAY(self.get_node(where).node.create_dataset(name, data=obj, **self.compression), self.backend)
+                kwargs.update(self.compression)
+            if obj is None:
+                array = CARRAY(self.get_node(where).node.create_dataset(name, shape=shape, dtype=dtype, fillvalue=0,
+                                                                        **kwargs), self.backend)
             else:
-                array = CARRAY(self.get_node(where).node.create_dataset(name, data=obj), self.backend)
+                array = CARRAY(self.get_node(where).node.create_dataset(name, data=obj, **kwargs), self.backend)
             array.array.attrs['TITLE'] = title
             array.array.attrs['CLASS'] = 'CARRAY' #direct writing using h5py to be compatible with pytable automatic class writing as binary
-        array.attrs['shape'] = obj.shape
+        array.attrs['shape'] = shape
         array.attrs['dtype'] = dtype.name
         array.attrs['subdtype'] = ''
         array.attrs['backend'] = self.backend
         return array
 
-    def create_earray(self, where, name, dtype, data_shape=None, title=''):
+    def create_earray(self, where, name, dtype, data_shape=None, title='', buffer_size=0):
         """create enlargeable arrays from data with a given shape and of a given type. The array is enlargeable along
         the first dimension
+
+        Parameters
+        ----------
+        where: (str or node) group location in the file where to create the array node
+        name: (str) name of the array
+        dtype: (dtype) numpy dtype of the array elements
+        data_shape: (iterable) shape of one row of the array
+        title: (str) node title attribute (written in capitals)
+        buffer_size: (int) if non zero, appended rows are accumulated in a buffer of buffer_size rows and written by
+                     blocks. The buffer is committed to the file when the backend is flushed or closed
+                     (see EARRAY.set_buffer)
+
+        Returns
+        -------
+        array (EARRAY)
         """
         if isinstance(where, Node):
             where = where.node
@@ -807,8 +995,23 @@ class H5Backend:
         array.attrs['dtype'] = dtype.name
         array.attrs['subdtype'] = ''
         array.attrs['backend'] = self.backend
+        self.set_array_buffer(array, buffer_size)
         return array
 
+    def set_array_buffer(self, array, buffer_size):
+        """Set the row buffer of an enlargeable array, its content is committed when the file is flushed or closed
+
+        Parameters
+        ----------
+        array: (EARRAY)
+        buffer_size: (int) number of rows in the buffer (see EARRAY.set_buffer), 0 to disable buffering
+        """
+        if array in self._buffered_arrays:
+            self._buffered_arrays.remove(array)
+        array.set_buffer(buffer_size)
+        if array.buffer_size != 0:
+            self._buffered_arrays.append(array)
+
     def create_vlarray(self, where, name, dtype, title=''):
         """create variable data length and type and enlargeable 1D arrays
 
@@ -993,6 +1196,9 @@ class H5Saver(H5Backend, QObject):
                      {'title': 'Compression level:', 'name': 'h5comp_level', 'type': 'int', 'value': 5, 'min': 0,
                       'max': 9},
                  ]},
+                 {'title': 'Append buffer (rows):', 'name': 'buffer_size', 'type': 'int', 'value': 100, 'min': 0,
+                  'tooltip': 'Number of rows accumulated in memory before being written in enlargeable arrays during'
+                             ' continuous saving. 0 to write each row directly'},
              ]
 
     def __init__(self, save_type='scan', backend='tables'):
@@ -1447,7 +1653,8 @@ class H5Saver(H5Backend, QObject):
         group = self.add_group(group_data_type, '', where, title, metadata)
         return group
 
-    def add_navigation_axis(self, data, parent_group, axis='x_axis', enlargeable=False, title='', metadata=dict([])):
+    def add_navigation_axis(self, data, parent_group, axis='x_axis', enlargeable=False, title='', metadata=dict([]),
+                            buffer_size=0):
         """
         Create carray or earray for navigation axis within a scan
         Parameters
@@ -1456,6 +1663,8 @@ class H5Saver(H5Backend, QObject):
         parent_group: (str or node) parent node where to save new data
         axis: (str) either x_axis, y_axis, z_axis or time_axis. 'x_axis', 'y_axis', 'z_axis', 'time_axis' are axes containing scalar values (floats or ints). 'time_axis' can be interpreted as the posix timestamp corresponding to a datetime object, see datetime.timestamp()
         enlargeable: (bool) if True the created array is a earray type if False the created array is a carray type
+        buffer_size: (int) number of rows buffered in memory before being appended to an enlargeable array
+                     (see H5Backend.create_earray)
         """
 
         if axis not in ['x_axis', 'y_axis', 'z_axis', 'time_axis']:
@@ -1465,7 +1674,7 @@ class H5Saver(H5Backend, QObject):
         array = self.add_array(parent_group, f"{self.settings.child(('save_type')).value()}_{axis}", 'navigation_axis',
                                data_shape=data.shape,
                                data_dimension='1D', array_to_save=data, enlargeable=enlargeable, title=title,
-                               metadata=metadata)
+                               metadata=metadata, buffer_size=buffer_size)
         return array
 
     def add_data_live_scan(self, channel_group, data_dict, scan_type='scan1D', title='', scan_subtype=''):
@@ -1505,7 +1714,7 @@ class H5Saver(H5Backend, QObject):
 
     def add_data(self, channel_group, data_dict, scan_type='scan1D', scan_subtype='',
                  scan_shape=[], title='', enlargeable=False,
-                 init=False, add_scan_dim=False, metadata=dict([])):
+                 init=False, add_scan_dim=False, metadata=dict([]), buffer_size=0):
         """save data within the hdf5 file together with axes data (if any) and metadata, node name will be 'Data'
 
         Parameters
@@ -1522,6 +1731,8 @@ class H5Saver(H5Backend, QObject):
         add_scan_dim: (bool) if True, the scan axes dimension (scan_shape iterable) is prepended to the array shape on the hdf5
                       In that case, the array is usually initialized as zero and further populated
         metadata: (dict) dictionnary whose keys will be saved as the array attributes
+        buffer_size: (int) number of rows buffered in memory before being appended to an enlargeable array
+                     (see H5Backend.create_earray)
 
         Returns
         -------
@@ -1533,7 +1744,7 @@ class H5Saver(H5Backend, QObject):
         """
 
         shape, dimension, size = utils.get_data_dimension(data_dict['data'])
-        tmp_data_dict = copy.deepcopy(data_dict)
+        tmp_data_dict = OrderedDict(data_dict)  # shallow copy, the arrays are not copied
 
         #save axis
         # this loop covers all type of axis : x_axis, y_axis... nav_x_axis, ...
@@ -1543,7 +1754,7 @@ class H5Saver(H5Backend, QObject):
                 array_to_save = tmp_data_dict[key]
                 tmp_dict = dict(label='', units='')
             else:
-                tmp_dict = copy.deepcopy(tmp_data_dict[key])
+                tmp_dict = OrderedDict(tmp_data_dict[key])
                 array_to_save = tmp_dict.pop('data')
                 tmp_data_dict.pop(key)
 
@@ -1558,7 +1769,8 @@ class H5Saver(H5Backend, QObject):
                                     title=title, data_shape=shape, enlargeable=enlargeable, data_dimension=dimension,
                                     scan_type=scan_type, scan_subtype=scan_subtype, scan_shape=scan_shape,
                                     array_to_save=array_to_save,
-                                    init=init, add_scan_dim=add_scan_dim, metadata=tmp_data_dict)
+                                    init=init, add_scan_dim=add_scan_dim, metadata=tmp_data_dict,
+                                    buffer_size=buffer_size)
 
         self.flush()
         return data_array
@@ -1566,14 +1778,14 @@ class H5Saver(H5Backend, QObject):
     def add_array(self, where, name, data_type, data_shape=None, data_dimension=None, scan_type='', scan_subtype='',
                   scan_shape=[],
                   title='', array_to_save=None, array_type=None, enlargeable=False, metadata=dict([]),
-                  init=False, add_scan_dim=False):
+                  init=False, add_scan_dim=False, buffer_size=0):
         """save data arrays on the hdf5 file together with metadata
         Parameters
         ----------
         where: (hdf5 node) node where to save the array
         name: (str) name of the array in the hdf5 file
-        data_type: (str) one of ['data', 'axis', 'live_scan', 'navigation_axis', 'external_h5', 'strings'], mandatory
-            so that the h5Browsr interpret correctly the array (see add_data)
+        data_type: (str) one of ['data', 'axis', 'live_scan', 'navigation_axis', 'external_h5', 'strings',
+            'scan_timing'], mandatory so that the h5Browsr interpret correctly the array (see add_data)
         data_shape: (iterable) the shape of the array to save, mandatory if array_to_save is None
         data_dimension: (str) one of ['0D', '1D', '2D', 'ND']
         scan_type: (str) either '', 'scan1D' or 'scan2D'
@@ -1587,7 +1799,11 @@ class H5Saver(H5Backend, QObject):
         init: (bool) if True, the array saved in the h5 file is initialized with the correct type but all element equal
                      to zero. Else, the 'data' key of data_dict is saved as is
         add_scan_dim: if True, the scan axes dimension (scan_shape iterable) is prepended to the array shape on the hdf5
-                      In that case, the array is usually initialized as zero and further populated
+                      In that case, the array is usually initialized as zero and further populated. The array is
+                      then chunked such as each scan point is written in a single chunk and is lazily allocated
+                      (see get_chunk_shape)
+        buffer_size: (int) number of rows buffered in memory before being appended to an enlargeable array
+                     (see H5Backend.create_earray)
 
         Returns
         -------
@@ -1615,15 +1831,23 @@ class H5Saver(H5Backend, QObject):
             if data_shape == (1,):
                 data_shape = None
             array = self.create_earray(where, utils.capitalize(name), dtype=np.dtype(array_type),
-                                       data_shape=data_shape, title=title)
+                                       data_shape=data_shape, title=title, buffer_size=buffer_size)
         else:
             if add_scan_dim:  #means it is an array initialization to zero
                 shape = list(scan_shape[:])
                 shape.extend(data_shape)
+                chunk_shape = get_chunk_shape(scan_shape, data_shape, array_type)
                 if init or array_to_save is None:
-                    array_to_save = np.zeros(shape)
-
-            array = self.create_carray(where, utils.capitalize(name), obj=array_to_save,  title=title)
+                    # lazy allocation on disk: nothing is written before the first scan point is saved
+                    array = self.create_carray(where, utils.capitalize(name), shape=shape, dtype=array_type,
+                                               chunk_shape=chunk_shape, title=title)
+                else:
+                    if tuple(array_to_save.shape) != tuple(shape):
+                        chunk_shape = None
+                    array = self.create_carray(where, utils.capitalize(name), obj=array_to_save, title=title,
+                                               chunk_shape=chunk_shape)
+            else:
+                array = self.create_carray(where, utils.capitalize(name), obj=array_to_save,  title=title)
         self.set_attr(array, 'type', data_type)
         self.set_attr(array, 'data_dimension', data_dimension)
         self.set_attr(array, 'scan_type', scan_type)
@@ -1773,6 +1997,132 @@ class H5Saver(H5Backend, QObject):
             self.analysis_prog = H5Browser(form, h5file=self.h5file)
         form.show()
 
+class H5Writer(QThread):
+    """Thread dedicated to the writing of data into the arrays of a h5 file
+
+    Writing operations are queued point by point (a point being a list of writing operations, for instance all
+    the channels of all detectors at a given scan step) into a bounded queue. The caller is blocked when the queue is
+    full (back-pressure). The thread writes all the points waiting in the queue in a single batch and flushes the file
+    every flush_points written points or every flush_time seconds, whichever comes first.
+    An error raised while writing is stored and raised as a H5WriterError at the next call of put_point or stop
+
+    Parameters
+    ----------
+    h5saver: (H5Backend) the object whose file is flushed. Its arrays should be accessed only by this thread
+             while it is running
+    queue_size: (int) maximum number of points waiting to be written
+    flush_points: (int) the file is flushed every flush_points written points
+    flush_time: (float) the file is flushed at least every flush_time seconds (if points have been written)
+
+    See Also
+    --------
+    DAQ_Scan_Acquisition
+    """
+    def __init__(self, h5saver, queue_size=100, flush_points=50, flush_time=1.):
+        super().__init__()
+        self.h5saver = h5saver
+        self.flush_points = max(1, flush_points)
+        self.flush_time = flush_time
+        self.Npoints_written = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._error = None
+
+    @staticmethod
+    def write_operations(operations):
+        """Execute a list of writing operations
+
+        Parameters
+        ----------
+        operations: (list of tuple) each tuple is (array, indexes, data). If indexes is None, data is appended to the
+                    array (EARRAY), otherwise it is set as array[indexes] = data
+        """
+        for array, indexes, data in operations:
+            if indexes is None:
+                array.append(data)
+            else:
+                array.__setitem__(indexes, data)
+
+    def put_point(self, operations, timeout=None, copy=True):
+        """Queue the writing operations of one point. The data arrays are copied when queued, so that the caller may
+        modify or reuse them while they wait to be written
+
+        Parameters
+        ----------
+        operations: (list of tuple) see write_operations
+        timeout: (float or None) maximum waiting time if the queue is full, None means waiting until a slot is free
+        copy: (bool) if False, only references to the data are queued: they should then not be modified after this call
+
+        Raises
+        ------
+        H5WriterError if an error occurred previously on the writer side
+        queue.Full if timeout is not None and no slot got available
+        """
+        self.check_error()
+        if copy:
+            operations = [(array, indexes, np.array(data, copy=True)) for array, indexes, data in operations]
+        self._queue.put(operations, timeout=timeout)
+
+    def check_error(self):
+        if self._error is not None:
+            raise H5WriterError(f'Error while writing data: {str(self._error)}') from self._error
+
+    @property
+    def Npoints_pending(self):
+        return self._queue.qsize()
+
+    def stop(self):
+        """Write all queued points, flush the file and stop the thread
+
+        Raises
+        ------
+        H5WriterError if an error occurred on the writer side
+        """
+        if self.isRunning():
+            self._queue.put(None)
+            self.wait()
+        self.check_error()
+
+    def run(self):
+        Nunflushed = 0
+        last_flush = time.perf_counter()
+        running = True
+        while running:
+            timeout = None
+            if Nunflushed != 0:
+                timeout = max(0., self.flush_time - (time.perf_counter() - last_flush))
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+                while True:  # get all the points waiting in the queue
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for operations in batch:
+                if operations is None:
+                    running = False
+                    break
+                if self._error is None:  # after an error, the queue is still emptied so that the caller is not blocked
+                    try:
+                        self.write_operations(operations)
+                        Nunflushed += 1
+                        self.Npoints_written += 1
+                    except Exception as e:
+                        logger.exception(str(e))
+                        self._error = e
+
+            if Nunflushed != 0 and (not running or Nunflushed >= self.flush_points or
+                                    time.perf_counter() - last_flush >= self.flush_time):
+                try:
+                    self.h5saver.flush()
+                except Exception as e:
+                    logger.exception(str(e))
+                    if self._error is None:
+                        self._error = e
+                Nunflushed = 0
+                last_flush = time.perf_counter()
+
+
 def find_scan_node(scan_node):
     """
     utility function to find the parent node of "scan" type, meaning some of its children (DAQ_scan case)
@@ -1808,6 +2158,15 @@ def find_scan_node(scan_node):
 class H5BrowserUtil(H5Backend):
     def __init__(self, backend='tables'):
         super().__init__(backend=backend)
+        self._axes_cache = dict([])  # parsed axes of the data nodes, see get_h5_data
+
+    def open_file(self, fullpathname, mode='r', title='PyMoDAQ file', **kwargs):
+        self._axes_cache = dict([])
+        return super().open_file(fullpathname, mode=mode, title=title, **kwargs)
+
+    def close_file(self):
+        self._axes_cache = dict([])
+        super().close_file()
 
     def export_data(self, node_path='/', filesavename='datafile.txt'):
         if filesavename != '':
@@ -1887,126 +2246,168 @@ class H5BrowserUtil(H5Backend):
 
         return attr_dict, settings, scan_settings, pixmaps
 
-    def get_h5_data(self, node_path):
-        """
+    def get_h5_data(self, node_path, lazy=False):
+        """Read the data of an array node together with the axes stored in its parent group
+
+        Parameters
+        ----------
+        node_path: (str) path of the array node
+        lazy: (bool) if True, numerical data are returned as a LazyArray: nothing is read from the file before the
+              array is sliced and then only the chunks covered by the slices are read
+
+        Returns
+        -------
+        data: (ndarray, LazyArray or list) the squeezed data (a list for string arrays)
+        axes: (dict) Axis objects (x_axis, y_axis, nav_x_axis...)
+        nav_axes: (list of int) indexes of the navigation axes
+        is_spread: (bool) True if the data come from a spread (adaptive) scan
+
+        See Also
+        --------
+        LazyArray
         """
         node = self.get_node(node_path)
         data = None
         is_spread = False
         if 'ARRAY' in node.attrs['CLASS']:
-            data = node.read()
-            nav_axes = []
-            axes = dict([])
-            if isinstance(data, np.ndarray):
-                data = np.squeeze(data)
-                if 'type' in node.attrs.attrs_name:
-                    if 'data' in node.attrs['type'] or 'channel' in node.attrs['type'].lower():
-                        parent_path = node.parent_node.path
-                        children = node.parent_node.children_name()
-
-                        if 'data_dimension' not in node.attrs.attrs_name:  # for backcompatibility
-                            data_dim = node.attrs['data_type']
-                        else:
-                            data_dim = node.attrs['data_dimension']
-                        if 'scan_subtype' in node.attrs.attrs_name:
-                            if node.attrs['scan_subtype'].lower() == 'adaptive':
-                                is_spread = True
-                        tmp_axes = ['x_axis', 'y_axis']
-                        for ax in tmp_axes:
-                            if capitalize(ax) in children:
-                                axis_node = self.get_node(parent_path + '/{:s}'.format(capitalize(ax)))
-                                axes[ax] = Axis(data=axis_node.read())
-                                if 'units' in axis_node.attrs.attrs_name:
-                                    axes[ax]['units'] = axis_node.attrs['units']
-                                if 'label' in axis_node.attrs.attrs_name:
-                                    axes[ax]['label'] = axis_node.attrs['label']
-                            else:
-                                axes[ax] = Axis()
-
-                        if data_dim == 'ND':  # check for navigation axis
-                            tmp_nav_axes = ['y_axis', 'x_axis', ]
-                            nav_axes = []
-                            for ind_ax, ax in enumerate(tmp_nav_axes):
-                                if 'Nav_{:s}'.format(ax) in children:
-                                    nav_axes.append(ind_ax)
-                                    axis_node = self.get_node(parent_path + '/Nav_{:s}'.format(ax))
-                                    if is_spread:
-                                        axes['nav_{:s}'.format(ax)] = Axis(data=axis_node.read())
-                                    else:
-                                        axes['nav_{:s}'.format(ax)] = Axis(data=np.unique(axis_node.read()))
-                                        if axes['nav_{:s}'.format(ax)]['data'].shape[0] != data.shape[
-                                            ind_ax]:  # could happen in case of linear back to start type of scan
-                                            tmp_ax = []
-                                            for ix in axes['nav_{:s}'.format(ax)]['data']:
-                                                tmp_ax.extend([ix, ix])
-                                                axes['nav_{:s}'.format(ax)] = Axis(data=np.array(tmp_ax))
-
-                                    if 'units' in axis_node.attrs.attrs_name:
-                                        axes['nav_{:s}'.format(ax)]['units'] = axis_node.attrs['units']
-                                    if 'label' in axis_node.attrs.attrs_name:
-                                        axes['nav_{:s}'.format(ax)]['label'] = axis_node.attrs['label']
-
-                        if 'scan_type' in node.attrs.attrs_name:
-                            scan_type = node.attrs['scan_type'].lower()
-                            #if scan_type == 'scan1d' or scan_type == 'scan2d':
-                            scan_node, nav_children = find_scan_node(node)
-                            nav_axes = []
-                            if scan_type == 'tabular' or is_spread:
-                                datas = []
-                                labels = []
-                                all_units = []
-                                for axis_node in nav_children:
-                                    npts = axis_node.attrs['shape'][0]
-                                    datas.append(axis_node.read())
-                                    labels.append(axis_node.attrs['label'])
-                                    all_units.append(axis_node.attrs['units'])
-
-                                nav_axes.append(0)
-                                axes[f'nav_x_axis'] = Axis(data=np.linspace(0, npts-1, npts),
-                                                           nav_index=nav_axes[-1],
-                                                           units='',
-                                                           label='Scan index',
-                                                           labels=labels,
-                                                           datas=datas,
-                                                           all_units=all_units)
-                            else :
-                                for axis_node in nav_children:
-                                    nav_axes.append(axis_node.attrs['nav_index'])
-                                    if is_spread:
-                                        axes[f'nav_{nav_axes[-1]:02d}'] = Axis(data=axis_node.read(),
-                                                                               nav_index=nav_axes[-1])
-                                    else:
-                                        axes[f'nav_{nav_axes[-1]:02d}'] = Axis(data=np.unique(axis_node.read()),
-                                                                           nav_index=nav_axes[-1])
-                                        if nav_axes[-1] < len(data.shape):
-                                            if axes[f'nav_{nav_axes[-1]:02d}']['data'].shape[0] != data.shape[nav_axes[-1]]:  # could happen in case of linear back to start type of scan
-                                                tmp_ax = []
-                                                for ix in axes[f'nav_{nav_axes[-1]:02d}']['data']:
-                                                    tmp_ax.extend([ix, ix])
-                                                    axes[f'nav_{nav_axes[-1]:02d}'] = Axis(data=np.array(tmp_ax),
-                                                                                           nav_index=nav_axes[-1])
-
-                                    if 'units' in axis_node.attrs.attrs_name:
-                                        axes[f'nav_{nav_axes[-1]:02d}']['units'] = axis_node.attrs[
-                                            'units']
-                                    if 'label' in axis_node.attrs.attrs_name:
-                                        axes[f'nav_{nav_axes[-1]:02d}']['label'] = axis_node.attrs[
-                                            'label']
-                    elif 'axis' in node.attrs['type']:
-                        axis_node = node
-                        axes['y_axis'] = Axis(data=axis_node.read())
-                        if 'units' in axis_node.attrs.attrs_name:
-                            axes['y_axis']['units'] = axis_node.attrs['units']
-                        if 'label' in axis_node.attrs.attrs_name:
-                            axes['y_axis']['label'] = axis_node.attrs['label']
-                        axes['x_axis'] = Axis(data=np.linspace(0, axis_node.attrs['shape'][0] - 1, axis_node.attrs['shape'][0]),
-                                              units='pxls',
-                                              label='')
+            if lazy and not isinstance(node, VLARRAY):
+                data = LazyArray(node)
+            else:
+                data = node.read()
+                if isinstance(data, np.ndarray):
+                    data = np.squeeze(data)
+            if isinstance(data, (np.ndarray, LazyArray)):
+                # axes parsing reads all the axis nodes: done once per node
+                if node.path not in self._axes_cache:
+                    self._axes_cache[node.path] = self.get_h5_axes(node, data.shape)
+                axes, nav_axes, is_spread = deepcopy(self._axes_cache[node.path])
                 return data, axes, nav_axes, is_spread
 
             elif isinstance(data, list):
                 return data, [], [], is_spread
 
+    def get_h5_axes(self, node, data_shape):
+        """Parse the axes of a data node from its attributes and its sibling nodes
+
+        Parameters
+        ----------
+        node: (CARRAY) the data node
+        data_shape: (tuple) the squeezed shape of the data
+
+        Returns
+        -------
+        axes: (dict) Axis objects (x_axis, y_axis, nav_x_axis...)
+        nav_axes: (list of int) indexes of the navigation axes
+        is_spread: (bool) True if the data come from a spread (adaptive) scan
+        """
+        nav_axes = []
+        axes = dict([])
+        is_spread = False
+        if 'type' in node.attrs.attrs_name:
+            if 'data' in node.attrs['type'] or 'channel' in node.attrs['type'].lower():
+                parent_path = node.parent_node.path
+                children = node.parent_node.children_name()
+
+                if 'data_dimension' not in node.attrs.attrs_name:  # for backcompatibility
+                    data_dim = node.attrs['data_type']
+                else:
+                    data_dim = node.attrs['data_dimension']
+                if 'scan_subtype' in node.attrs.attrs_name:
+                    if node.attrs['scan_subtype'].lower() == 'adaptive':
+                        is_spread = True
+                tmp_axes = ['x_axis', 'y_axis']
+                for ax in tmp_axes:
+                    if capitalize(ax) in children:
+                        axis_node = self.get_node(parent_path + '/{:s}'.format(capitalize(ax)))
+                        axes[ax] = Axis(data=axis_node.read())
+                        if 'units' in axis_node.attrs.attrs_name:
+                            axes[ax]['units'] = axis_node.attrs['units']
+                        if 'label' in axis_node.attrs.attrs_name:
+                            axes[ax]['label'] = axis_node.attrs['label']
+                    else:
+                        axes[ax] = Axis()
+
+                if data_dim == 'ND':  # check for navigation axis
+                    tmp_nav_axes = ['y_axis', 'x_axis', ]
+                    nav_axes = []
+                    for ind_ax, ax in enumerate(tmp_nav_axes):
+                        if 'Nav_{:s}'.format(ax) in children:
+                            nav_axes.append(ind_ax)
+                            axis_node = self.get_node(parent_path + '/Nav_{:s}'.format(ax))
+                            if is_spread:
+                                axes['nav_{:s}'.format(ax)] = Axis(data=axis_node.read())
+                            else:
+                                axes['nav_{:s}'.format(ax)] = Axis(data=np.unique(axis_node.read()))
+                                if axes['nav_{:s}'.format(ax)]['data'].shape[0] != data_shape[
+                                    ind_ax]:  # could happen in case of linear back to start type of scan
+                                    tmp_ax = []
+                                    for ix in axes['nav_{:s}'.format(ax)]['data']:
+                                        tmp_ax.extend([ix, ix])
+                                        axes['nav_{:s}'.format(ax)] = Axis(data=np.array(tmp_ax))
+
+                            if 'units' in axis_node.attrs.attrs_name:
+                                axes['nav_{:s}'.format(ax)]['units'] = axis_node.attrs['units']
+                            if 'label' in axis_node.attrs.attrs_name:
+                                axes['nav_{:s}'.format(ax)]['label'] = axis_node.attrs['label']
+
+                if 'scan_type' in node.attrs.attrs_name:
+                    scan_type = node.attrs['scan_type'].lower()
+                    #if scan_type == 'scan1d' or scan_type == 'scan2d':
+                    scan_node, nav_children = find_scan_node(node)
+                    nav_axes = []
+                    if scan_type == 'tabular' or is_spread:
+                        datas = []
+                        labels = []
+                        all_units = []
+                        for axis_node in nav_children:
+                            npts = axis_node.attrs['shape'][0]
+                            datas.append(axis_node.read())
+                            labels.append(axis_node.attrs['label'])
+                            all_units.append(axis_node.attrs['units'])
+
+                        nav_axes.append(0)
+                        axes[f'nav_x_axis'] = Axis(data=np.linspace(0, npts-1, npts),
+                                                   nav_index=nav_axes[-1],
+                                                   units='',
+                                                   label='Scan index',
+                                                   labels=labels,
+                                                   datas=datas,
+                                                   all_units=all_units)
+                    else :
+                        for axis_node in nav_children:
+                            nav_axes.append(axis_node.attrs['nav_index'])
+                            if is_spread:
+                                axes[f'nav_{nav_axes[-1]:02d}'] = Axis(data=axis_node.read(),
+                                                                       nav_index=nav_axes[-1])
+                            else:
+                                axes[f'nav_{nav_axes[-1]:02d}'] = Axis(data=np.unique(axis_node.read()),
+                                                                   nav_index=nav_axes[-1])
+                                if nav_axes[-1] < len(data_shape):
+                                    if axes[f'nav_{nav_axes[-1]:02d}']['data'].shape[0] != data_shape[nav_axes[-1]]:  # could happen in case of linear back to start type of scan
+                                        tmp_ax = []
+                                        for ix in axes[f'nav_{nav_axes[-1]:02d}']['data']:
+                                            tmp_ax.extend([ix, ix])
+                                            axes[f'nav_{nav_axes[-1]:02d}'] = Axis(data=np.array(tmp_ax),
+                                                                                   nav_index=nav_axes[-1])
+
+                            if 'units' in axis_node.attrs.attrs_name:
+                                axes[f'nav_{nav_axes[-1]:02d}']['units'] = axis_node.attrs[
+                                    'units']
+                            if 'label' in axis_node.attrs.attrs_name:
+                                axes[f'nav_{nav_axes[-1]:02d}']['label'] = axis_node.attrs[
+                                    'label']
+            elif 'axis' in node.attrs['type']:
+                axis_node = node
+                axes['y_axis'] = Axis(data=axis_node.read())
+                if 'units' in axis_node.attrs.attrs_name:
+                    axes['y_axis']['units'] = axis_node.attrs['units']
+                if 'label' in axis_node.attrs.attrs_name:
+                    axes['y_axis']['label'] = axis_node.attrs['label']
+                axes['x_axis'] = Axis(data=np.linspace(0, axis_node.attrs['shape'][0] - 1, axis_node.attrs['shape'][0]),
+                                      units='pxls',
+                                      label='')
+        return axes, nav_axes, is_spread
+
 class H5Browser(QObject):
     """UI used to explore h5 files, plot and export subdatas"""
     data_node_signal = pyqtSignal(str) # the path of a node where data should be monitored, displayed...whatever use from the caller
@@ -2292,8 +2693,8 @@ class H5Browser(QObject):
             node = self.h5utils.get_node(self.current_node_path)
             self.data_node_signal.emit(self.current_node_path)
             if 'ARRAY' in node.attrs['CLASS']:
-                data, axes, nav_axes, is_spread = self.h5utils.get_h5_data(self.current_node_path)
-                if isinstance(data, np.ndarray):
+                data, axes, nav_axes, is_spread = self.h5utils.get_h5_data(self.current_node_path, lazy=True)
+                if isinstance(data, LazyArray):
                     if 'scan_type' in node.attrs.attrs_name:
                         scan_type = node.attrs['scan_type']
                     else:
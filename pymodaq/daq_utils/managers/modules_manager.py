@@ -1,7 +1,6 @@
 from collections import OrderedDict
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QEvent, QBuffer, QIODevice, QLocale, Qt, QVariant, QModelIndex
 from PyQt5 import QtGui, QtWidgets, QtCore
-import time
 import numpy as np
 from pymodaq.daq_utils import daq_utils as utils
 
@@ -51,9 +50,9 @@ class ModulesManager(QObject):
         self.timeout = timeout  #in ms
 
         self.det_done_datas = OrderedDict()
-        self.det_done_flag = False
+        self._det_done_waiter = utils.EventWaiter()
         self.move_done_positions = OrderedDict()
-        self.move_done_flag = False
+        self._move_done_waiter = utils.EventWaiter()
 
         self.settings = Parameter.create(name='Settings', type='group', children=self.params)
         self.settings_tree = ParameterTree()
@@ -74,6 +73,54 @@ class ModulesManager(QObject):
         self.set_actuators(actuators, selected_actuators)
         self.set_detectors(detectors, selected_detectors)
 
+    @property
+    def det_done_flag(self):
+        return self._det_done_waiter.is_set()
+
+    @det_done_flag.setter
+    def det_done_flag(self, done):
+        if done:
+            self._det_done_waiter.set()
+        else:
+            self._det_done_waiter.clear()
+
+    @property
+    def move_done_flag(self):
+        return self._move_done_waiter.is_set()
+
+    @move_done_flag.setter
+    def move_done_flag(self, done):
+        if done:
+            self._move_done_waiter.set()
+        else:
+            self._move_done_waiter.clear()
+
+    def wait_for_det_done(self, timeout=None):
+        """Wait (without polling) until all the selected detectors returned their data
+
+        Parameters
+        ----------
+        timeout: (int) maximum waiting time in ms, default to the timeout attribute
+
+        Returns
+        -------
+        bool: False if the timeout has been reached
+        """
+        return self._det_done_waiter.wait(self.timeout if timeout is None else timeout)
+
+    def wait_for_move_done(self, timeout=None):
+        """Wait (without polling) until all the selected actuators reached their positions
+
+        Parameters
+        ----------
+        timeout: (int) maximum waiting time in ms, default to the timeout attribute
+
+        Returns
+        -------
+        bool: False if the timeout has been reached
+        """
+        return self._move_done_waiter.wait(self.timeout if timeout is None else timeout)
+
     @classmethod
     def get_names(cls, modules):
         if not hasattr(modules, '__iter__'):
@@ -208,19 +255,13 @@ class ModulesManager(QObject):
         self.det_done_datas = OrderedDict()
         self.det_done_flag = False
         self.settings.child(('det_done')).setValue(self.det_done_flag)
-        tzero = time.perf_counter()
 
         for sig in [mod.command_detector for mod in self.detectors]:
             sig.emit(utils.ThreadCommand("single", [1, kwargs]))
 
-        while not self.det_done_flag:
-            #wait for grab done signals to end
-
-            QtWidgets.QApplication.processEvents()
-            if time.perf_counter()-tzero > self.timeout:
-                self.timeout_signal.emit(True)
-                logger.error('Timeout Fired during waiting for data to be acquired')
-                break
+        if not self.wait_for_det_done():
+            self.timeout_signal.emit(True)
+            logger.error('Timeout Fired during waiting for data to be acquired')
 
         self.det_done_signal.emit(self.det_done_datas)
         return self.det_done_datas
@@ -273,7 +314,20 @@ class ModulesManager(QObject):
 
 
 
-    def move_actuators(self, positions):
+    def move_actuators(self, positions, polling=True):
+        """Send the move commands to the selected actuators and wait for them to reach the positions
+
+        Parameters
+        ----------
+        positions: (list or dict) the target positions (in the order of the selected actuators or with their names as
+            keys)
+        polling: (bool) if False, returns as soon as the commands are sent, wait_move_actuators has then to be called
+            to get the reached positions
+
+        Returns
+        -------
+        OrderedDict: the reached positions with the actuator names as keys
+        """
         self.move_done_positions = OrderedDict()
         self.move_done_flag = False
         self.settings.child(('move_done')).setValue(self.move_done_flag)
@@ -296,14 +350,20 @@ class ModulesManager(QObject):
             logger.error('Invalid number of positions compared to selected actuators')
             return self.move_done_positions
 
-        tzero = time.perf_counter()
+        if polling:
+            return self.wait_move_actuators()
+        return self.move_done_positions
+
+    def wait_move_actuators(self):
+        """Wait for the end of a move started with move_actuators(positions, polling=False)
 
-        while not self.move_done_flag:
-            QtWidgets.QApplication.processEvents()
-            if time.perf_counter()-tzero > self.timeout:
-                self.timeout_signal.emit(True)
-                logger.error('Timeout Fired during waiting for data to be acquired')
-                break
+        Returns
+        -------
+        OrderedDict: the reached positions with the actuator names as keys
+        """
+        if not self.wait_for_move_done():
+            self.timeout_signal.emit(True)
+            logger.error('Timeout Fired during waiting for actuators to be moved')
 
         self.move_done_signal.emit(self.move_done_positions)
         return self.move_done_positions
@@ -91,6 +91,45 @@ class EllipseROI(pgROI):
     def emit_index_signal(self):
         self.index_signal.emit(self.index)
 
+    def contains_local_points(self, xs, ys):
+        """
+        Vectorized test of the ellipse shape on points expressed in the ROI local coordinates
+
+        Parameters
+        ----------
+        xs: (ndarray) x coordinates of the points
+        ys: (ndarray) y coordinates of the points
+
+        Returns
+        -------
+        ndarray of bool
+        """
+        r = self.boundingRect()
+        a = r.width() / 2
+        b = r.height() / 2
+        if a == 0 or b == 0:
+            return np.zeros(np.shape(xs), dtype=bool)
+        return ((xs - r.center().x()) / a) ** 2 + ((ys - r.center().y()) / b) ** 2 <= 1
+
+    def region_mask(self, Nrows, Ncols):
+        """
+        Get the elliptical mask of the pixels covered by the ROI bounding rectangle, same as the one used by
+        getArrayRegion
+
+        Parameters
+        ----------
+        Nrows: (int) number of pixels covered by the ROI along the axis 0 of the image
+        Ncols: (int) number of pixels covered by the ROI along the axis 1 of the image
+
+        Returns
+        -------
+        ndarray of bool of shape (Nrows, Ncols)
+        """
+        if Nrows == 0 or Ncols == 0:
+            return np.zeros((Nrows, Ncols), dtype=bool)
+        rows, cols = np.ogrid[:Nrows, :Ncols]
+        return ((rows + 0.5) / (Nrows / 2.) - 1) ** 2 + ((cols + 0.5) / (Ncols / 2.) - 1) ** 2 < 1
+
     def getArrayRegion(self, arr, img=None, axes=(0, 1), **kwds):
         """
         Return the result of ROI.getArrayRegion() masked by the elliptical shape
@@ -158,6 +197,216 @@ class RectROI(pgROI):
     def emit_index_signal(self):
         self.index_signal.emit(self.index)
 
+    def contains_local_points(self, xs, ys):
+        """
+        Vectorized test of the rectangular shape on points expressed in the ROI local coordinates
+
+        Parameters
+        ----------
+        xs: (ndarray) x coordinates of the points
+        ys: (ndarray) y coordinates of the points
+
+        Returns
+        -------
+        ndarray of bool
+        """
+        r = QtCore.QRectF(0, 0, self.state['size'][0], self.state['size'][1]).normalized()
+        return (xs >= r.left()) & (xs <= r.right()) & (ys >= r.top()) & (ys <= r.bottom())
+
+
+def points_in_polygon(xs, ys, polygon):
+    """
+    Vectorized even-odd rule test of points against a closed polygon
+
+    Parameters
+    ----------
+    xs: (ndarray) x coordinates of the points
+    ys: (ndarray) y coordinates of the points
+    polygon: (ndarray) of shape (Nvertices, 2) with the (x, y) coordinates of the polygon vertices
+
+    Returns
+    -------
+    ndarray of bool
+    """
+    xs = np.asarray(xs)
+    ys = np.asarray(ys)
+    inside = np.zeros(xs.shape, dtype=bool)
+    if len(polygon) < 3:
+        return inside
+    xj, yj = polygon[-1]
+    for xi, yi in polygon:
+        if yi != yj:
+            crossing = (yi > ys) != (yj > ys)
+            x_cross = (xj - xi) * (ys - yi) / (yj - yi) + xi
+            inside ^= crossing & (xs < x_cross)
+        xj, yj = xi, yi
+    return inside
+
+
+def map_to_roi(roi, xs, ys):
+    """
+    Map points from the ROI parent coordinates (the ones of the displayed data) to the ROI local coordinates
+    taking into account the ROI position and rotation
+
+    Parameters
+    ----------
+    roi: (pyqtgraph ROI)
+    xs: (ndarray) x coordinates of the points
+    ys: (ndarray) y coordinates of the points
+
+    Returns
+    -------
+    tuple of ndarray: the local x and y coordinates
+    """
+    dx = np.asarray(xs, dtype=float) - roi.pos().x()
+    dy = np.asarray(ys, dtype=float) - roi.pos().y()
+    angle = np.deg2rad(roi.angle())
+    if angle == 0:
+        return dx, dy
+    cos = np.cos(angle)
+    sin = np.sin(angle)
+    return cos * dx + sin * dy, cos * dy - sin * dx
+
+
+def roi_contains_points(roi, xs, ys):
+    """
+    Vectorized equivalent of roi.shape().contains(point) for many points given in the ROI parent coordinates.
+    ROIs exposing a contains_local_points method (RectROI, EllipseROI) use a closed form test, the shape of any
+    other ROI is converted to a polygon tested with the even-odd rule
+
+    Parameters
+    ----------
+    roi: (pyqtgraph ROI)
+    xs: (ndarray) x coordinates of the points
+    ys: (ndarray) y coordinates of the points
+
+    Returns
+    -------
+    ndarray of bool
+    """
+    u, v = map_to_roi(roi, xs, ys)
+    if hasattr(roi, 'contains_local_points'):
+        return roi.contains_local_points(u, v)
+    polygon = np.array([[point.x(), point.y()] for point in roi.shape().toFillPolygon()])
+    return points_in_polygon(u, v, polygon)
+
+
+def roi_array_region(roi, shape, axis_order='col-major'):
+    """
+    Get the pixels of an image covered by an axis aligned ROI as integer index slices, so that the ROI data can be
+    sliced instead of interpolated as in getArrayRegion. The image is the one displayed by an ImageItem with the
+    given axisOrder: in 'col-major' (the pyqtgraph default, used by Viewer2D) the pixel [i, j] spans [i, i+1[ along x
+    and [j, j+1[ along y in the ROI parent coordinates, in 'row-major' it spans [j, j+1[ along x and [i, i+1[ along y.
+    The ROI bounds are rounded to the nearest pixel edges. The sliced data is then the same as the one returned by
+    getArrayRegion with axes=(0, 1).
+
+    Parameters
+    ----------
+    roi: (pyqtgraph ROI)
+    shape: (tuple of int) shape of the image
+    axis_order: (str) either 'col-major' or 'row-major', see ImageItem axisOrder
+
+    Returns
+    -------
+    tuple: the slices along the axes 0 and 1 of the image clipped to it and the boolean mask of the sliced region
+           (None for ROIs without region_mask method such as RectROI), or None if the ROI is rotated
+    """
+    if roi.angle() != 0:
+        return None
+    r = QtCore.QRectF(roi.pos().x(), roi.pos().y(), roi.state['size'][0], roi.state['size'][1]).normalized()
+    bounds = [(int(np.rint(r.left())), int(np.rint(r.right()))), (int(np.rint(r.top())), int(np.rint(r.bottom())))]
+    if axis_order == 'row-major':
+        bounds = bounds[::-1]
+    slices = []
+    for (start, stop), size in zip(bounds, shape[:2]):
+        start_clipped = min(max(start, 0), size)
+        slices.append(slice(start_clipped, max(min(stop, size), start_clipped)))
+    mask = None
+    if hasattr(roi, 'region_mask'):
+        mask = roi.region_mask(bounds[0][1] - bounds[0][0], bounds[1][1] - bounds[1][0])[
+               slices[0].start - bounds[0][0]:slices[0].stop - bounds[0][0],
+               slices[1].start - bounds[1][0]:slices[1].stop - bounds[1][0]]
+    return tuple(slices), mask
+
+
+def roi_parent_bounds(roi):
+    """
+    Get the bounding box of a (possibly rotated) ROI in its parent coordinates
+
+    Returns
+    -------
+    tuple of float: xmin, xmax, ymin, ymax
+    """
+    r = QtCore.QRectF(0, 0, roi.state['size'][0], roi.state['size'][1]).normalized()
+    xs = np.array([r.left(), r.right(), r.right(), r.left()])
+    ys = np.array([r.top(), r.top(), r.bottom(), r.bottom()])
+    angle = np.deg2rad(roi.angle())
+    cos = np.cos(angle)
+    sin = np.sin(angle)
+    xp = cos * xs - sin * ys + roi.pos().x()
+    yp = sin * xs + cos * ys + roi.pos().y()
+    return xp.min(), xp.max(), yp.min(), yp.max()
+
+
+class PointsGrid:
+    """
+    Spatial index of scattered points bucketing them on a regular grid. Getting the points lying in a given bounding
+    box only looks at the grid cells overlapping the box, so that ROIs covering a small part of the points don't
+    scan all of them. Build it once per dataset and reuse it while the ROIs are moved.
+
+    Parameters
+    ----------
+    xs: (ndarray) x coordinates of the points
+    ys: (ndarray) y coordinates of the points
+    Nbins: (int) number of cells along each axis, default such as there are about 16 points per cell
+    """
+
+    def __init__(self, xs, ys, Nbins=None):
+        self.xs = np.array(xs, dtype=float)
+        self.ys = np.array(ys, dtype=float)
+        Npts = self.xs.size
+        if Nbins is None:
+            Nbins = int(np.clip(np.sqrt(Npts / 16), 1, 1024))
+        self.Nbins = Nbins
+        if Npts == 0:
+            self.xmin = self.xmax = self.ymin = self.ymax = 0.
+        else:
+            self.xmin, self.xmax = np.min(self.xs), np.max(self.xs)
+            self.ymin, self.ymax = np.min(self.ys), np.max(self.ys)
+        self.dx = (self.xmax - self.xmin) / Nbins or 1.
+        self.dy = (self.ymax - self.ymin) / Nbins or 1.
+
+        cells = self._cell_index(self.ys, self.ymin, self.dy) * Nbins + self._cell_index(self.xs, self.xmin, self.dx)
+        self.order = np.argsort(cells, kind='stable')
+        self.starts = np.searchsorted(cells[self.order], np.arange(Nbins * Nbins + 1))
+
+    def has_points(self, xs, ys):
+        """
+        Check if the index has been built from the given points, to know if it can be reused
+        """
+        return np.shape(xs) == self.xs.shape and np.array_equal(xs, self.xs) and np.array_equal(ys, self.ys)
+
+    def _cell_index(self, vals, vmin, step):
+        return np.clip(((vals - vmin) / step).astype(int), 0, self.Nbins - 1)
+
+    def indexes_in_bounds(self, xmin, xmax, ymin, ymax):
+        """
+        Get the indexes of the points lying in the grid cells overlapping the given bounding box. The returned
+        indexes are sorted and are a superset of the points within the box
+
+        Returns
+        -------
+        ndarray of int
+        """
+        if self.xs.size == 0 or xmax < self.xmin or xmin > self.xmax or ymax < self.ymin or ymin > self.ymax:
+            return np.array([], dtype=int)
+        ix0, ix1 = self._cell_index(np.array([xmin, xmax]), self.xmin, self.dx)
+        iy0, iy1 = self._cell_index(np.array([ymin, ymax]), self.ymin, self.dy)
+        indexes = np.concatenate([self.order[self.starts[iy * self.Nbins + ix0]:self.starts[iy * self.Nbins + ix1 + 1]]
+                                  for iy in range(iy0, iy1 + 1)])
+        indexes.sort()
+        return indexes
+
 
 class ROIManager(QObject):
     ROI_changed = pyqtSignal()
@@ -11,7 +11,7 @@ from pymodaq.daq_utils.plotting.qled import QLED
 from pymodaq.daq_utils.managers.preset_manager import PresetManager
 from pyqtgraph.dockarea import Dock
 
-from pymodaq.daq_utils.daq_utils import ThreadCommand, set_param_from_param, getLineInfo, set_logger, get_module_name, get_set_pid_path
+from pymodaq.daq_utils.daq_utils import ThreadCommand, EventWaiter, set_param_from_param, getLineInfo, set_logger, get_module_name, get_set_pid_path
 import importlib
 from simple_pid import PID
 import time
@@ -798,13 +798,33 @@ class PIDRunner(QObject):
         self.timer = self.startTimer(self.refreshing_ouput_time)
         self.det_done_datas = OrderedDict()
         self.move_done_positions = OrderedDict()
-        self.move_done_flag = False
-        self.det_done_flag = False
+        self._move_done_waiter = EventWaiter()
+        self._det_done_waiter = EventWaiter()
         self.paused = True
-        self.timeout_timer = QtCore.QTimer()
-        self.timeout_timer.setInterval(10000)
+        self.timeout_time = 10000  # in ms
         self.timeout_scan_flag = False
-        self.timeout_timer.timeout.connect(self.timeout)
+
+    @property
+    def det_done_flag(self):
+        return self._det_done_waiter.is_set()
+
+    @det_done_flag.setter
+    def det_done_flag(self, done):
+        if done:
+            self._det_done_waiter.set()
+        else:
+            self._det_done_waiter.clear()
+
+    @property
+    def move_done_flag(self):
+        return self._move_done_waiter.is_set()
+
+    @move_done_flag.setter
+    def move_done_flag(self, done):
+        if done:
+            self._move_done_waiter.set()
+        else:
+            self._move_done_waiter.clear()
 
 
     def timerEvent(self, event):
@@ -818,20 +838,16 @@ class PIDRunner(QObject):
         self.timeout_scan_flag = True
 
     def wait_for_det_done(self):
-        self.timeout_scan_flag=False
-        self.timeout_timer.start()
-        while not(self.det_done_flag or  self.timeout_scan_flag):
-            #wait for grab done signals to end
-            QtWidgets.QApplication.processEvents()
-        self.timeout_timer.stop()
+        self.timeout_scan_flag = False
+        # wait for grab done signals to end
+        if not self._det_done_waiter.wait(self.timeout_time):
+            self.timeout()
 
     def wait_for_move_done(self):
-        self.timeout_scan_flag=False
-        self.timeout_timer.start()
-        while not(self.move_done_flag or  self.timeout_scan_flag):
-            #wait for move done signals to end
-            QtWidgets.QApplication.processEvents()
-        self.timeout_timer.stop()
+        self.timeout_scan_flag = False
+        # wait for move done signals to end
+        if not self._move_done_waiter.wait(self.timeout_time):
+            self.timeout()
 
     @pyqtSlot(ThreadCommand)
     def queue_command(self, command=ThreadCommand()):
@@ -861,7 +877,7 @@ class PIDRunner(QObject):
                 self.refreshing_ouput_time = command.attributes[1]
                 self.timer = self.startTimer(self.refreshing_ouput_time)
             elif command.attributes[0] =='timeout':
-                self.timeout_timer.setInterval(command.attributes[1])
+                self.timeout_time = command.attributes[1]
 
 
         elif command.command == 'update_filter':
@@ -925,6 +941,7 @@ class PIDRunner(QObject):
                 self.output_to_actuator = self.model_class.convert_output(self.output, dt, stab=True)
 
                 if not self.paused:
+                    self.move_done_flag = False
                     self.move_done_positions = OrderedDict()
                     for ind_mov, cmd in enumerate(self.move_modules_commands):
                         cmd.emit(ThreadCommand('move_Abs',[self.output_to_actuator[ind_mov]]))
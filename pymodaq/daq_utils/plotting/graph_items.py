@@ -1,6 +1,6 @@
 from PyQt5 import QtCore, QtGui, Qt
 import pyqtgraph as pg
-from.plot_utils import makeAlphaTriangles, makePolygons
+from.plot_utils import makeAlphaTriangles, IncrementalTriangulation
 
 import numpy as np
 from pyqtgraph import debug as debug
@@ -201,6 +201,12 @@ class TriangulationItem(ImageItem):
         self.qimage = None
         self.triangulation = None
         self.tri_data = None
+        # points added to the image (spread scans) are inserted in the existing triangulation
+        self.triangulator = IncrementalTriangulation()
+        # pictures replayed at each paint: all the triangles, then the ones added by the following renders
+        self.pictures = []
+        self.max_pictures = 32
+        self._pictures_state = None
 
     def width(self):
         if self.image is None:
@@ -357,6 +363,7 @@ class TriangulationItem(ImageItem):
             #TODO adapt downsample
             #image = fn.downsample(self.image, xds, axis=axes[0])
             #image = fn.downsample(image, yds, axis=axes[1])
+            image = self.image  # triangles are not downsampled
             self._lastDownsample = (xds, yds)
         else:
             image = self.image
@@ -369,9 +376,79 @@ class TriangulationItem(ImageItem):
         # (most images are in row-major order)
 
 
-        self.triangulation, self.tri_data, rgba_values, alpha = makeAlphaTriangles(image, lut=lut, levels=levels, useRGBA=True)
-        polygons = makePolygons(self.triangulation)
-        self.qimage = dict(polygons=polygons, values=rgba_values, alpha=alpha)
+        tri = self.triangulator.set_points(image)
+        keys = self.triangulator.simplices_keys()
+        polygons = self.triangulator.polygons()
+        new_indexes = self.get_new_triangles(image, keys, lut, levels)
+        self.triangulation, tri_data, rgba_values, alpha = makeAlphaTriangles(image, lut=lut, levels=levels,
+                                                                              useRGBA=True, tri=tri,
+                                                                              simplices=new_indexes)
+        if new_indexes is None:
+            self.tri_data = tri_data
+            self.pictures = [self.record_triangles(polygons, rgba_values)]
+            self._pictures_state = dict(Noverlaid=0, Nrebuilds=self.triangulator.Nrebuilds,
+                                        levels=np.array(levels), lut=None if lut is None else np.array(lut))
+        else:
+            # the new triangles exactly cover the removed ones, they are drawn on top of the previous pictures
+            self.tri_data = np.mean(image[:, 2][tri.simplices], axis=1)
+            if len(new_indexes) != 0:
+                self.pictures.append(self.record_triangles(polygons[new_indexes], rgba_values))
+                self._pictures_state['Noverlaid'] += len(new_indexes)
+        self._pictures_state.update(keys=np.sort(keys), values=image[:, 2].copy())
+        self.qimage = dict(polygons=polygons, alpha=alpha, pictures=self.pictures)
+
+    def get_new_triangles(self, image, keys, lut, levels):
+        """
+        Get the triangles to be drawn on top of the current pictures: the ones added to the triangulation since the
+        last render. All the triangles are to be drawn again (None is returned) if the colors of the previous ones
+        may have changed (levels, lookup table or point values), if they are transparent, or if too many triangles
+        or pictures have been added since the pictures were rebuilt
+
+        Parameters
+        ----------
+        image: (ndarray) the points of shape (N, 3)
+        keys: (ndarray) the keys of the triangles (see IncrementalTriangulation.simplices_keys)
+        lut: (ndarray or None) the lookup table
+        levels: the levels
+
+        Returns
+        -------
+        ndarray or None: the indexes of the new triangles within the simplices of the triangulation
+        """
+        state = self._pictures_state
+        if state is None or len(state['keys']) == 0 or len(self.pictures) >= self.max_pictures or \
+                state['Noverlaid'] > len(state['keys']) / 4 or state['Nrebuilds'] != self.triangulator.Nrebuilds:
+            return None
+        if not np.array_equal(np.array(levels), state['levels']):
+            return None
+        if lut is None or state['lut'] is None:
+            if lut is not state['lut']:
+                return None
+        elif not np.array_equal(lut, state['lut']):
+            return None
+        elif lut.ndim == 2 and lut.shape[1] == 4 and np.any(lut[:, 3] != 255):  # overlaid triangles would blend
+            return None
+        values = state['values']
+        if len(image) < len(values) or not np.array_equal(image[:len(values), 2], values):
+            return None
+        indexes = np.minimum(np.searchsorted(state['keys'], keys), max(len(state['keys']) - 1, 0))
+        return np.nonzero(state['keys'][indexes] != keys)[0]
+
+    def record_triangles(self, polygons, rgba_values):
+        """Record the triangles in a QPicture replayed at each paint"""
+        picture = QtGui.QPicture()
+        painter = QtGui.QPainter(picture)
+        painter.setPen(fn.mkPen(255, 255, 255, 100, width=0.75))
+        # triangles don't overlap, they are drawn grouped by color to set each brush once
+        colors, color_indexes = np.unique(rgba_values, axis=0, return_inverse=True)
+        order = np.argsort(color_indexes, kind='stable')
+        bounds = np.searchsorted(color_indexes[order], np.arange(len(colors) + 1))
+        for ind_color, color in enumerate(colors):
+            painter.setBrush(fn.mkBrush(*color))
+            for pol in polygons[order[bounds[ind_color]:bounds[ind_color + 1]]]:
+                painter.drawPolygon(pol)
+        painter.end()
+        return picture
 
     def get_points_at(self, axis='x', val=0):
         """
@@ -436,10 +513,8 @@ class TriangulationItem(ImageItem):
 
         self.setTransform(self.dataTransform())
 
-        for pol, color in zip(self.qimage['polygons'], self.qimage['values']):
-            p.setPen(fn.mkPen(255, 255, 255, 100, width=0.75))
-            p.setBrush(fn.mkBrush(*color))
-            p.drawPolygon(pol)
+        for picture in self.qimage['pictures']:
+            p.drawPicture(0, 0, picture)
 
         profile('p.drawImage')
         if self.border is not None:
@@ -120,7 +120,207 @@ class AxisItem_Scaled(pg.AxisItem):
                 self.setRange(*newRange)
 
 
-def makeAlphaTriangles(data, lut=None, levels=None, scale=None, useRGBA=False):
+class MinMaxDecimator:
+    """
+    Peak preserving decimation of a 1D trace for display, depending on the displayed x range
+
+    A pyramid of the minimum and maximum of the trace over blocks of 2, 4, 8... samples is built once for each new
+    trace, then each call to decimate only slices the level matching the number of samples per pixel within the
+    displayed range, so that a trace of millions of samples is displayed with about two points per pixel, without
+    losing its peaks. The same decimator can be used for several plots of the same trace (for instance a plot and its
+    zoom) and the result of the last calls is cached, so nothing is computed again if neither the trace nor the range
+    changed.
+
+    Parameters
+    ----------
+    min_points: (int) traces with at most min_points samples (or with a non increasing x axis) are not decimated
+    """
+
+    def __init__(self, min_points=10000):
+        self.min_points = min_points
+        self.set_data(np.array([]), np.array([]))
+
+    def set_data(self, x, y):
+        """
+        Set a new trace, the pyramid being built at the next call to decimate
+
+        Parameters
+        ----------
+        x: (ndarray) the x axis, should be increasing for the trace to be decimated
+        y: (ndarray) the trace
+        """
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self._raw = (self.x, self.y)
+        self._levels = None
+        self._cache = []
+        self.decimable = self.y.ndim == 1 and self.y.size > self.min_points and self.x.shape == self.y.shape and \
+            bool(np.all(self.x[1:] >= self.x[:-1]))
+
+    def _build_levels(self):
+        """Build the list of (block size, minimums, maximums) for blocks of 2, 4, 8... samples"""
+        self._levels = []
+        self._ymin = np.min(self.y)
+        self._ymax = np.max(self.y)
+        block = 1
+        mins = maxs = self.y
+        while len(mins) > 1:
+            Npairs = len(mins) // 2
+            new_mins = np.minimum(mins[0:2 * Npairs:2], mins[1:2 * Npairs:2])
+            new_maxs = np.maximum(maxs[0:2 * Npairs:2], maxs[1:2 * Npairs:2])
+            if len(mins) % 2:
+                new_mins = np.append(new_mins, mins[-1])
+                new_maxs = np.append(new_maxs, maxs[-1])
+            mins, maxs = new_mins, new_maxs
+            block *= 2
+            self._levels.append((block, mins, maxs))
+
+    def decimate(self, xmin, xmax, Npixels):
+        """
+        Get the trace to be displayed over the x range [xmin, xmax] on Npixels
+
+        The samples out of the range are replaced by the first and last samples of the trace at the minimum and maximum
+        of the trace, so that the bounds of the returned data are the ones of the trace (used by the auto range of the
+        plots).
+
+        Parameters
+        ----------
+        xmin: (float) lower bound of the displayed x range
+        xmax: (float) upper bound of the displayed x range
+        Npixels: (int) number of pixels on which the range is displayed
+
+        Returns
+        -------
+        tuple of ndarray: x and y to be displayed, the same objects are returned as long as the trace and the
+                          decimation are the same
+        """
+        if not self.decimable:
+            return self._raw
+        Npts = self.y.size
+        ind_start = max(int(np.searchsorted(self.x, xmin, side='left')) - 1, 0)
+        ind_end = min(int(np.searchsorted(self.x, xmax, side='right')) + 1, Npts)
+        block = 1
+        if self._levels is None:
+            self._build_levels()
+        for level_block, mins, maxs in self._levels:
+            if level_block > max(ind_end - ind_start, 1) / max(Npixels, 1):
+                break
+            block, level_mins, level_maxs = level_block, mins, maxs
+        ind_start = (ind_start // block) * block
+        ind_end = min(-(-ind_end // block) * block, Npts)
+        key = (ind_start, ind_end, block)
+        for cached_key, cached_data in self._cache:
+            if cached_key == key:
+                return cached_data
+
+        if block == 1:
+            x = self.x[ind_start:ind_end]
+            y = self.y[ind_start:ind_end]
+        else:
+            starts = np.arange(ind_start, ind_end, block)
+            x = np.empty((2 * len(starts),), dtype=self.x.dtype)
+            y = np.empty((2 * len(starts),), dtype=self.y.dtype)
+            x[0::2] = self.x[starts]
+            x[1::2] = self.x[np.minimum(starts + block, Npts) - 1]
+            y[0::2] = level_mins[ind_start // block:ind_start // block + len(starts)]
+            y[1::2] = level_maxs[ind_start // block:ind_start // block + len(starts)]
+        if ind_start > 0:
+            x = np.concatenate(([self.x[0], self.x[0], self.x[ind_start - 1]], x))
+            y = np.concatenate(([self._ymin, self._ymax, self.y[ind_start - 1]], y))
+        if ind_end < Npts:
+            x = np.concatenate((x, [self.x[ind_end], self.x[-1], self.x[-1]]))
+            y = np.concatenate((y, [self.y[ind_end], self._ymin, self._ymax]))
+
+        self._cache = [(key, (x, y))] + self._cache[:3]
+        return x, y
+
+
+class IncrementalTriangulation:
+    """
+    Delaunay triangulation of a growing set of points, with the polygons of its triangles
+
+    When the points given to set_points start with the points already triangulated (a spread scan adding new points),
+    only the new points are inserted in the triangulation (scipy Delaunay in incremental mode) instead of
+    triangulating all of them again. The QPolygonF of the triangles are kept from one call to the next so that only
+    the ones of new triangles are built.
+
+    Examples
+    --------
+    >>> triangulator = IncrementalTriangulation()
+    >>> tri = triangulator.set_points(data_spread[:, :2])
+    >>> polygons = triangulator.polygons()
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        if getattr(self, 'triangulation', None) is not None:
+            self.triangulation.close()
+        self.triangulation = None
+        self.Nrebuilds = 0  # number of triangulations made from scratch
+        self._clear_polygons()
+
+    def _clear_polygons(self):
+        self._keys = np.array([], dtype=np.int64)  # sorted keys of the triangles whose polygon is known
+        self._polygons = np.array([], dtype=object)
+
+    def set_points(self, points):
+        """
+        Triangulate the points, incrementally if they start with the points of the current triangulation
+
+        Parameters
+        ----------
+        points: (ndarray) array of shape (N, 2) (other columns, such as the values of the points, are ignored)
+
+        Returns
+        -------
+        scipy.spatial.Delaunay: the triangulation
+        """
+        points = np.asarray(points, dtype=np.float64)[:, :2]
+        tri = self.triangulation
+        if tri is not None and np.array_equal(tri.points, points[:tri.npoints]):
+            if len(points) > tri.npoints:
+                tri.add_points(points[tri.npoints:])
+        else:
+            if tri is not None:
+                tri.close()
+            self.triangulation = Triangulation(points, incremental=True)
+            self.Nrebuilds += 1
+            self._clear_polygons()
+        return self.triangulation
+
+    def simplices_keys(self):
+        """Returns an integer identifying each triangle (from its sorted vertex indexes)"""
+        simplices = np.sort(self.triangulation.simplices, axis=1).astype(np.int64)
+        base = max(self.triangulation.npoints, 2 ** 21)  # keys don't depend on the number of points below 2 ** 21
+        return (simplices[:, 0] * base + simplices[:, 1]) * base + simplices[:, 2]
+
+    def polygons(self):
+        """
+        Get the polygons of the triangles, in the order of the triangulation simplices
+
+        Returns
+        -------
+        ndarray of QPolygonF
+        """
+        keys = self.simplices_keys()
+        if self.triangulation.npoints > 2 ** 21:
+            self._clear_polygons()
+        polygons = np.empty((len(keys),), dtype=object)
+        indexes = np.minimum(np.searchsorted(self._keys, keys), max(len(self._keys) - 1, 0))
+        known = np.zeros((len(keys),), dtype=bool) if len(self._keys) == 0 else self._keys[indexes] == keys
+        polygons[known] = self._polygons[indexes[known]]
+        for ind in np.nonzero(np.logical_not(known))[0]:
+            seq = self.triangulation.points[self.triangulation.simplices[ind]]
+            polygons[ind] = QtGui.QPolygonF([QtCore.QPointF(*s) for s in seq] + [QtCore.QPointF(*seq[0])])
+        order = np.argsort(keys)
+        self._keys = keys[order]
+        self._polygons = polygons[order]
+        return polygons
+
+
+def makeAlphaTriangles(data, lut=None, levels=None, scale=None, useRGBA=False, tri=None, simplices=None):
     """
     Convert an array of values into an ARGB array suitable for building QImages,
     OpenGL textures, etc.
@@ -158,6 +358,10 @@ def makeAlphaTriangles(data, lut=None, levels=None, scale=None, useRGBA=False):
                    The default is False, which returns in ARGB order for use with QImage
                    (Note that 'ARGB' is a term used by the Qt documentation; the *actual* order
                    is BGRA).
+    tri            Optional triangulation of the points (for instance from an IncrementalTriangulation),
+                   computed if None
+    simplices      Optional indexes of the triangles to be colored, all of them if None. The returned
+                   triangle values and colors are then only the ones of these triangles
     ============== ==================================================================================
     """
     points = data[:, :2]
@@ -167,10 +371,9 @@ def makeAlphaTriangles(data, lut=None, levels=None, scale=None, useRGBA=False):
     if points.ndim not in (2,):
         raise TypeError("points must be 1D sequence of points")
 
-    tri = Triangulation(points)
-    tri_data = np.zeros((len(tri.simplices),))
-    for ind, pts in enumerate(tri.simplices):
-        tri_data[ind] = np.mean(values[pts])
+    if tri is None:
+        tri = Triangulation(points)
+    tri_data = np.mean(values[tri.simplices if simplices is None else tri.simplices[simplices]], axis=1)
     data = tri_data.copy()
     if lut is not None and not isinstance(lut, np.ndarray):
         lut = np.array(lut)
@@ -41,9 +41,9 @@ class Viewer0D(QtWidgets.QWidget,QObject):
         self.plot_colors = utils.plot_colors
 
         self.Nsamples = self.ui.Nhistory_sb.value()
+        self.max_display_points = 10000  # longer histories are decimated for display
 
-        self.x_axis = np.linspace(0, self.Nsamples - 1, self.Nsamples)
-        self.datas = []  # datas on each channel. list of 1D arrays
+        self.datas = []  # history of each channel. list of utils.RingBuffer
         self.legend = self.ui.Graph1D.plotItem.addLegend()
         self.data_to_export = None
         self.list_items = None
@@ -57,13 +57,9 @@ class Viewer0D(QtWidgets.QWidget,QObject):
 
 
     def clear_data(self):
-        N=len(self.datas)
-        self.datas=[]
-        for ind in range(N):
-            self.datas.append(np.array([]))
-        self.x_axis=np.array([])
-        for ind_plot,data in enumerate(self.datas):
-            self.plot_channels[ind_plot].setData(x=self.x_axis,y=data)
+        for ind_plot, data in enumerate(self.datas):
+            data.clear()
+            self.plot_channels[ind_plot].setData(x=data.indexes(), y=data.data)
 
     @pyqtSlot(list)
     def show_data(self, datas):
@@ -92,7 +88,7 @@ class Viewer0D(QtWidgets.QWidget,QObject):
                 self.ui.values_list.addItems(['{:.06e}'.format(data[0]) for data in datas])
                 self.list_items = [self.ui.values_list.item(ind) for ind in range(self.ui.values_list.count())]
                 for ind in range(len(datas)):
-                    self.datas.append(np.array([]))
+                    self.datas.append(utils.RingBuffer(self.Nsamples))
                     #channel=self.ui.Graph1D.plot(np.array([]))
                     #channel=self.ui.Graph1D.plot(y=np.array([]), name=self._labels[ind])
                     channel = self.ui.Graph1D.plot(y=np.array([]))
@@ -122,25 +118,12 @@ class Viewer0D(QtWidgets.QWidget,QObject):
 
     def update_Graph1D(self, datas):
         try:
-            data_tot = []
-            L = len(self.datas[0]) + 1
-            if L > self.Nsamples:
-                self.x_axis += 1
-            else:
-                self.x_axis = np.linspace(0, L - 1, L)
             for ind_plot, data in enumerate(datas):
-                data_tmp = self.datas[ind_plot]
-                data_tmp = np.append(data_tmp, data)
-
-                if len(data_tmp) > self.Nsamples:
-                    data_tmp = data_tmp[L - self.Nsamples:]
-
-                data_tot.append(data_tmp)
-
-                self.plot_channels[ind_plot].setData(x=self.x_axis, y=data_tmp)
+                self.datas[ind_plot].append(data[0])
+                x_axis, data_display = self.datas[ind_plot].decimated(self.max_display_points, peak=True)
+                self.plot_channels[ind_plot].setData(x=x_axis, y=data_display)
                 self.data_to_export['data0D']['CH{:03d}'.format(ind_plot)] = utils.DataToExport(name=self.title,
                                                                                     data=data[0], source='raw')
-            self.datas = data_tot
 
             self.data_to_export['acq_time_s'] = datetime.datetime.now().timestamp()
             self.data_to_export_signal.emit(self.data_to_export)
@@ -172,9 +155,10 @@ class Viewer0D(QtWidgets.QWidget,QObject):
     def update_status(self,txt,wait_time=0):
         self.ui.statusbar.showMessage(txt,wait_time)
 
-    def update_x_axis(self,Nhistory):
-        self.Nsamples=Nhistory
-        self.x_axis=np.linspace(0,self.Nsamples-1,self.Nsamples)
+    def update_x_axis(self, Nhistory):
+        self.Nsamples = Nhistory
+        for data in self.datas:
+            data.resize(self.Nsamples)
 
     @property
     def labels(self):
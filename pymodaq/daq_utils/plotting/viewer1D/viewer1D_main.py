@@ -12,6 +12,7 @@ import numpy as np
 import pymodaq.daq_utils.custom_parameter_tree as customparameter
 from pymodaq.daq_utils import daq_utils as utils
 from pymodaq.daq_utils.plotting.viewer1D.viewer1Dbasic import Viewer1DBasic
+from pymodaq.daq_utils.plotting.plot_utils import MinMaxDecimator
 from pymodaq.daq_utils.managers.roi_manager import ROIManager
 import datetime
 
@@ -53,10 +54,14 @@ class Viewer1D(QtWidgets.QWidget,QObject):
 
         self._labels = []
         self.plot_channels = None
+        self.decimators = []  # one MinMaxDecimator per channel, shared by the main and zoom plots
+        self._decimated = []  # data currently displayed on each channel of the main plot
         self.plot_colors = utils.plot_colors
         self.color_list = ROIManager.color_list
         self.lo_items = OrderedDict([])
-        self.lo_data = OrderedDict([])
+        self.lo_data = OrderedDict([])  # history of each lineout, utils.RingBuffer
+        self.max_size_lineouts = 100000  # number of samples kept in the lineouts history
+        self.max_display_points = 10000  # longer histories are decimated for display
         self.ROI_bounds = []
 
         self._x_axis = None
@@ -126,6 +131,10 @@ class Viewer1D(QtWidgets.QWidget,QObject):
         self.ui.crosshair_pb.clicked.connect(self.crosshairClicked)
         self.crosshairClicked()
 
+        # long traces are decimated depending on the displayed range
+        self.viewer.plotwidget.plotItem.vb.sigXRangeChanged.connect(self.update_decimation)
+        self.viewer.plotwidget.plotItem.vb.sigResized.connect(self.update_decimation)
+
         # self.ui.Measurement_widget=Dock("Measurement Module", size=(300, 100), closable=True)
         # self.dockarea.addDock(self.ui.Measurement_widget)
         self.ui.Measurement_widget = QtWidgets.QWidget()
@@ -250,13 +259,14 @@ class Viewer1D(QtWidgets.QWidget,QObject):
             self.lo_items['ROI_{:02d}'.format(index)] = item_lo
             self.lo_data = OrderedDict([])
             for k in self.lo_items:
-                self.lo_data[k] = np.zeros((1,))
+                self.lo_data[k] = utils.RingBuffer(self.max_size_lineouts)
             self.update_lineouts()
         except Exception as e:
             self.update_status(str(e), wait_time=self.wait_time)
 
     def clear_lo(self):
-        self.lo_data=[[] for ind in range(len(self.lo_data))]
+        for data in self.lo_data.values():
+            data.clear()
         self.update_lineouts()
 
     def crosshairClicked(self):
@@ -286,6 +296,37 @@ class Viewer1D(QtWidgets.QWidget,QObject):
         except Exception as e:
             self.update_status(str(e), wait_time=self.wait_time)
 
+    def decimate(self, ind_plot):
+        """
+        Get the data of a channel decimated for the displayed x range of the main plot
+
+        Parameters
+        ----------
+        ind_plot: (int) index of the channel
+
+        Returns
+        -------
+        tuple of ndarray: the x axis and data to be displayed
+        """
+        view_box = self.viewer.plotwidget.plotItem.vb
+        xmin, xmax = view_box.viewRange()[0]
+        self._decimated[ind_plot] = self.decimators[ind_plot].decimate(xmin, xmax, view_box.width())
+        return self._decimated[ind_plot]
+
+    def update_decimation(self):
+        """
+        Display again the channels decimated for the new range (or size) of the main plot, only the ones whose
+        decimation changed being updated
+        """
+        if self.plot_channels is None:
+            return
+        for ind_plot, channel in enumerate(self.plot_channels):
+            if ind_plot < len(self.decimators):
+                displayed = self._decimated[ind_plot]
+                x_display, data_display = self.decimate(ind_plot)
+                if self._decimated[ind_plot] is not displayed:
+                    channel.setData(x=x_display, y=data_display)
+
     def do_zoom(self):
         bounds=self.ui.zoom_region.getRegion()
         self.viewer.plotwidget.setXRange(bounds[0],bounds[1])
@@ -327,6 +368,8 @@ class Viewer1D(QtWidgets.QWidget,QObject):
                 else:
                     self.legend.removeItem(items[0])
             channels = []
+            self.decimators = [MinMaxDecimator() for ind in range(Nplots)]
+            self._decimated = [None for ind in range(Nplots)]
             for ind in range(Nplots):
                 channel=self.viewer.plotwidget.plot()
                 channel.setPen(self.plot_colors[ind])
@@ -477,7 +520,9 @@ class Viewer1D(QtWidgets.QWidget,QObject):
                 else:
                     x_axis = self.x_axis
 
-                self.plot_channels[ind_plot].setData(x=x_axis, y=data)
+                self.decimators[ind_plot].set_data(x_axis, data)
+                x_display, data_display = self.decimate(ind_plot)
+                self.plot_channels[ind_plot].setData(x=x_display, y=data_display)
         except Exception as e:
             self.update_status(str(e), wait_time=self.wait_time)
 
@@ -493,8 +538,9 @@ class Viewer1D(QtWidgets.QWidget,QObject):
 
 
             for ind, key in enumerate(self.lo_items):
-                self.lo_data[key] = np.append(self.lo_data[key],data_lo[ind])
-                self.lo_items[key].setData(y=self.lo_data[key])
+                self.lo_data[key].append(data_lo[ind])
+                x_lo, data_lo_display = self.lo_data[key].decimated(self.max_display_points, peak=True)
+                self.lo_items[key].setData(x=x_lo, y=data_lo_display)
 
         if not (self.ui.do_measurements_pb.isChecked()):  # otherwise you export data from measurement
             self.data_to_export['acq_time_s'] = datetime.datetime.now().timestamp()
@@ -550,12 +596,17 @@ class Viewer1D(QtWidgets.QWidget,QObject):
                 elif len(self.x_axis) != len(data):
                     self._x_axis = np.linspace(0, len(data), len(data), endpoint=False)
 
-                self.plot_channels[ind_plot].setData(x=self.x_axis, y=data, pen=pens[ind_plot], symbol=symbol,
+                self.decimators[ind_plot].set_data(self.x_axis, data)
+                x_display, data_display = self.decimate(ind_plot)
+                self.plot_channels[ind_plot].setData(x=x_display, y=data_display, pen=pens[ind_plot], symbol=symbol,
                                                      symbolBrush=symbolBrushs[ind_plot], symbolSize=symbolSize,
                                                      pxMode=True)
 
                 if self.ui.zoom_pb.isChecked():
-                    self.zoom_plot[ind_plot].setData(x=self.x_axis, y=data)
+                    # the zoom plot always displays the whole trace
+                    x_zoom, data_zoom = self.decimators[ind_plot].decimate(
+                        -np.inf, np.inf, self.ui.Graph_zoom.plotItem.vb.width())
+                    self.zoom_plot[ind_plot].setData(x=x_zoom, y=data_zoom)
                 x_axis = utils.Axis(data=self.x_axis, units=self.axis_settings['units'], label=self.axis_settings['label'])
                 self.data_to_export['data1D']['CH{:03d}'.format(ind_plot)].update(
                     OrderedDict(name=self.title, data=data, x_axis=x_axis, source='raw'))  # to be saved or exported
@@ -4,7 +4,8 @@ from PyQt5.QtGui import QPixmap, QIcon
 from PyQt5.QtCore import QObject, pyqtSlot, pyqtSignal, QRectF, QPointF
 import sys
 from collections import OrderedDict
-from pymodaq.daq_utils.managers.roi_manager import ROIManager
+from pymodaq.daq_utils.managers.roi_manager import ROIManager, PointsGrid, roi_contains_points, roi_parent_bounds,\
+    roi_array_region
 import pyqtgraph as pg
 from pyqtgraph.graphicsItems.GradientEditorItem import Gradients
 Gradients.update(OrderedDict([
@@ -21,7 +22,7 @@ from pymodaq.daq_utils.plotting.crosshair import Crosshair
 import numpy as np
 from easydict import EasyDict as edict
 import copy
-from pymodaq.daq_utils.gui_utils import DockArea
+from pymodaq.daq_utils.gui_utils import DockArea, DisplayThrottle
 
 import  pymodaq.daq_utils.daq_utils as utils
 import datetime
@@ -50,7 +51,8 @@ class Viewer2D(QObject):
             parent = QtWidgets.QWidget()
         self.parent = parent
 
-        self.max_size_integrated = 200
+        self._max_size_integrated = 200  # history length of the integrated ROI plots
+        self.max_display_points = 10000  # longer histories are decimated for display
         self.scaling_options = copy.deepcopy(scaling_options)
         self.viewer_type = 'Data2D'  # by default
         self.title = ""
@@ -61,14 +63,38 @@ class Viewer2D(QObject):
         self.y_axis_scaled = None
 
         self.raw_data = None
+        self._spread_grid = None  # spatial index of the spread points used by the ROIs, see get_spread_grid
+        self._roi_regions = dict()  # cached pixel regions of the ROIs, see get_roi_region
         self.image_widget = None
         self.isdata = edict(blue=False, green=False, red=False, spread=False)
         self.color_list = utils.plot_colors
 
         self.data_to_export = OrderedDict([])
+        # the images are rendered at most max_fps times per second, the data being processed for each frame
+        self.display_throttle = DisplayThrottle(self.display_images, max_fps=25)
 
         self.setupUI()
 
+    @property
+    def max_size_integrated(self):
+        """Number of samples kept in the history of the integrated ROI plots"""
+        return self._max_size_integrated
+
+    @max_size_integrated.setter
+    def max_size_integrated(self, Nsamples):
+        self._max_size_integrated = Nsamples
+        for data in self.data_integrated_plot.values():
+            data.resize(Nsamples)
+
+    @property
+    def max_fps(self):
+        """Maximum display rate of the images (frames per second), 0 or None for no limit, see DisplayThrottle"""
+        return self.display_throttle.max_fps
+
+    @max_fps.setter
+    def max_fps(self, max_fps):
+        self.display_throttle.max_fps = max_fps
+
 
 
     def setupButtons(self, buttons_layout):
@@ -392,6 +418,7 @@ class Viewer2D(QObject):
 
     @pyqtSlot(str)
     def remove_ROI(self, roi_name):
+        self._roi_regions.pop(roi_name, None)
         item = self.ui.RoiCurve_H.pop(roi_name)
         self.ui.Lineout_H.plotItem.removeItem(item)
 
@@ -418,7 +445,7 @@ class Viewer2D(QObject):
         self.ui.RoiCurve_integrated["ROI_%02.0d" % newindex] = PlotCurveItem(pen=color)
         self.ui.Lineout_integrated.plotItem.addItem(self.ui.RoiCurve_integrated["ROI_%02.0d" % newindex])
 
-        self.data_integrated_plot["ROI_%02.0d" % newindex] = np.zeros((2, 1))
+        self.data_integrated_plot["ROI_%02.0d" % newindex] = utils.RingBuffer(self.max_size_integrated)
 
         if self.isdata['red']:
             item_param.child('use_channel').setValue('red')
@@ -538,7 +565,7 @@ class Viewer2D(QObject):
 
     def ini_plot(self):
         for k in self.data_integrated_plot.keys():
-            self.data_integrated_plot[k] = np.zeros((2, 1))
+            self.data_integrated_plot[k].clear()
 
     def lock_aspect_ratio(self):
         if self.ui.aspect_ratio_pb.isChecked():
@@ -582,6 +609,7 @@ class Viewer2D(QObject):
             self.data_to_export['data0D'] = OrderedDict([])
             self.data_to_export['data1D'] = OrderedDict([])
             self.measure_data_dict  = OrderedDict([])
+            images = dict([])  # each channel is transformed once whatever the number of ROIs using it
             for indROI, key in enumerate(self.roi_manager.ROIs):
 
                 color_source = self.roi_manager.settings.child('ROIs', key,
@@ -607,31 +635,42 @@ class Viewer2D(QObject):
 
 
                 if color_source == "red" or color_source == "green" or color_source == "blue":
-                    data, coords = self.roi_manager.ROIs[key].getArrayRegion(
-                        self.transform_image(self.raw_data[color_source]),
-                        img_source, axes, returnMappedCoords=True)
-                    if data is not None:
-                        xvals = np.linspace(np.min(np.min(coords[1, :, :])), np.max(np.max(coords[1, :, :])), data.shape[1])
-                        yvals = np.linspace(np.min(np.min(coords[0, :, :])), np.max(np.max(coords[0, :, :])), data.shape[0])
+                    if color_source not in images:
+                        images[color_source] = self.transform_image(self.raw_data[color_source])
+                    image = images[color_source]
+                    region = None
+                    if img_source.transform().isIdentity():
+                        region = self.get_roi_region(key, image.shape, img_source.axisOrder)
+                    if region is None:
+                        data, coords = self.roi_manager.ROIs[key].getArrayRegion(image, img_source, axes,
+                                                                                 returnMappedCoords=True)
+                        if data is not None:
+                            xvals = np.linspace(np.min(np.min(coords[1, :, :])), np.max(np.max(coords[1, :, :])), data.shape[1])
+                            yvals = np.linspace(np.min(np.min(coords[0, :, :])), np.max(np.max(coords[0, :, :])), data.shape[0])
+                    else:
+                        (slice0, slice1), mask = region
+                        data = image[slice0, slice1]
+                        if data.size == 0:
+                            data = None
+                        else:
+                            if mask is not None:
+                                data = data * mask
+                            # same axes as the mapped coordinates of getArrayRegion
+                            xvals = np.arange(slice1.start, slice1.stop)
+                            yvals = np.arange(slice0.start, slice0.stop)
 
                 else:
                     roi = self.roi_manager.ROIs[key]
-                    xvals = []
-                    yvals = []
-                    data = []
-                    for ind in range(self.raw_data['spread'].shape[0]):
-                        #invoke the QPainterpath of the ROI (from the shape method)
-                        if roi.shape().contains(QPointF(self.raw_data['spread'][ind, 0] - roi.pos().x(),
-                                                       self.raw_data['spread'][ind, 1] - roi.pos().y())):
-                            xvals.append(self.raw_data['spread'][ind, 0])
-                            yvals.append(self.raw_data['spread'][ind, 1])
-                            data.append(self.raw_data['spread'][ind, 2])
-                    if len(data) == 0:
+                    spread_data = self.raw_data['spread']
+                    # only the points in the grid cells overlapping the ROI are tested against its shape
+                    indexes = self.get_spread_grid().indexes_in_bounds(*roi_parent_bounds(roi))
+                    indexes = indexes[roi_contains_points(roi, spread_data[indexes, 0], spread_data[indexes, 1])]
+                    if len(indexes) == 0:
                         data = None
                     else:
-                        data = np.array(data)
-                        xvals = np.array(xvals)
-                        yvals = np.array(yvals)
+                        data = spread_data[indexes, 2]
+                        xvals = spread_data[indexes, 0]
+                        yvals = spread_data[indexes, 1]
 
 
                 if data is not None:
@@ -644,26 +683,26 @@ class Viewer2D(QObject):
                         data_V_axis = y_axis[ind_yaxis]
                         data_H = data[ind_xaxis]
                         data_V = data[ind_yaxis]
+                        data_sum = np.sum(data)
                     else:
                         data_H_axis = x_axis
                         data_V_axis = y_axis
-                        data_H = np.mean(data, axis=0)
-                        data_V = np.mean(data, axis=1)
+                        # the integral is obtained from the lineout sums, not from a third pass over the data
+                        data_H = np.sum(data, axis=0)
+                        data_V = np.sum(data, axis=1)
+                        data_sum = np.sum(data_V)
+                        data_H = data_H / data.shape[0]
+                        data_V = data_V / data.shape[1]
 
 
-                    self.data_integrated_plot[key] = np.append(self.data_integrated_plot[key],
-                                       np.array([[self.data_integrated_plot[key][0, -1]], [0]]) +
-                                       np.array([[1], [np.sum(data)]]), axis=1)
-
-                    if self.data_integrated_plot[key].shape[1] > self.max_size_integrated:
-                        self.data_integrated_plot[key] = \
-                            self.data_integrated_plot[key][:, self.data_integrated_plot[key].shape[1]-200:]
+                    self.data_integrated_plot[key].append(data_sum)
 
                     self.ui.RoiCurve_H[key].setData(y=data_H, x=data_H_axis)
                     self.ui.RoiCurve_V[key].setData(y=data_V_axis, x=data_V)
 
-                    self.ui.RoiCurve_integrated[key].setData(y=self.data_integrated_plot[key][1, :],
-                                                             x=self.data_integrated_plot[key][0, :])
+                    x_integrated, data_integrated = self.data_integrated_plot[key].decimated(self.max_display_points,
+                                                                                             peak=True)
+                    self.ui.RoiCurve_integrated[key].setData(y=data_integrated, x=x_integrated)
 
                     self.data_to_export['data2D'][self.title+'_{:s}'.format(key)] = \
                         utils.DataToExport(name=self.title, data=data, source='roi',
@@ -682,9 +721,9 @@ class Viewer2D(QObject):
                                           label=self.scaling_options['scaled_yaxis']['label']))
 
                     self.data_to_export['data0D'][self.title+'_Integrated_{:s}'.format(key)] = \
-                        utils.DataToExport(name=self.title, data=np.sum(data), source='roi',)
+                        utils.DataToExport(name=self.title, data=data_sum, source='roi',)
 
-                    self.measure_data_dict["Lineout {:s}:".format(key)] = np.sum(data)
+                    self.measure_data_dict["Lineout {:s}:".format(key)] = data_sum
 
 
             self.roi_manager.settings.child(('measurements')).setValue(self.measure_data_dict)
@@ -886,7 +925,6 @@ class Viewer2D(QObject):
 
             ind = 0
             if red_flag:
-                self.ui.img_red.setImage(data_red, autoLevels=self.autolevels)
                 self.data_to_export['data2D']['CH{:03d}'.format(ind)] = utils.DataToExport(data=data_red, source='raw',
                         x_axis=utils.Axis(data=self.x_axis_scaled, units=self.scaling_options['scaled_xaxis']['units'],
                                           label=self.scaling_options['scaled_xaxis']['label']),
@@ -895,7 +933,6 @@ class Viewer2D(QObject):
                 ind += 1
 
             if green_flag:
-                self.ui.img_green.setImage(data_green, autoLevels=self.autolevels)
                 self.data_to_export['data2D']['CH{:03d}'.format(ind)] = utils.DataToExport(data=data_green, source='raw',
                         x_axis=utils.Axis(data=self.x_axis_scaled, units=self.scaling_options['scaled_xaxis']['units'],
                                           label=self.scaling_options['scaled_xaxis']['label']),
@@ -904,7 +941,6 @@ class Viewer2D(QObject):
                 ind += 1
 
             if blue_flag:
-                self.ui.img_blue.setImage(data_blue, autoLevels=self.autolevels)
                 self.data_to_export['data2D']['CH{:03d}'.format(ind)] = utils.DataToExport(data=data_blue, source='raw',
                         x_axis=utils.Axis(data=self.x_axis_scaled, units=self.scaling_options['scaled_xaxis']['units'],
                                           label=self.scaling_options['scaled_xaxis']['label']),
@@ -912,7 +948,6 @@ class Viewer2D(QObject):
                                           label=self.scaling_options['scaled_yaxis']['label']))
                 ind += 1
             if spread_flag:
-                self.ui.img_spread.setImage(self.raw_data['spread'], autoLevels=self.autolevels)
                 self.data_to_export['data2D']['CH{:03d}'.format(ind)] = utils.DataToExport(data=data_spread[:, 2],
                         source='raw',
                         x_axis=utils.Axis(data=data_spread[:, 0], units=self.scaling_options['scaled_xaxis']['units'],
@@ -921,6 +956,7 @@ class Viewer2D(QObject):
                                     label=self.scaling_options['scaled_yaxis']['label']))
                 ind += 1
 
+            self.display_throttle.submit(data_red, data_green, data_blue, data_spread)
 
             if self.ui.roiBtn.isChecked():
                 self.roi_changed()
@@ -928,12 +964,6 @@ class Viewer2D(QObject):
                 self.data_to_export['acq_time_s'] = datetime.datetime.now().timestamp()
                 self.data_to_export_signal.emit(self.data_to_export)
 
-            if self.ui.isocurve_pb.isChecked() and red_flag:
-                self.ui.iso.setData(pg.gaussianFilter(data_red, (2, 2)))
-
-            if self.ui.crosshair_pb.isChecked():
-                self.crosshairChanged()
-
         except Exception as e:
             print(e)
 
@@ -955,6 +985,13 @@ class Viewer2D(QObject):
         data_red, data_blue, data_green = self.set_image_transform()
         self.set_visible_items()
 
+        self.display_throttle.submit(data_red, data_green, data_blue, data_spread, temp=True)
+
+    def display_images(self, data_red=None, data_green=None, data_blue=None, data_spread=None, temp=False):
+        """
+        Render the (transformed) images, and for non temporary data the isocurve and crosshair. Called through the
+        display_throttle by setImage and setImageTemp
+        """
         if data_red is not None:
             self.ui.img_red.setImage(data_red, autoLevels=self.autolevels)
         if data_green is not None:
@@ -962,9 +999,47 @@ class Viewer2D(QObject):
         if data_blue is not None:
             self.ui.img_blue.setImage(data_blue, autoLevels=self.autolevels)
         if data_spread is not None:
-            self.ui.img_spread.setImage(self.raw_data['spread'], autoLevels=self.autolevels)
+            self.ui.img_spread.setImage(data_spread, autoLevels=self.autolevels)
 
+        if not temp:
+            if self.ui.isocurve_pb.isChecked() and data_red is not None:
+                self.ui.iso.setData(pg.gaussianFilter(data_red, (2, 2)))
 
+            if self.ui.crosshair_pb.isChecked():
+                self.crosshairChanged()
+
+
+
+    def get_roi_region(self, key, shape, axis_order='col-major'):
+        """
+        Get the pixel slices and mask of an axis aligned ROI (see roi_manager.roi_array_region), computed again only
+        when the ROI moved or the image shape or axis order changed
+
+        Parameters
+        ----------
+        key: (str) the ROI name in the roi_manager
+        shape: (tuple of int) the shape of the image
+        axis_order: (str) the axisOrder of the ImageItem displaying the image
+
+        Returns
+        -------
+        tuple: ((axis 0, axis 1) slices, mask) or None if the ROI is rotated
+        """
+        roi = self.roi_manager.ROIs[key]
+        state = (tuple(roi.pos()), tuple(roi.state['size']), roi.angle(), tuple(shape), axis_order)
+        if key not in self._roi_regions or self._roi_regions[key][0] != state:
+            self._roi_regions[key] = (state, roi_array_region(roi, shape, axis_order))
+        return self._roi_regions[key][1]
+
+    def get_spread_grid(self):
+        """
+        Get the spatial index of the current spread points, rebuilt only when the points positions changed, so that
+        moving a ROI doesn't iterate over all the points
+        """
+        spread_data = self.raw_data['spread']
+        if self._spread_grid is None or not self._spread_grid.has_points(spread_data[:, 0], spread_data[:, 1]):
+            self._spread_grid = PointsGrid(spread_data[:, 0], spread_data[:, 1])
+        return self._spread_grid
 
     def mapfromview(self, graphitem, x, y):
         """
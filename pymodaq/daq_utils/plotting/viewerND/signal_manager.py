@@ -8,6 +8,7 @@ Created on Fri Aug 31 16:41:26 2018
 import numpy as np
 import collections
 import copy
+import itertools
 
 import math
 from pymodaq.daq_utils import daq_utils as utils
@@ -59,6 +60,233 @@ def iterable_not_string(thing):
     return isinstance(thing, collections.Iterable) and \
         not isinstance(thing, str)
 
+def is_array_store(value):
+    """Check if value is an array stored in a file (numpy memmap, h5py or PyTables dataset, h5modules array node)"""
+    if isinstance(value, np.memmap):
+        return True
+    return not isinstance(value, (np.ndarray, LazyArray)) and all(hasattr(value, attr) for attr in
+                                                                  ('shape', 'dtype', '__getitem__'))
+
+
+class LazyArray(object):
+    """Read on demand view of an array stored in a file (h5modules CARRAY node, PyTables or h5py dataset, memmap...)
+
+    Only the shape and dtype of the store are known, data are read when the view is indexed so that a slice only reads
+    the HDF5 chunks it covers. Dimensions of size 1 of the store can be hidden (as with np.squeeze) and the view can be
+    transposed, both without reading anything.
+
+    Parameters
+    ----------
+    store: (object) array like with shape and dtype attributes and supporting basic indexing (ints and slices)
+    squeeze: (bool) if True the dimensions of size 1 of the store are hidden
+
+    Attributes
+    ----------
+    max_memory: (float) default maximum size in bytes of the blocks read by iter_blocks and reduce
+    """
+    max_memory = 64e6
+
+    def __init__(self, store, squeeze=True):
+        self.store = store
+        self._store_shape = tuple(int(s) for s in store.shape)
+        self._axes = [ind for ind, size in enumerate(self._store_shape) if size != 1 or not squeeze]
+        self.dtype = np.dtype(store.dtype)
+
+    def __repr__(self):
+        return '<LazyArray, shape: {}, dtype: {}>'.format(self.shape, self.dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __deepcopy__(self, memo):
+        """the store is shared, only the view is copied"""
+        return self._view(self._axes)
+
+    def __array__(self, dtype=None):
+        data = self[...]
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
+
+    @property
+    def shape(self):
+        return tuple(self._store_shape[ax] for ax in self._axes)
+
+    @property
+    def ndim(self):
+        return len(self._axes)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def chunk_shape(self):
+        """the chunk shape of the store in the view axes order (None if not chunked or unknown)"""
+        chunks = getattr(self.store, 'chunk_shape', None)
+        if chunks is None:
+            return None
+        return tuple(chunks[ax] for ax in self._axes)
+
+    def _view(self, axes):
+        view = self.__class__.__new__(self.__class__)
+        view.store = self.store
+        view._store_shape = self._store_shape
+        view._axes = list(axes)
+        view.dtype = self.dtype
+        return view
+
+    def read(self):
+        """Read the whole array from the store"""
+        return np.asarray(self)
+
+    def transpose(self, *axes):
+        """Same as numpy transpose but returns a LazyArray view"""
+        if len(axes) == 1 and iterable_not_string(axes[0]):
+            axes = axes[0]
+        if len(axes) == 0:
+            axes = reversed(range(self.ndim))
+        axes = [int(ax) % self.ndim for ax in axes]
+        if sorted(axes) != list(range(self.ndim)):
+            raise ValueError('axes {} don\'t match the array dimensions: {}'.format(axes, self.ndim))
+        return self._view([self._axes[ax] for ax in axes])
+
+    def _normalize_item(self, item):
+        if not isinstance(item, tuple):
+            item = (item,)
+        ellipsis = [ind for ind, it in enumerate(item) if it is Ellipsis]
+        if len(ellipsis) > 1:
+            raise IndexError('an index can only have a single ellipsis')
+        elif len(ellipsis) == 1:
+            ind = ellipsis[0]
+            item = item[:ind] + (slice(None),) * (self.ndim - len(item) + 1) + item[ind + 1:]
+        if len(item) > self.ndim:
+            raise IndexError('too many indices for array')
+        return item + (slice(None),) * (self.ndim - len(item))
+
+    def __getitem__(self, item):
+        item = self._normalize_item(item)
+        if not all(isinstance(it, (slice, int, np.integer)) for it in item):
+            # fancy indexing: read everything and let numpy do the job
+            return np.asarray(self)[item]
+
+        store_item = [0 for size in self._store_shape]
+        reverse = []
+        for it, ax in zip(item, self._axes):
+            size = self._store_shape[ax]
+            if isinstance(it, slice):
+                start, stop, step = it.indices(size)
+                if step < 0:  # backends don't support negative steps, read forward and flip
+                    npts = len(range(start, stop, step))
+                    start, stop, step = start + (npts - 1) * step, start + 1, -step
+                    if npts == 0:
+                        start, stop = 0, 0
+                    reverse.append(ax)
+                store_item[ax] = slice(start, max(start, stop), step)
+            else:
+                if not -size <= it < size:
+                    raise IndexError('index {} is out of bounds for axis with size {}'.format(it, size))
+                store_item[ax] = int(it) % size
+
+        data = np.asarray(self.store[tuple(store_item)])
+        # remaining axes are in the store order, put them back in the view order
+        kept_view = [ax for it, ax in zip(item, self._axes) if isinstance(it, slice)]
+        kept_store = [ax for ax in sorted(self._axes) if ax in kept_view]
+        data = data.transpose([kept_store.index(ax) for ax in kept_view])
+        if reverse:
+            data = data[tuple(slice(None, None, -1) if ax in reverse else slice(None) for ax in kept_view)]
+        return data
+
+    def iter_blocks(self, axis=0, max_memory=None):
+        """Iterate over the array by blocks along one axis, each block using at most max_memory bytes
+
+        The block size along axis is a multiple of the store chunk size whenever possible so that each chunk is read
+        only once.
+
+        Parameters
+        ----------
+        axis: (int) the axis along which the blocks are taken
+        max_memory: (float) maximum size of a block in bytes (default to the max_memory attribute)
+
+        Yields
+        ------
+        tuple: the block slice along axis and the block as a ndarray
+        """
+        if max_memory is None:
+            max_memory = self.max_memory
+        axis = int(axis) % self.ndim
+        size = self.shape[axis]
+        slab_size = max(1, self.size // max(size, 1) * self.dtype.itemsize)
+        Nblock = max(1, int(max_memory // slab_size))
+        chunk_shape = self.chunk_shape
+        if chunk_shape is not None and chunk_shape[axis] <= Nblock:
+            Nblock -= Nblock % chunk_shape[axis]
+        for start in range(0, size, Nblock):
+            block_slice = slice(start, min(start + Nblock, size))
+            yield block_slice, self[(slice(None),) * axis + (block_slice,)]
+
+    def reduce(self, function, axis=None, max_memory=None):
+        """Apply a numpy like reduction (np.sum, np.mean, np.max, np.std...) reading the array block by block
+
+        When some axes are kept, blocks are taken along one of them and any function accepting an axis argument can
+        be used. When all axes are reduced, partial results are combined for sum, min, max, prod, mean, std and var,
+        other functions are applied on the whole array.
+
+        Parameters
+        ----------
+        function: (callable) reduction with the signature function(array, axis=axis)
+        axis: (None, int or tuple of int) the reduced axes, None for all of them
+        max_memory: (float) maximum size in bytes of the blocks read from the store
+
+        Returns
+        -------
+        ndarray or scalar: same as function(np.asarray(self), axis=axis)
+        """
+        if axis is None:
+            axes = list(range(self.ndim))
+        elif iterable_not_string(axis):
+            axes = [int(ax) % self.ndim for ax in axis]
+        else:
+            axes = [int(axis) % self.ndim]
+        kept = [ax for ax in range(self.ndim) if ax not in axes]
+
+        if len(kept) != 0:
+            # blocks along the kept axis the most contiguous in the store
+            block_axis = min(kept, key=lambda ax: self._axes[ax])
+            index_out = kept.index(block_axis)
+            out = None
+            for block_slice, block in self.iter_blocks(block_axis, max_memory):
+                result = np.asarray(function(block, axis=axis))
+                if out is None:
+                    shape_out = list(result.shape)
+                    shape_out[index_out] = self.shape[block_axis]
+                    out = np.empty(shape_out, dtype=result.dtype)
+                out[(slice(None),) * index_out + (block_slice,)] = result
+            if out is None:  # empty array
+                return function(self.read(), axis=axis)
+            return out
+
+        block_axis = int(np.argmin(self._axes))
+        if function in (np.sum, np.amin, np.amax, np.prod):
+            partials = [function(block, axis=axis) for _, block in self.iter_blocks(block_axis, max_memory)]
+            return function(np.array(partials))
+        elif function in (np.mean, np.std, np.var):
+            # running count, mean and sum of squared deviations (Chan et al. parallel algorithm)
+            count, mean, m2 = 0, 0., 0.
+            for _, block in self.iter_blocks(block_axis, max_memory):
+                count_block, mean_block = block.size, np.mean(block)
+                delta = mean_block - mean
+                m2 += np.var(block) * count_block + delta ** 2 * count * count_block / (count + count_block)
+                mean += delta * count_block / (count + count_block)
+                count += count_block
+            if function is np.mean:
+                return mean
+            var = m2 / count
+            return var if function is np.var else np.sqrt(var)
+        else:
+            return function(self.read(), axis=axis)
+
+
 class SpecialSlicers(object):
 
     def __init__(self, obj, isNavigation):
@@ -674,8 +902,9 @@ class Signal(FancySlicing):
 
         Parameters
         ----------
-        data : numpy array
-           The signal data. It can be an array of any dimensions.
+        data : numpy array, LazyArray or array store
+           The signal data. It can be an array of any dimensions. Arrays stored in a file (memmap, h5py or
+           PyTables dataset) are not loaded, they are sliced on demand and reduced block by block (see LazyArray)
         axes : dictionary (optional)
             Dictionary to define the axes (see the
             documentation of the AxesManager class for more details).
@@ -716,7 +945,12 @@ class Signal(FancySlicing):
 
     @data.setter
     def data(self, value):
-        self._data = np.atleast_1d(np.asanyarray(value))
+        if is_array_store(value):
+            value = LazyArray(value, squeeze=False)
+        if isinstance(value, LazyArray) and value.ndim > 0:
+            self._data = value
+        else:
+            self._data = np.atleast_1d(np.asanyarray(value))
 
 
     def __repr__(self):
@@ -746,6 +980,17 @@ class Signal(FancySlicing):
 
         s = out or self._deepcopy_with_new_data(None)
 
+        if isinstance(self.data, LazyArray):
+            # out of core data: streamed reduction with bounded memory
+            data = np.atleast_1d(self.data.reduce(function, axis=ar_axes))
+            if out:
+                out.data[:] = data
+                out.events.data_changed.trigger(obj=out)
+                return
+            s.data = data
+            s._remove_axis([ax.index_in_axes_manager for ax in axes])
+            return s
+
         if np.ma.is_masked(self.data):
             return self._ma_workaround(s=s, function=function, axes=axes,
                                        ar_axes=ar_axes, out=out)
@@ -1266,6 +1511,132 @@ class Signal(FancySlicing):
 
 
 
+class IntegralCache(object):
+    """Least recently used cache of the cumulative sums of Signals along their signal axes (summed-area tables)
+
+    Once the cumulative sum of a Signal is built, the sum of its data over any rectangular region of the signal
+    space is obtained as the difference of 2 (1D signal) or 4 (2D signal) slices of the cumulative sum,
+    independently of the region size.
+
+    Parameters
+    ----------
+    max_memory: (float) maximum memory in bytes used by the cumulative sums, least recently used ones are dropped
+    build_after: (int) number of integrations of a given key not using the cache before its cumulative sum is built
+                 (building it costs several times a plain sum)
+    """
+    def __init__(self, max_memory=256e6, build_after=0):
+        self.max_memory = max_memory
+        self.build_after = build_after
+        self._cumsums = collections.OrderedDict()
+        self._requests = collections.Counter()
+
+    def __len__(self):
+        return len(self._cumsums)
+
+    def __contains__(self, key):
+        return key in self._cumsums
+
+    @property
+    def memory(self):
+        """memory in bytes used by the cached cumulative sums"""
+        return sum([cumsum.nbytes for cumsum in self._cumsums.values()])
+
+    def clear(self):
+        self._cumsums.clear()
+        self._requests.clear()
+
+    def get_cumsum(self, key, signal):
+        """Get the cumulative sum of the signal data along its signal axes, building and caching it if needed
+
+        Parameters
+        ----------
+        key: (hashable) identifier of the signal in the cache
+        signal: (Signal)
+
+        Returns
+        -------
+        ndarray: array of the signal data shape plus one along the signal axes (the first index holds zeros) or None
+                 if it doesn't fit into max_memory
+        """
+        if key in self._cumsums:
+            self._cumsums.move_to_end(key)
+            return self._cumsums[key]
+
+        data = signal.data
+        if data.dtype.kind not in 'biufc':
+            return None
+        axes = [ax.index_in_array for ax in signal.axes_manager.signal_axes]
+        dtype = np.result_type(data.dtype, np.int64)
+        shape = [size + 1 if ind in axes else size for ind, size in enumerate(data.shape)]
+        nbytes = np.prod(shape) * dtype.itemsize
+        if nbytes > self.max_memory:
+            return None
+        while len(self._cumsums) != 0 and self.memory + nbytes > self.max_memory:
+            self._cumsums.popitem(last=False)
+
+        cumsum = np.zeros(shape, dtype=dtype)
+        nav_axes = [ind for ind in range(data.ndim) if ind not in axes]
+        if isinstance(data, LazyArray) and len(nav_axes) != 0:
+            blocks = data.iter_blocks(nav_axes[0])
+            block_axis = nav_axes[0]
+        else:
+            blocks = [(slice(None), data)]
+            block_axis = 0
+        for block_slice, block in blocks:
+            for ax in axes:
+                block = np.cumsum(block, axis=ax, dtype=dtype)
+            cumsum[tuple(slice(1, None) if ind in axes else block_slice if ind == block_axis else slice(None)
+                         for ind in range(data.ndim))] = block
+        self._cumsums[key] = cumsum
+        return cumsum
+
+    def integrate(self, key, signal, slices, average=False):
+        """Sum (or average) the signal data over a region of its signal axes
+
+        Parameters
+        ----------
+        key: (hashable) identifier of the signal in the cache
+        signal: (Signal)
+        slices: (tuple) the region as given to the isig slicer of the signal (indexes or values of the signal axes)
+        average: (bool) if True return the mean instead of the sum
+
+        Returns
+        -------
+        ndarray: same as signal.isig[slices].sum(signal_axes).data or None if the region cannot be computed from the
+                 cumulative sum (empty region, step different from 1, cumulative sum too large or not built yet)
+        """
+        if key not in self._cumsums and self._requests[key] < self.build_after:
+            self._requests[key] += 1
+            return None
+
+        array_slices = signal._get_array_slices(slices, isNavigation=False)
+        axes = [ax.index_in_array for ax in signal.axes_manager.signal_axes]
+        bounds = []
+        for ax in axes:
+            if not isinstance(array_slices[ax], slice):
+                return None
+            start, stop, step = array_slices[ax].indices(signal.data.shape[ax])
+            if step != 1 or stop <= start:
+                return None
+            bounds.append((start, stop))
+
+        cumsum = self.get_cumsum(key, signal)
+        if cumsum is None:
+            return None
+
+        result = 0
+        for corner in itertools.product((0, 1), repeat=len(axes)):
+            index = [slice(None) for size in cumsum.shape]
+            sign = 1
+            for use_stop, ax, (start, stop) in zip(corner, axes, bounds):
+                index[ax] = stop if use_stop else start
+                sign = sign if use_stop else -sign
+            result = result + sign * cumsum[tuple(index)]
+        if average:
+            result = result / np.prod([stop - start for start, stop in bounds])
+        return np.atleast_1d(result)
+
+
 if __name__=='__main__':
     
     #import hyperspy.api as hs
@@ -13,7 +13,7 @@ from pyqtgraph import LinearRegionItem
 from pymodaq.daq_utils.gui_utils import DockArea
 from pyqtgraph.dockarea import Dock
 import copy
-from pymodaq.daq_utils.plotting.viewerND.signal_manager import Signal
+from pymodaq.daq_utils.plotting.viewerND.signal_manager import Signal, IntegralCache
 import datetime
 
 logger = utils.set_logger(utils.get_module_name(__file__))
@@ -86,6 +86,9 @@ class ViewerND(QtWidgets.QWidget, QObject):
         self.data_buffer = []  # convenience list to store 0D data to be displayed
         self.datas = None
         self.datas_settings = None
+        # cumulative sums used to integrate the data over the signal ROIs, built when a ROI is moved
+        self.integral_cache = IntegralCache(build_after=1)
+        self.use_integral_cache = True
         # set default data shape case
         self.data_axes = None
         # self.set_nav_axes(3)
@@ -426,38 +429,70 @@ class ViewerND(QtWidgets.QWidget, QObject):
     def get_data_from_1Dsignal_roi(self, datas_transposed, ROI_bounds_1D):
         if ROI_bounds_1D != []:
             if self.ui.combomath.currentText() == 'Sum':
-                navigator_data = [datas_transposed.isig[pt.x():pt.y() + 1].sum((-1)).data for pt in
-                                  ROI_bounds_1D]
+                navigator_data = [self.get_integrated_map(datas_transposed, slice(pt.x(), pt.y() + 1), (-1))
+                                  for pt in ROI_bounds_1D]
             elif self.ui.combomath.currentText() == 'Mean':
-                navigator_data = [datas_transposed.isig[pt.x():pt.y() + 1].mean((-1)).data for pt in
-                                  ROI_bounds_1D]
+                navigator_data = [self.get_integrated_map(datas_transposed, slice(pt.x(), pt.y() + 1), (-1),
+                                                          average=True) for pt in ROI_bounds_1D]
             elif self.ui.combomath.currentText() == 'Half-life':
                 navigator_data = [datas_transposed.isig[pt.x():pt.y() + 1].halflife((-1)).data for pt in
                                   ROI_bounds_1D]
         else:
             if self.ui.combomath.currentText() == 'Sum':
-                navigator_data = [datas_transposed.isig[:].sum((-1)).data]
+                navigator_data = [self.get_integrated_map(datas_transposed, slice(None), (-1))]
             elif self.ui.combomath.currentText() == 'Mean':
-                navigator_data = [datas_transposed.isig[:].mean((-1)).data]
+                navigator_data = [self.get_integrated_map(datas_transposed, slice(None), (-1), average=True)]
             elif self.ui.combomath.currentText() == 'Half-life':
                 navigator_data = [datas_transposed.isig[:].halflife((-1)).data]
         return navigator_data
 
+    def get_integrated_map(self, datas_transposed, slices, axes, average=False):
+        """Sum (or mean) of the data over a region of the signal space, as a navigation map
+
+        The map is computed from the cumulative sums of the integral cache when possible, otherwise by summing the
+        data over the region
+
+        Parameters
+        ----------
+        datas_transposed: (Signal) the data with navigation and signal axes
+        slices: (slice or tuple of slices) the region as given to the isig slicer
+        axes: (int or tuple of int) the signal axes
+        average: (bool) if True return the mean over the region instead of the sum
+
+        Returns
+        -------
+        ndarray: the map with the navigation shape
+
+        See Also
+        --------
+        signal_manager.IntegralCache
+        """
+        if self.use_integral_cache:
+            key = tuple(self.get_selected_axes_indexes())
+            data = self.integral_cache.integrate(key, datas_transposed, slices, average=average)
+            if data is not None:
+                return data
+        if average:
+            return datas_transposed.isig[slices].mean(axes).data
+        else:
+            return datas_transposed.isig[slices].sum(axes).data
+
     def get_nav_data(self, datas_transposed, ROI_bounds_1D, ROI_bounds_2D):
 
         if len(datas_transposed.axes_manager.signal_shape) == 0:  # signal data is 0D
-            navigator_data = [datas_transposed.data]
+            navigator_data = [np.asarray(datas_transposed.data)]
 
         elif len(datas_transposed.axes_manager.signal_shape) == 1:  # signal data is 1D
             navigator_data = self.get_data_from_1Dsignal_roi(datas_transposed, ROI_bounds_1D)
 
         elif len(datas_transposed.axes_manager.signal_shape) == 2:  # signal data is 2D
             if ROI_bounds_2D != []:
-                navigator_data = [datas_transposed.isig[rect.x():rect.x() + rect.width(),
-                                  rect.y():rect.y() + rect.height()].sum((-1, -2)).data for rect in
-                                  ROI_bounds_2D]
+                navigator_data = [self.get_integrated_map(datas_transposed,
+                                                          (slice(rect.x(), rect.x() + rect.width()),
+                                                           slice(rect.y(), rect.y() + rect.height())), (-1, -2))
+                                  for rect in ROI_bounds_2D]
             else:
-                navigator_data = [datas_transposed.sum((-1, -2)).data]
+                navigator_data = [self.get_integrated_map(datas_transposed, (slice(None), slice(None)), (-1, -2))]
         else:
             navigator_data = None
         return navigator_data
@@ -717,6 +752,8 @@ class ViewerND(QtWidgets.QWidget, QObject):
             self.data_to_export['dataND']['CH000'][key] = kwargs[key]
         self._datas = datas
         self.datas = Signal(datas)
+        self.integral_cache.clear()
+        self.use_integral_cache = not temp_data  # live data change at each call, no use building cumulative sums
         self.datas_settings = kwargs
         self.restore_nav_axes(kwargs, nav_axes=nav_axes)
         self.set_nav_shapes()
@@ -865,7 +902,7 @@ class ViewerND(QtWidgets.QWidget, QObject):
                 nav_axes = self.get_selected_axes()
                 # datas_transposed=self.update_data_signal(self.datas)
                 if len(nav_axes) == 0:
-                    data = self.datas.data
+                    data = np.asarray(self.datas.data)
 
                 elif len(nav_axes) == 1:
                     if posx < nav_axes[0]['data'][0] or posx > nav_axes[0]['data'][-1]:
@@ -31,8 +31,189 @@ except:
 
     logger.info('adaptive module is not present, no adaptive scan possible')
 
+class ScanPlan:
+    """
+    Positions of a scan and their indexes within the unique positions of each axis, from an array of all the positions
+
+    Positions and indexes are accessed point by point (get_position, get_indexes), chunk by chunk (get_chunk,
+    iter_chunks) or by iterating the plan. Subclasses (see GridScanPlan) compute them on demand and only build the
+    full tables (positions and axes_indexes attributes) if explicitly asked.
+    """
+    is_lazy = False
+
+    def __init__(self, positions, chunk_size=1000):
+        """
+
+        Parameters
+        ----------
+        positions: (ndarray) array of Nsteps 0th dimension length where each element is the position of all axes
+        chunk_size: (int) number of points computed at once when accessing the positions point by point
+        """
+        if len(positions.shape) == 1:
+            positions = np.expand_dims(positions, 1)
+        self.chunk_size = chunk_size
+        self._chunk_start = 0
+        self._chunk = None
+        self._positions = positions
+        self.axes_unique = []
+        self._axes_indexes = np.zeros_like(positions, dtype=int)
+        for ind_ax, ax in enumerate(positions.T):
+            # the inverse indexes are the indexes of each position within the sorted unique values of its axis
+            ax_unique, self._axes_indexes[:, ind_ax] = np.unique(ax, return_inverse=True)
+            self.axes_unique.append(ax_unique)
+
+    def __len__(self):
+        return self.Nsteps
+
+    def __iter__(self):
+        """Iterate over the scan points, yielding (index of the point, positions, indexes within axes_unique)"""
+        for start, positions, indexes in self.iter_chunks():
+            for ind in range(len(positions)):
+                yield start + ind, positions[ind], indexes[ind]
+
+    def __repr__(self):
+        return f'[{self.__class__.__name__} with {self.Nsteps} positions of {self.Naxes} axes]'
+
+    @property
+    def Nsteps(self):
+        return self._positions.shape[0]
+
+    @property
+    def Naxes(self):
+        return len(self.axes_unique)
+
+    @property
+    def positions(self):
+        """ndarray: all the positions of the scan"""
+        return self._positions
+
+    @property
+    def axes_indexes(self):
+        """ndarray: for all the positions of the scan, the indexes of the position of each axis within axes_unique"""
+        return self._axes_indexes
+
+    def get_chunk(self, start, stop):
+        """Get the positions and indexes of the scan points from start (included) to stop (excluded)
+
+        Returns
+        -------
+        ndarray: positions of shape (stop-start, Naxes)
+        ndarray: indexes of these positions within axes_unique, of shape (stop-start, Naxes)
+        """
+        return self._positions[start:stop], self._axes_indexes[start:stop]
+
+    def iter_chunks(self, chunk_size=None):
+        """Iterate over the scan by chunks, yielding (index of the first point, positions, indexes) see get_chunk"""
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        for start in range(0, self.Nsteps, chunk_size):
+            positions, indexes = self.get_chunk(start, min(start + chunk_size, self.Nsteps))
+            yield start, positions, indexes
+
+    def _get_point(self, ind):
+        if ind < 0 or ind >= self.Nsteps:
+            raise IndexError(f'Scan point index {ind} is out of range (Nsteps: {self.Nsteps})')
+        if self._chunk is None or not self._chunk_start <= ind < self._chunk_start + len(self._chunk[0]):
+            self._chunk_start = ind
+            self._chunk = self.get_chunk(ind, min(ind + self.chunk_size, self.Nsteps))
+        return self._chunk[0][ind - self._chunk_start], self._chunk[1][ind - self._chunk_start]
+
+    def get_position(self, ind):
+        """Get the positions (one per axis) of the scan point of index ind"""
+        return self._get_point(ind)[0]
+
+    def get_indexes(self, ind):
+        """Get the indexes within axes_unique (one per axis) of the scan point of index ind"""
+        return self._get_point(ind)[1]
+
+    def get_axis_positions(self, ind_axis):
+        """Get the positions of one axis to be saved as a navigation axis
+
+        For lazy plans these are the unique positions of the axis, as the positions of each scan point are not stored
+        """
+        return self.positions[:, ind_axis]
+
+    def get_scan_positions(self, ind_axis, step=1):
+        """Get the positions of one axis for the scan points 0, step, 2*step... in the scan order
+
+        Lazy plans only compute this axis, without building the positions of all the axes
+        """
+        return np.array(self.positions[::step, ind_axis])
+
+
+class GridScanPlan(ScanPlan):
+    """
+    Lazy scan plan over the grid made of all the combinations of the positions of each axis
+
+    The last axis is scanned first. In back and forth mode, the last axis is scanned backward for odd indexes of the
+    previous axis. Only the positions of each axis are stored, those of the scan points are computed on demand.
+    """
+    is_lazy = True
+
+    def __init__(self, axes, back_and_forth=False, chunk_size=1000):
+        """
+
+        Parameters
+        ----------
+        axes: (list of 1D ndarray) the positions of each axis in the order they are scanned
+        back_and_forth: (bool) if True, the last axis is scanned backward every other line
+        chunk_size: (int) number of points computed at once when accessing the positions point by point
+        """
+        self.chunk_size = chunk_size
+        self._chunk_start = 0
+        self._chunk = None
+        self._positions = None
+        self._axes_indexes = None
+        self.back_and_forth = back_and_forth
+        self.axes = [np.asarray(axis) for axis in axes]
+        self.shape = tuple([len(axis) for axis in self.axes])
+        self.axes_unique = []
+        self._ranks = []
+        for axis in self.axes:
+            ax_unique, rank = np.unique(axis, return_inverse=True)
+            self.axes_unique.append(ax_unique)
+            self._ranks.append(rank)
+
+    @property
+    def Nsteps(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def positions(self):
+        if self._positions is None:
+            self._positions, self._axes_indexes = self.get_chunk(0, self.Nsteps)
+        return self._positions
+
+    @property
+    def axes_indexes(self):
+        if self._axes_indexes is None:
+            self._positions, self._axes_indexes = self.get_chunk(0, self.Nsteps)
+        return self._axes_indexes
+
+    def _get_grid_indexes(self, scan_indexes):
+        """Get the indexes within self.axes (one array per axis) of the scan points of indexes scan_indexes"""
+        grid_indexes = list(np.unravel_index(scan_indexes, self.shape))
+        if self.back_and_forth and len(self.shape) > 1:
+            # odd lines are scanned backward
+            odd = grid_indexes[-2] % 2 == 1
+            grid_indexes[-1] = np.where(odd, self.shape[-1] - 1 - grid_indexes[-1], grid_indexes[-1])
+        return grid_indexes
+
+    def get_chunk(self, start, stop):
+        grid_indexes = self._get_grid_indexes(np.arange(start, stop))
+        positions = np.stack([axis[index] for axis, index in zip(self.axes, grid_indexes)], axis=1)
+        indexes = np.stack([rank[index] for rank, index in zip(self._ranks, grid_indexes)], axis=1)
+        return positions, indexes
+
+    def get_axis_positions(self, ind_axis):
+        return self.axes_unique[ind_axis]
+
+    def get_scan_positions(self, ind_axis, step=1):
+        return self.axes[ind_axis][self._get_grid_indexes(np.arange(0, self.Nsteps, step))[ind_axis]]
+
+
 class ScanInfo:
-    def __init__(self, Nsteps=0, positions=None, axes_indexes=None, axes_unique=None, **kwargs):
+    def __init__(self, Nsteps=0, positions=None, axes_indexes=None, axes_unique=None, plan=None, **kwargs):
         """
 
         Parameters
@@ -42,15 +223,43 @@ class ScanInfo:
         positions_indexes: (ndarray) multidimensional array of Nsteps 0th dimension length where each element is the index
          of the corresponding positions within the axis_unique
         axes_unique: (list of ndarray) list of sorted (and with unique values) 1D arrays of unique positions of each defined axes
+        plan: (ScanPlan) if not None, Nsteps, axes_unique and the (possibly lazily computed) positions and axes_indexes
+            are the ones of the plan
         """
+        self.plan = plan
+        if plan is not None:
+            Nsteps = plan.Nsteps
+            axes_unique = plan.axes_unique
         self.Nsteps = Nsteps
-        self.positions = positions
-        self.axes_indexes = axes_indexes
+        self._positions = positions
+        self._axes_indexes = axes_indexes
         self.axes_unique = axes_unique
         for k in kwargs:
             setattr(self, k, kwargs[k])
 
+    @property
+    def positions(self):
+        if self._positions is None and self.plan is not None:
+            return self.plan.positions
+        return self._positions
+
+    @positions.setter
+    def positions(self, positions):
+        self._positions = positions
+
+    @property
+    def axes_indexes(self):
+        if self._axes_indexes is None and self.plan is not None:
+            return self.plan.axes_indexes
+        return self._axes_indexes
+
+    @axes_indexes.setter
+    def axes_indexes(self, axes_indexes):
+        self._axes_indexes = axes_indexes
+
     def __repr__(self):
+        if self.plan is not None:
+            return f'[ScanInfo with {self.Nsteps} positions of shape {(self.plan.Nsteps, self.plan.Naxes)})'
         return f'[ScanInfo with {self.Nsteps} positions of shape {self.positions.shape})'
 
 
@@ -116,21 +325,13 @@ class ScanParameters:
 
     def get_info_from_positions(self, positions):
         if positions is not None:
-            if len(positions.shape) == 1:
-                positions = np.expand_dims(positions, 1)
-            axes_unique = []
-            for ax in positions.T:
-                axes_unique.append(np.unique(ax))
-            axes_indexes = np.zeros_like(positions, dtype=np.int)
-            for ind in range(positions.shape[0]):
-                for ind_pos, pos in enumerate(positions[ind]):
-                    axes_indexes[ind, ind_pos] = utils.find_index(axes_unique[ind_pos], pos)[0][0]
-
-            return ScanInfo(Nsteps=positions.shape[0], axes_unique=axes_unique,
-                                      axes_indexes=axes_indexes, positions=positions, adaptive_loss=self.adaptive_loss)
+            return ScanInfo(plan=ScanPlan(positions), adaptive_loss=self.adaptive_loss)
         else:
             return ScanInfo()
 
+    def get_info_from_plan(self, plan):
+        return ScanInfo(plan=plan, adaptive_loss=self.adaptive_loss)
+
     def set_scan(self):
 
         if self.scan_type == "Scan1D":
@@ -160,19 +361,19 @@ class ScanParameters:
 
         elif self.scan_type == "Scan2D":
             if self.scan_subtype == 'Spiral':
-                positions = set_scan_spiral(self.starts, self.stops, self.steps)
+                positions = set_scan_spiral(self.starts, self.stops, self.steps, oversteps=None)
                 self.scan_info = self.get_info_from_positions(positions)
 
-            elif self.scan_subtype == 'Back&Forth':
-                positions = set_scan_linear(self.starts, self.stops, self.steps, back_and_force=True)
-                self.scan_info = self.get_info_from_positions(positions)
-
-            elif self.scan_subtype == 'Linear':
-                positions = set_scan_linear(self.starts, self.stops, self.steps, back_and_force=False)
-                self.scan_info = self.get_info_from_positions(positions)
+            elif self.scan_subtype == 'Back&Forth' or self.scan_subtype == 'Linear':
+                axes = get_scan_linear_axes(self.starts, self.stops, self.steps)
+                if axes is None:  # invalid bounds, the scan is only the start position
+                    self.scan_info = self.get_info_from_positions(np.array([self.starts]))
+                else:
+                    self.scan_info = self.get_info_from_plan(
+                        GridScanPlan(axes, back_and_forth=self.scan_subtype == 'Back&Forth'))
 
             elif self.scan_subtype == 'Random':
-                positions = set_scan_random(self.starts, self.stops, self.steps)
+                positions = set_scan_random(self.starts, self.stops, self.steps, oversteps=None)
                 self.scan_info = self.get_info_from_positions(positions)
 
             elif self.scan_subtype == 'Adaptive':
@@ -184,8 +385,12 @@ class ScanParameters:
 
         elif self.scan_type == "Sequential":
             if self.scan_subtype == 'Linear':
-                positions = set_scan_sequential(self.starts, self.stops, self.steps)
-                self.scan_info = self.get_info_from_positions(positions)
+                if np.any(pos_above_stops(self.starts, self.steps, self.stops)):
+                    self.scan_info = self.get_info_from_positions(np.array([self.starts[:]]))
+                else:
+                    self.scan_info = self.get_info_from_plan(GridScanPlan(
+                        [get_sequential_axis(start, stop, step)
+                         for start, stop, step in zip(self.starts, self.stops, self.steps)]))
             else:
                 raise ScannerException(f'The chosen scan_subtype: {str(self.scan_subtype)} is not known')
 
@@ -899,6 +1104,30 @@ class TableModelSequential(gutils.TableModel):
 
 
 
+def get_scan_linear_axes(starts, stops, steps):
+    """Get the positions of each axis of a 2D linear scan
+
+    Parameters
+    ----------
+    starts
+    stops
+    steps
+
+    Returns
+    -------
+    list of ndarray: the positions of each axis or None if the bounds are invalid (null step, stop before start...)
+    """
+    starts = np.array(starts)
+    stops = np.array(stops)
+    steps = np.array(steps)
+
+    if np.any(np.abs(steps) < 1e-12) or \
+            np.any(np.sign(stops - starts) != np.sign(steps)) or \
+            np.any(starts == stops):
+        return None
+    return [linspace_step(starts[0], stops[0], steps[0]), linspace_step(starts[1], stops[1], steps[1])]
+
+
 def set_scan_linear(starts, stops, steps, back_and_force=False, oversteps=10000):
     """
         Set a linear scan
@@ -909,6 +1138,7 @@ def set_scan_linear(starts, stops, steps, back_and_force=False, oversteps=10000)
     steps
     back_and_force: (bool) if True insert between two steps a position back to start (to be used as a reference in the scan analysis)
     oversteps: (int) maximum number of calculated steps (stops the steps calculation if over the first power of 2 greater than oversteps)
+        if None, no limit (see also GridScanPlan for a lazy equivalent)
 
     Returns
     -------
@@ -918,39 +1148,20 @@ def set_scan_linear(starts, stops, steps, back_and_force=False, oversteps=10000)
     --------
     ScanParameters
     """
-    starts = np.array(starts)
-    stops = np.array(stops)
-    steps = np.array(steps)
-
-    if np.any(np.abs(steps) < 1e-12) or \
-            np.any(np.sign(stops - starts) != np.sign(steps)) or \
-            np.any(starts == stops):
-        return np.array([starts])
+    axes = get_scan_linear_axes(starts, stops, steps)
+    if axes is None:
+        return np.array([np.array(starts)])
 
     else:
-        axis_1_unique = linspace_step(starts[0], stops[0], steps[0])
+        axis_1_unique, axis_2_unique = axes
         len1 = len(axis_1_unique)
-
-        axis_2_unique = linspace_step(starts[1], stops[1], steps[1])
         len2 = len(axis_2_unique)
         # if number of steps is over oversteps, reduce both axis in the same ratio
-        if len1 * len2 > oversteps:
+        if oversteps is not None and len1 * len2 > oversteps:
             axis_1_unique = axis_1_unique[:int(np.ceil(np.sqrt(oversteps * len1 / len2)))]
             axis_2_unique = axis_2_unique[:int(np.ceil(np.sqrt(oversteps * len2 / len1)))]
 
-        positions = []
-        for ind_x, pos1 in enumerate(axis_1_unique):
-            if back_and_force:
-                for ind_y, pos2 in enumerate(axis_2_unique):
-                    if not odd_even(ind_x):
-                        positions.append([pos1, pos2])
-                    else:
-                        positions.append([pos1, axis_2_unique[len(axis_2_unique) - ind_y - 1]])
-            else:
-                for ind_y, pos2 in enumerate(axis_2_unique):
-                    positions.append([pos1, pos2])
-
-        return np.array(positions)
+        return GridScanPlan([axis_1_unique, axis_2_unique], back_and_forth=back_and_force).positions
 
 
 def set_scan_random(starts, stops, steps, oversteps=10000):
@@ -961,7 +1172,7 @@ def set_scan_random(starts, stops, steps, oversteps=10000):
     starts
     stops
     steps
-    oversteps
+    oversteps: (int) see set_scan_linear
 
     Returns
     -------
@@ -983,6 +1194,7 @@ def set_scan_spiral(starts, rmaxs, rsteps, nsteps=None, oversteps=10000):
     rsteps: (sequence like) containing the step size for each axis
     nsteps: (int) If not None, this is used together with rsteps to calculate rmaxs
     oversteps: (int) maximum number of calculated steps (stops the steps calculation if over the first power of 2 greater than oversteps)
+        if None, no limit
 
     Returns
     -------
@@ -1010,9 +1222,8 @@ def set_scan_spiral(starts, rmaxs, rsteps, nsteps=None, oversteps=10000):
         positions = np.array([starts])
         return positions
 
-    ind = 0
-    flag = True
-    oversteps = greater2n(oversteps)  # make sure the position matrix is still a square
+    if oversteps is not None:
+        oversteps = greater2n(oversteps)  # make sure the position matrix is still a square
 
     Nlin = np.trunc(rmaxs / rsteps)
     if not np.all(Nlin == Nlin[0]):
@@ -1020,38 +1231,23 @@ def set_scan_spiral(starts, rmaxs, rsteps, nsteps=None, oversteps=10000):
     else:
         Nlin = Nlin[0]
 
+    # the spiral is made of segments of length 1, 1, 2, 2, 3, 3... alternatively along axis 1 and 2, going forward
+    # for odd lengths and backward for even ones. There is at least one move from the center
+    Npositions = (2 * Nlin + 1) ** 2
+    if oversteps is not None:
+        Npositions = min(Npositions, oversteps)
+    Nmoves = max(int(Npositions), 2) - 1
+    Nsegments = int(np.ceil(np.sqrt(Nmoves))) + 1  # ensures Nsegments * (Nsegments + 1) >= Nmoves
+    segment_lengths = np.repeat(np.arange(1, Nsegments + 1), 2)
+    segment_axes = np.tile([0, 1], Nsegments)
+    segment_steps = np.where(segment_lengths % 2 == 1, 1, -1)
 
-    axis_1_indexes = [0]
-    axis_2_indexes = [0]
-    while flag:
-        if odd_even(ind):
-            step = 1
-        else:
-            step = -1
-        if flag:
-
-            for ind_step in range(ind):
-                axis_1_indexes.append(axis_1_indexes[-1] + step)
-                axis_2_indexes.append(axis_2_indexes[-1])
-                if len(axis_1_indexes) >= (2 * Nlin + 1) ** 2 or len(axis_1_indexes) >= oversteps:
-                    flag = False
-                    break
-        if flag:
-            for ind_step in range(ind):
-
-                axis_1_indexes.append(axis_1_indexes[-1])
-                axis_2_indexes.append(axis_2_indexes[-1] + step)
-                if len(axis_1_indexes) >= (2 * Nlin + 1) ** 2 or len(axis_1_indexes) >= oversteps:
-                    flag = False
-                    break
-        ind += 1
-
-    positions = []
-    for ind in range(len(axis_1_indexes)):
-        positions.append(np.array([axis_1_indexes[ind] * rsteps[0] + starts[0],
-                                   axis_2_indexes[ind] * rsteps[1] + starts[1]]))
+    move_axes = np.repeat(segment_axes, segment_lengths)[:Nmoves]
+    move_steps = np.repeat(segment_steps, segment_lengths)[:Nmoves]
+    axis_1_indexes = np.concatenate(([0], np.cumsum(np.where(move_axes == 0, move_steps, 0))))
+    axis_2_indexes = np.concatenate(([0], np.cumsum(np.where(move_axes == 1, move_steps, 0))))
 
-    return np.array(positions)
+    return np.stack((axis_1_indexes * rsteps[0] + starts[0], axis_2_indexes * rsteps[1] + starts[1]), axis=1)
 
 
 def pos_above_stops(positions, steps, stops):
@@ -1080,23 +1276,40 @@ def set_scan_sequential(starts, stops, steps):
     positions: (ndarray)
     """
 
-    all_positions = [starts[:]]
-    positions = starts[:]
-    state = pos_above_stops(positions, steps, stops)
-    while not state[0]:
-        if not np.any(np.array(state)):
-            positions[-1] += steps[-1]
+    if np.any(pos_above_stops(starts, steps, stops)):
+        return np.array([starts[:]])
 
-        else:
-            indexes_true = np.where(np.array(state))
-            positions[indexes_true[-1][0]] = starts[indexes_true[-1][0]]
-            positions[indexes_true[-1][0]-1] += steps[indexes_true[-1][0]-1]
+    # the last axis is scanned first, each axis taking successively all its positions (while not above its stop) for
+    # each position of the previous axes
+    return GridScanPlan([get_sequential_axis(start, stop, step)
+                         for start, stop, step in zip(starts, stops, steps)]).positions
+
+
+def get_sequential_axis(start, stop, step):
+    """Get the positions of an axis of a sequential scan from start up to stop (included) by steps
 
-        state = pos_above_stops(positions, steps, stops)
-        if not np.any(np.array(state)):
-            all_positions.append(positions[:])
+    The positions are cumulated step by step (and not calculated as start + n * step) to give exactly the same floating
+    point values as incrementing a position while it is not above stop.
 
-    return np.array(all_positions)
+    Parameters
+    ----------
+    start: (float)
+    stop: (float)
+    step: (float)
+
+    Returns
+    -------
+    ndarray: the positions of the axis
+    """
+    if np.abs(step) < 1e-12:
+        return np.array([start])
+    Nsteps = int(np.floor((stop - start) / step)) + 2
+    while True:
+        positions = np.add.accumulate(np.concatenate(([start], np.full((Nsteps,), step))))
+        above = positions > stop if step >= 0 else positions < stop  # see pos_above_stops
+        if np.any(above):
+            return positions[:np.argmax(above)]
+        Nsteps *= 2
 
 
 if __name__ == '__main__':
@@ -4,10 +4,16 @@ Created on Fri Aug 30 12:21:56 2019
 
 @author: Weber
 """
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QThread
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QThread, QSocketNotifier
 from PyQt5 import QtWidgets
+import os
 import socket
 import select
+import mmap
+import threading
+import weakref
+import tempfile
+import zlib
 import numpy as np
 from pymodaq.daq_utils.daq_utils import getLineInfo, ThreadCommand
 from pyqtgraph.parametertree import Parameter, ParameterTree
@@ -15,19 +21,207 @@ import pyqtgraph.parametertree.parameterTypes as pTypes
 import pymodaq.daq_utils.custom_parameter_tree as custom_tree
 from collections import OrderedDict
 
+# optional compression of the array payloads: name: (compress, decompress), see Socket.set_codec
+payload_codecs = OrderedDict(none=(None, None),
+                             zlib=(lambda data: zlib.compress(data, 1), zlib.decompress))
+try:
+    import lz4.frame
+    payload_codecs['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
+except ImportError:
+    pass
+
 tcp_parameters = [{'title': 'Port:', 'name': 'port_id', 'type': 'int', 'value': 6341, 'default': 6341},
                   {'title': 'IP:', 'name': 'socket_ip', 'type': 'str', 'value': '10.47.0.39',
                    'default': '10.47.0.39'},
                   {'title': 'Settings PyMoDAQ Client:', 'name': 'settings_client', 'type': 'group', 'children': []},
                   {'title': 'Infos Client:', 'name': 'infos', 'type': 'group', 'children': []},
                   {'title': 'Connected clients:', 'name': 'conn_clients', 'type': 'table',
-                   'value': dict(), 'header': ['Type', 'adress']}, ]
+                   'value': dict(), 'header': ['Type', 'adress']},
+                  {'title': 'Payload codec:', 'name': 'codec', 'type': 'list', 'value': 'none',
+                   'values': list(payload_codecs.keys()),
+                   'tip': 'Compression of the arrays sent by the clients (requested to PyMoDAQ clients only)'},
+                  {'title': 'Delta frames:', 'name': 'delta', 'type': 'bool', 'value': False,
+                   'tip': 'Clients send arrays coded against the previous one of same type and shape'},
+                  {'title': 'Shared memory:', 'name': 'shared_memory', 'type': 'bool', 'value': False,
+                   'tip': 'Clients running on the same host send arrays through shared memory'},
+                  {'title': 'Shared memory slots:', 'name': 'shared_memory_slots', 'type': 'int', 'value': 8,
+                   'min': 2, 'tip': 'Maximum number of arrays sent through shared memory and not yet read by the server'},
+                  ]
 # %%
 
+
+def xor_frames(frame, reference):
+    """
+    Bytewise exclusive or between two arrays of same dtype and shape. Used to code an array against a previous one, the
+    result being mostly zeros for slowly changing data. The operation is its own inverse.
+
+    Parameters
+    ----------
+    frame: (ndarray) C contiguous array
+    reference: (ndarray) C contiguous array with same dtype and shape as frame
+
+    Returns
+    -------
+    ndarray: 1D uint8 array
+    """
+    return np.bitwise_xor(frame.reshape(-1).view(np.uint8), reference.reshape(-1).view(np.uint8))
+
+
+class SharedMemoryRing:
+    """
+    Ring buffer of Nslots arrays within a memory mapped file (in /dev/shm when available) to be shared with another
+    process on the same host, see Socket.set_shared_memory. The file is reallocated if an array doesn't fit in a slot.
+
+    The file starts with a header holding the number of arrays released by the receiver (no longer used, see
+    SharedMemoryMapping), so a slot is only reused once the array written in it has been released.
+
+    Parameters
+    ----------
+    Nslots: (int) the number of slots, i.e. the number of arrays sent and not yet released by the receiver
+    """
+    shared_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    prefix = 'pymodaq_'
+    suffix = '.shm'
+    header_size = 64
+
+    def __init__(self, Nslots=8):
+        self.Nslots = Nslots
+        self.slot_size = 0
+        self.Nwritten = 0
+        self.path = None
+        self.buffer = None
+        self._released = None
+
+    def allocate(self, nbytes):
+        self.close()
+        self.slot_size = int(np.ceil(nbytes / 64) * 64)
+        fd, self.path = tempfile.mkstemp(prefix=self.prefix, suffix=self.suffix, dir=self.shared_dir)
+        try:
+            os.ftruncate(fd, self.header_size + self.slot_size * self.Nslots)
+            self.buffer = mmap.mmap(fd, self.header_size + self.slot_size * self.Nslots)
+        finally:
+            os.close(fd)
+        self._released = np.ndarray((1,), dtype=np.uint64, buffer=self.buffer)
+        self.Nwritten = 0
+
+    @classmethod
+    def is_ring_path(cls, path):
+        """Check if path is the one of a ring buffer file, i.e. within shared_dir and named as created by allocate"""
+        name = os.path.basename(path)
+        return os.path.dirname(os.path.realpath(path)) == os.path.realpath(cls.shared_dir) and \
+            name.startswith(cls.prefix) and name.endswith(cls.suffix)
+
+    def write(self, data):
+        """
+        Copy an array in the next slot
+
+        Parameters
+        ----------
+        data: (ndarray) C contiguous array
+
+        Returns
+        -------
+        bytes or None: the descriptor of the slot as 'Nwritten:offset:path', Nwritten being the number of arrays
+            written including this one. None if the next slot holds an array not yet released by the receiver
+        """
+        if data.nbytes > self.slot_size:
+            self.allocate(data.nbytes)
+        if self.Nwritten - int(self._released[0]) >= self.Nslots:
+            return None
+        offset = self.header_size + (self.Nwritten % self.Nslots) * self.slot_size
+        np.ndarray(data.shape, dtype=data.dtype, buffer=self.buffer, offset=offset)[...] = data
+        self.Nwritten += 1
+        return f'{self.Nwritten}:{offset}:{self.path}'.encode()
+
+    def close(self):
+        if self.buffer is not None:
+            self._released = None
+            self.buffer.close()
+            self.buffer = None
+            try:
+                os.remove(self.path)
+            except OSError:  # still mapped by the receiver on windows
+                pass
+
+
+class SharedMemorySlot:
+    """
+    Owner of an array written in a slot of a SharedMemoryRing, used as the base of the read-only views given to the
+    receiver so that all the arrays derived from them keep it alive (see SharedMemoryMapping.array)
+
+    Parameters
+    ----------
+    array: (ndarray) the array in the mapped memory
+    """
+
+    def __init__(self, array):
+        self._array = array
+        self.__array_interface__ = dict(array.__array_interface__, data=(array.__array_interface__['data'][0], True))
+
+
+class SharedMemoryMapping:
+    """
+    Receiver side of a SharedMemoryRing: maps its file and gives the arrays written in it as read-only views, without
+    copy. The slot of an array is released to the sender once the view and all the arrays derived from it have been
+    garbage collected. As the sender reuses its slots in order, the released count written in the header only advances
+    over consecutive released arrays.
+
+    The memory stays mapped as long as this object or any of the views exist.
+
+    Parameters
+    ----------
+    path: (str) the path of the ring buffer file
+    """
+
+    def __init__(self, path):
+        with open(path, 'r+b') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0)
+        self._released = np.ndarray((1,), dtype=np.uint64, buffer=self.buffer)
+        self.Nreleased = int(self._released[0])
+        self._pending = set()
+        self._lock = threading.Lock()  # the views may be collected from any thread
+
+    def array(self, Nwritten, offset, dtype, shape):
+        """
+        Get a read-only view on an array written in the ring, its slot being released when the view is collected
+
+        Parameters
+        ----------
+        Nwritten: (int) the number of arrays written by the sender including this one, see SharedMemoryRing.write
+        offset: (int) the position of the slot in the file
+        dtype: (numpy dtype)
+        shape: (tuple of int)
+
+        Returns
+        -------
+        ndarray: read-only view whose base is a SharedMemorySlot
+        """
+        slot = SharedMemorySlot(np.ndarray(shape, dtype=dtype, buffer=self.buffer, offset=offset))
+        weakref.finalize(slot, self.release, Nwritten)
+        return np.asarray(slot)
+
+    def release(self, Nwritten):
+        """Release the slot of the Nwritten-th array, the header being updated once the previous ones are released"""
+        with self._lock:
+            if Nwritten > self.Nreleased:
+                self._pending.add(Nwritten)
+            while self.Nreleased + 1 in self._pending:
+                self.Nreleased += 1
+                self._pending.remove(self.Nreleased)
+            self._released[0] = self.Nreleased
+
+
 class Socket:
     def __init__(self, socket=None):
         super().__init__()
         self._socket = socket
+        self.codec = 'none'
+        self.delta = False
+        self._sent_frames = dict()
+        self._received_frames = dict()
+        self.shared_memory = None
+        self.shared_memory_allowed = False
+        self._mapped_memory = dict()
 
     def __eq__(self, other_obj):
         if isinstance(other_obj, Socket):
@@ -63,9 +257,77 @@ class Socket:
     def recv(self, *args, **kwargs):
         return self.socket.recv(*args, **kwargs)
 
+    def recv_into(self, *args, **kwargs):
+        return self.socket.recv_into(*args, **kwargs)
+
     def close(self):
+        self.set_shared_memory(False)
+        self.allow_shared_memory(False)
         return self.socket.close()
 
+    def set_codec(self, codec='none', delta=False):
+        """
+        Set how arrays are sent by send_array. With the default (no codec and no delta) the legacy format is used.
+        Otherwise, the codec and delta flags are appended to the data type in the array header (as in '<u2;zlib;delta')
+        so the peer must be able to decode them (get_array decodes any of them). Within pymodaq, TCPServer requests
+        the codec to its clients, see TCPServer.send_codec_request
+
+        Parameters
+        ----------
+        codec: (str) one of the keys of payload_codecs
+        delta: (bool) if True, arrays are sent coded (see xor_frames) against the previous array of same type and
+               shape, the first one being sent as a key frame
+        """
+        if codec not in payload_codecs:
+            raise ValueError(f'Unknown payload codec: {codec}, should be one of {list(payload_codecs.keys())}')
+        self.codec = codec
+        self.delta = delta
+        self._sent_frames = dict()
+
+    def set_shared_memory(self, enable=True, Nslots=8):
+        """
+        Send arrays through a shared memory ring buffer (see SharedMemoryRing), only a descriptor of the array location
+        being sent in the payload, flagged as ';shm' in the array header. It has precedence over the codec options and
+        is only possible if the receiver runs on the same host, which must accept it, see allow_shared_memory. If the
+        receiver has not yet released the array previously written in the next slot, the array is sent within the
+        payload instead.
+
+        Parameters
+        ----------
+        enable: (bool) if False, release the shared memory and send the arrays within the payload
+        Nslots: (int) the number of slots of the ring buffer
+        """
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+            self.shared_memory = None
+        if enable:
+            self.shared_memory = SharedMemoryRing(Nslots)
+
+    def allow_shared_memory(self, allow=True):
+        """
+        Accept the arrays sent through shared memory by the peer, see set_shared_memory. To be enabled only when
+        requesting it to a peer on the same host: as the receiver maps the file given in the array descriptor, arrays
+        flagged as ';shm' are otherwise rejected
+
+        Parameters
+        ----------
+        allow: (bool) if False, reject the arrays sent through shared memory and release the mapped memory
+        """
+        self.shared_memory_allowed = allow
+        if not allow:
+            self._release_mapped_memory()
+
+    def _release_mapped_memory(self):
+        # the files are unmapped once the received arrays still in use are collected, see SharedMemoryMapping
+        self._mapped_memory = dict()
+
+    def is_local(self):
+        """Check if the peer of this connected socket runs on the same host (connected through the same address)"""
+        try:
+            return self.socket.getpeername()[0] == self.socket.getsockname()[0]
+        except (OSError, IndexError):
+            return False
+
     @classmethod
     def message_to_bytes(cls, message):
         """
@@ -93,7 +355,7 @@ class Socket:
 
     @classmethod
     def bytes_to_int(cls, bytes_string):
-        if not isinstance(bytes_string, bytes):
+        if not isinstance(bytes_string, (bytes, bytearray)):
             raise TypeError(f'{bytes_string} should be an bytes string, not a {type(bytes_string)}')
         assert len(bytes_string) == 4
         return int.from_bytes(bytes_string, 'big')
@@ -117,6 +379,30 @@ class Socket:
             sended += self.socket.send(data_bytes[sended:])
         #print(data_bytes)
 
+    def check_sended_buffers(self, buffers):
+        """
+        Make sure all bytes of several buffers are sent through the socket, without concatenating them
+        Parameters
+        ----------
+        buffers: (list) of objects supporting the buffer protocol (bytes, bytearray, C contiguous ndarray...)
+
+        Returns
+        -------
+
+        """
+        views = [memoryview(buffer) for buffer in buffers]
+        views = [view.cast('B') for view in views if view.nbytes != 0]
+        if hasattr(self.socket, 'sendmsg'):  # gathered send (not available on windows)
+            while len(views) != 0:
+                sended = self.socket.sendmsg(views)
+                while len(views) != 0 and sended >= len(views[0]):
+                    sended -= len(views.pop(0))
+                if sended != 0:
+                    views[0] = views[0][sended:]
+        else:
+            for view in views:
+                self.socket.sendall(view)
+
 
     def check_received_length(self, length):
         """
@@ -133,16 +419,15 @@ class Socket:
         if not isinstance(length, int):
             raise TypeError(f'{length} should be an integer, not a {type(length)}')
 
+        # the buffer is allocated once and filled in place
+        data_bytes = bytearray(length)
+        view = memoryview(data_bytes)
         l = 0
-        data_bytes = b''
         while l < length:
-            if l < length - 4096:
-                data_bytes_tmp = self.socket.recv(4096)
-            else:
-                data_bytes_tmp = self.socket.recv(length - l)
-            l += len(data_bytes_tmp)
-            data_bytes += data_bytes_tmp
-        # print(data_bytes)
+            received = self.socket.recv_into(view[l:], length - l)
+            if received == 0:
+                raise ConnectionError(f'The connection has been closed before receiving {length} bytes')
+            l += received
         return data_bytes
 
     def send_string(self, string):
@@ -158,8 +443,7 @@ class Socket:
 
         """
         cmd_bytes, cmd_length_bytes = self.message_to_bytes(string)
-        self.check_sended(cmd_length_bytes)
-        self.check_sended(cmd_bytes)
+        self.check_sended(cmd_length_bytes + cmd_bytes)
 
     def get_string(self):
         string_len = self.get_int()
@@ -217,39 +501,144 @@ class Socket:
         for ind in range(shape_len):
             shape.append(self.get_int())
         data_bytes = self.check_received_length(data_len)
-        data = np.frombuffer(data_bytes, dtype=data_type)
+        if ';' in data_type:
+            data = self.decode_array(data_type, data_bytes, tuple(shape))
+        else:
+            data = np.frombuffer(data_bytes, dtype=data_type)
         data = data.reshape(tuple(shape))
         return data
 
+    def decode_array(self, data_type, data_bytes, shape):
+        """
+        Decode an array payload sent with a codec and/or as a delta frame, see set_codec
+
+        Parameters
+        ----------
+        data_type: (str) the data type with the codec flags as sent in the array header, as in '<u2;zlib;delta'
+        data_bytes: (bytes) the payload
+        shape: (tuple) the array shape
+
+        Returns
+        -------
+        ndarray: the 1D decoded array
+        """
+        flags = data_type.split(';')
+        data_type, codec = flags[0], flags[1]
+        if codec == 'shm':
+            return self.read_shared_memory(data_type, data_bytes, shape)
+        if codec not in payload_codecs:
+            raise IOError(f'Received an array compressed with an unsupported codec: {codec}')
+        decompress = payload_codecs[codec][1]
+        if decompress is not None:
+            data_bytes = decompress(data_bytes)
+        data = np.frombuffer(data_bytes, dtype=data_type)
+        if len(flags) > 2:
+            key = (data_type, shape)
+            if flags[2] == 'delta':
+                data = xor_frames(data, self._received_frames[key]).view(data_type)
+            data.flags.writeable = False  # kept as the reference of the next delta frame
+            self._received_frames[key] = data
+        return data
+
+    def read_shared_memory(self, data_type, descriptor, shape):
+        """
+        Get an array sent through shared memory, see set_shared_memory, as a read-only view on the mapped memory (no
+        copy). Its slot is released to the sender once the view (and the arrays derived from it) are garbage
+        collected, see SharedMemoryMapping: a receiver keeping more arrays than the number of slots makes the sender
+        send the next ones within the payload, and should copy the arrays it keeps for long.
+
+        Parameters
+        ----------
+        data_type: (str) the array data type as a string
+        descriptor: (bytes) the location of the array as 'Nwritten:offset:path', see SharedMemoryRing.write
+        shape: (tuple) the array shape
+
+        Returns
+        -------
+        ndarray: the read-only array
+        """
+        if not self.shared_memory_allowed:
+            raise IOError('Received an array through shared memory while it has not been requested')
+        try:
+            Nwritten, offset, path = descriptor.decode().split(':', 2)
+            Nwritten, offset = int(Nwritten), int(offset)
+        except ValueError:
+            raise IOError(f'Invalid shared memory descriptor: {descriptor}')
+        if not SharedMemoryRing.is_ring_path(path):
+            raise IOError(f'Received an array through shared memory from an invalid location: {path}')
+        if path not in self._mapped_memory:
+            self._release_mapped_memory()  # the sender has reallocated its ring buffer
+            self._mapped_memory[path] = SharedMemoryMapping(path)
+        mapping = self._mapped_memory[path]
+        dtype = np.dtype(data_type)
+        if offset < SharedMemoryRing.header_size or offset + int(np.prod(shape)) * dtype.itemsize > len(mapping.buffer):
+            raise IOError(f'Invalid shared memory descriptor: {descriptor}')
+        return mapping.array(Nwritten, offset, dtype, shape)
+
     def send_array(self, data_array):
         """send ndarrays
 
         get data type as a string
-        reshape array as 1D array and get the array dimensionality (len of array's shape)
-        convert Data array as bytes
+        get the array dimensionality (len of array's shape)
         send data type
         send data length
         send data shape length
         send all values of the shape as integers converted to bytes
         send data as bytes
+
+        The header and the data are sent together, the data being sent from the array memory (without copy if the
+        array is C contiguous) or encoded if a codec has been set, see set_codec, or written in shared memory, see
+        set_shared_memory
         """
         if not isinstance(data_array, np.ndarray):
             raise TypeError(f'{data_array} should be an numpy array, not a {type(data_array)}')
         data_type = data_array.dtype.descr[0][1]
         data_shape = data_array.shape
 
-        data = data_array.reshape(np.prod(data_shape))
-        data_bytes = data.tobytes()
-
-        self.send_string(data_type)
-        self.check_sended(self.int_to_bytes(len(data_bytes)))
-        self.check_sended(self.int_to_bytes(len(data_shape)))
-        for Nxxx in data_shape:
-            self.check_sended(self.int_to_bytes(Nxxx))
-        self.check_sended(data_bytes)
+        data = np.ascontiguousarray(data_array)
+        descriptor = None
+        if self.shared_memory is not None and data.nbytes > 0:
+            descriptor = self.shared_memory.write(data)
+        if descriptor is not None:
+            data_type, data = f'{data_type};shm', descriptor
+        elif (self.codec != 'none' or self.delta) and data.nbytes > 0:
+            data_type, data = self.encode_array(data_type, data)
+
+        type_bytes, type_length_bytes = self.message_to_bytes(data_type)
+        header = type_length_bytes + type_bytes + self.int_to_bytes(memoryview(data).nbytes) + \
+                 self.int_to_bytes(len(data_shape)) + b''.join([self.int_to_bytes(Nxxx) for Nxxx in data_shape])
+        self.check_sended_buffers([header, data])
+
+    def encode_array(self, data_type, data):
+        """
+        Encode an array payload with the codec and delta options, see set_codec
 
+        Parameters
+        ----------
+        data_type: (str) the array data type as a string
+        data: (ndarray) C contiguous array
 
+        Returns
+        -------
+        str: the data type with the codec flags to be sent in the array header
+        bytes or ndarray: the payload
+        """
+        flags = [data_type, self.codec]
+        payload = data
+        if self.delta:
+            key = (data_type, data.shape)
+            reference = self._sent_frames.get(key, None)
+            if reference is None:
+                flags.append('key')
+            else:
+                flags.append('delta')
+                payload = xor_frames(data, reference)
+            self._sent_frames[key] = data.copy()
 
+        compress = payload_codecs[self.codec][0]
+        if compress is not None:
+            payload = compress(payload)
+        return ';'.join(flags), payload
 
     def send_list(self, data_list):
         """
@@ -519,6 +908,10 @@ class TCPClient(QObject):
 
         """
         if self.socket is not None:
+            if message.startswith('set_codec;'):
+                self.set_codec(message)
+                return
+
             messg = ThreadCommand(message)
 
             if message == 'set_info':
@@ -536,6 +929,27 @@ class TCPClient(QObject):
 
             self.cmd_signal.emit(messg)
 
+    def set_codec(self, message):
+        """
+        Apply the payload codec and shared memory options requested by the server, see
+        TCPServer.send_codec_request. Arrays are sent uncompressed if the requested codec is not available here
+
+        Parameters
+        ----------
+        message: (str) the request as 'set_codec;codec' optionally followed by ';delta' and ';shm:Nslots'
+        """
+        flags = message.split(';')
+        codec = flags[1]
+        if codec not in payload_codecs:
+            self.cmd_signal.emit(ThreadCommand('Update_Status', [f'Payload codec {codec} is not available', 'log']))
+            codec = 'none'
+        self.socket.set_codec(codec, delta='delta' in flags[2:])
+        shm_flags = [flag for flag in flags[2:] if flag.startswith('shm')]
+        if len(shm_flags) != 0:
+            self.socket.set_shared_memory(True, int(shm_flags[0].split(':')[1]))
+        else:
+            self.socket.set_shared_memory(False)
+
     @pyqtSlot(list)
     def data_ready(self, datas):
         self.send_data(datas[0]['data'])  # datas from viewer 0 and get 'data' key (within the ordereddict list of datas
@@ -549,6 +963,7 @@ class TCPServer(QObject):
         QObject.__init__(self)
         self.serversocket = None
         self.connected_clients = []
+        self.notifiers = dict()
         self.listening = True
         self.processing = False
         self.client_type = client_type
@@ -586,26 +1001,33 @@ class TCPServer(QObject):
         self.connected_clients.append(dict(socket=self.serversocket, type='server'))
         self.settings.child(('conn_clients')).setValue(self.set_connected_clients_table())
 
-        self.timer = self.startTimer(100)  # Timer event fired every 100ms
-        # self.listen_client()
+        self.add_notifier(self.serversocket)
 
-    def timerEvent(self, event):
+    def add_notifier(self, sock):
         """
-            Called by set timers.
-            If the process is free, start the listen_client function.
+        Watch a socket from the event loop of the thread the server lives in: listen_client is called as soon as the
+        socket is readable (incoming connection on the server socket or message from a client), without polling.
 
-            =============== ==================== ==============================================
-            **Parameters**   **Type**              **Description**
+        Parameters
+        ----------
+        sock: (Socket) the server socket or a connected client socket
+        """
+        notifier = QSocketNotifier(sock.socket.fileno(), QSocketNotifier.Read, self)
+        notifier.activated.connect(lambda fd: self.listen_client(sock))
+        self.notifiers[sock.socket] = notifier
 
-            *event*          QTimerEvent object    Containing id from timer issuing this event
-            =============== ==================== ==============================================
+    def remove_notifier(self, sock):
+        """
+        Stop watching a socket, see add_notifier
 
-            See Also
-            --------
-            listen_client
+        Parameters
+        ----------
+        sock: (Socket) the server socket or a connected client socket
         """
-        if not self.processing:
-            self.listen_client()
+        notifier = self.notifiers.pop(sock.socket, None)
+        if notifier is not None:
+            notifier.setEnabled(False)
+            notifier.deleteLater()
 
     def find_socket_within_connected_clients(self, client_type):
         """
@@ -677,6 +1099,7 @@ class TCPServer(QObject):
     def remove_client(self, sock):
         sock_type = self.find_socket_type_within_connected_clients(sock)
         if sock_type is not None:
+            self.remove_notifier(sock)
             self.connected_clients.remove(dict(socket=sock, type=sock_type))
             self.settings.child(('conn_clients')).setValue(self.set_connected_clients_table())
             try:
@@ -712,60 +1135,67 @@ class TCPServer(QObject):
         return ([Socket(sock) for sock in read_sockets], [Socket(sock) for sock in write_sockets],
                 [Socket(sock) for sock in error_sockets])
 
-    def listen_client(self):
+    def listen_client(self, sock):
         """
-            Server function.
-            Used to connect or listen incoming message from a client.
+            Server function, called by the socket notifiers when sock is readable.
+            Used to connect a new client (sock is the server socket) or to process an incoming message from a client.
+
+            Parameters
+            ----------
+            sock: (Socket) the readable socket
+
+            See Also
+            --------
+            add_notifier, process_cmds
         """
+        notifier = self.notifiers.get(sock.socket, None)
+        if notifier is None:
+            return
+        # the messages are read synchronously, avoid being notified again while processing this one
+        notifier.setEnabled(False)
         try:
             self.processing = True
-            # QtWidgets.QApplication.processEvents() #to let external commands in
-            read_sockets, write_sockets, error_sockets = self.select(
-                [client['socket'] for client in self.connected_clients], [],
-                [client['socket'] for client in self.connected_clients],
-                0)
-            for sock in error_sockets:
-                self.remove_client(sock)
-
-            for sock in read_sockets:
-                QThread.msleep(100)
-                if sock == self.serversocket:  # New connection
-                    #means a new socket (client) try to reach the server
-                    (client_socket, address) = self.serversocket.accept()
-                    DAQ_type = client_socket.get_string()
-                    if DAQ_type not in self.socket_types:
-                        self.emit_status(ThreadCommand("Update_Status", [DAQ_type + ' is not a valid type', 'log']))
-                        client_socket.close()
-                        break
-
+            if sock == self.serversocket:  # New connection
+                #means a new socket (client) try to reach the server
+                (client_socket, address) = self.serversocket.accept()
+                DAQ_type = client_socket.get_string()
+                if DAQ_type not in self.socket_types:
+                    self.emit_status(ThreadCommand("Update_Status", [DAQ_type + ' is not a valid type', 'log']))
+                    client_socket.close()
+                else:
                     self.connected_clients.append(dict(socket=client_socket, type=DAQ_type))
+                    self.add_notifier(client_socket)
+                    if self.settings.child(('codec')).value() != 'none' or self.settings.child(('delta')).value() or \
+                            self.settings.child(('shared_memory')).value():
+                        self.send_codec_request(client_socket)
                     self.settings.child(('conn_clients')).setValue(self.set_connected_clients_table())
                     self.emit_status(ThreadCommand("Update_Status",
                                                    [DAQ_type + ' connected with ' + address[0] + ':' + str(address[1]),
                                                     'log']))
-                    QtWidgets.QApplication.processEvents()
-
-
-                else:  # Some incoming message from a client
-                    # Data received from client, process it
-                    try:
-                        message = sock.get_string()
-                        if message in ['Done', 'Info', 'Infos', 'Info_xml', 'position_is', 'move_done']:
-                            self.process_cmds(message, command_sock=None)
-                        elif message == 'Quit':
-                            raise Exception("socket disconnect by user")
-                        else:
-                            self.process_cmds(message, command_sock=sock)
-
-                    # client disconnected, so remove from socket list
-                    except Exception as e:
-                        self.remove_client(sock)
 
-            self.processing = False
+            else:  # Some incoming message from a client
+                # Data received from client, process it
+                try:
+                    message = sock.get_string()
+                    if message in ['Done', 'Info', 'Infos', 'Info_xml', 'position_is', 'move_done']:
+                        self.process_cmds(message, command_sock=None)
+                    elif message == 'Quit':
+                        raise Exception("socket disconnect by user")
+                    else:
+                        self.process_cmds(message, command_sock=sock)
+
+                # client disconnected, so remove from socket list
+                except Exception as e:
+                    self.remove_client(sock)
 
         except Exception as e:
             self.emit_status(ThreadCommand("Update_Status", [str(e), 'log']))
 
+        finally:
+            self.processing = False
+            if sock.socket in self.notifiers:
+                notifier.setEnabled(True)
+
     def send_command(self, sock, command="move_at"):
         """
             Send one of the message contained in self.message_list toward a socket with identity socket_type.
@@ -791,6 +1221,32 @@ class TCPServer(QObject):
             sock.send_string(command)
 
 
+    def send_codec_request(self, sock=None):
+        """
+        Request PyMoDAQ clients to send their arrays with the payload codec and delta options of the settings, see
+        Socket.set_codec, or through shared memory for the clients running on the same host, see
+        Socket.set_shared_memory. The request is a single string ignored by clients not supporting it, which then keep
+        sending uncompressed arrays, readable as well.
+
+        Parameters
+        ----------
+        sock: (Socket) the client socket to send the request to. If None, send it to all connected clients
+        """
+        request = f"set_codec;{self.settings.child(('codec')).value()}"
+        if self.settings.child(('delta')).value():
+            request += ';delta'
+        if sock is None:
+            socks = [client['socket'] for client in self.connected_clients if client['type'] != 'server']
+        else:
+            socks = [sock]
+        for sock in socks:
+            if self.settings.child(('shared_memory')).value() and sock.is_local():
+                sock.allow_shared_memory(True)
+                sock.send_string(request + f";shm:{self.settings.child(('shared_memory_slots')).value()}")
+            else:
+                sock.allow_shared_memory(False)
+                sock.send_string(request)
+
     def emit_status(self, status):
         print(status)
 
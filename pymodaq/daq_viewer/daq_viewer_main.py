@@ -11,7 +11,6 @@ import sys
 
 import pymodaq.daq_utils.scanner
 from pymodaq.daq_viewer.daq_gui_settings import Ui_Form
-import copy
 
 from pymodaq.daq_utils.plotting.viewer0D.viewer0D_main import Viewer0D
 from pymodaq.daq_utils.plotting.viewer1D.viewer1D_main import Viewer1D
@@ -47,6 +46,7 @@ from easydict import EasyDict as edict
 from pymodaq.daq_viewer.utility_classes import params as daq_viewer_params
 from pyqtgraph.dockarea import Dock
 import pickle
+import copy
 import time
 import datetime
 import tables
@@ -229,6 +229,7 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
         self.snapshot_pathname = None
 
         self.current_datas = None
+        self.live_accumulators = []
         # edict to be send to the daq_measurement module from 1D traces if any
 
         self.data_to_save_export = OrderedDict([])
@@ -325,6 +326,7 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
             for ind in range(Nviewers):
                 self.viewer_widgets.append(QtWidgets.QWidget())
                 self.ui.viewers.append(Viewer2D(self.viewer_widgets[-1]))
+                self.ui.viewers[-1].max_fps = self.settings.child('main_settings', 'max_fps').value()
                 self.ui.viewers[-1].set_scaling_axes(self.get_scaling_options())
                 self.ui.viewers[-1].ui.auto_levels_pb.click()
 
@@ -375,9 +377,11 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
             if not self.is_continuous_initialized:
                 self.channel_arrays = OrderedDict([])
                 self.ini_time = time.perf_counter()
+                buffer_size = self.h5saver_continuous.settings.child(('buffer_size')).value()
                 self.time_array = self.h5saver_continuous.add_navigation_axis(np.array([0.0, ]),
                               self.scan_continuous_group, 'x_axis', enlargeable=True,
-                              title='Time axis', metadata=dict(nav_index=0, label='Time axis', units='second'))
+                              title='Time axis', metadata=dict(nav_index=0, label='Time axis', units='second'),
+                              buffer_size=buffer_size)
 
                 data_dims = ['data0D', 'data1D']
                 if self.h5saver_continuous.settings.child(('save_2D')).value():
@@ -394,7 +398,8 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
                                 channel_group = self.h5saver_continuous.add_CH_group(data_group, title=channel)
                                 self.channel_arrays[data_dim]['parent'] = channel_group
                                 self.channel_arrays[data_dim][channel] = self.h5saver_continuous.add_data(channel_group,
-                                        datas[data_dim][channel], scan_type='scan1D', enlargeable=True)
+                                        datas[data_dim][channel], scan_type='scan1D', enlargeable=True,
+                                        buffer_size=buffer_size)
                 self.is_continuous_initialized = True
 
             dt = np.array([time.perf_counter()-self.ini_time])
@@ -655,6 +660,7 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
             Foreach value changed, update :
                 * Viewer in case of **DAQ_type** parameter name
                 * visibility of button in case of **show_averaging** parameter name
+                * standard error option of the detector in case of **std_error** parameter name
                 * visibility of naverage in case of **live_averaging** parameter name
                 * scale of axis **else** (in 2D pymodaq type)
 
@@ -696,6 +702,14 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
                     self.settings.child('main_settings', 'live_averaging').setValue(False)
                     self.update_settings_signal.emit(edict(path=path, param=param, change=change))
 
+                elif param.name() == 'std_error':
+                    self.update_settings_signal.emit(edict(path=path, param=param, change=change))
+
+                elif param.name() == 'max_fps':
+                    for viewer in self.ui.viewers:
+                        if hasattr(viewer, 'max_fps'):
+                            viewer.max_fps = param.value()
+
                 elif param.name() == 'live_averaging':
                     self.settings.child('main_settings', 'show_averaging').setValue(False)
                     if param.value() == True:
@@ -1078,7 +1092,7 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
 
 
             try:
-                self.h5saver_continuous.close()
+                self.h5saver_continuous.close_file()
             except Exception as e:
                 self.logger.exception(str(e))
 
@@ -1265,14 +1279,16 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
                 self.settings.child('main_settings', 'N_live_averaging').setValue(self.ind_continuous_grab)
                 ##self.ui.current_Naverage.setValue(self.ind_continuous_grab)
                 self.ind_continuous_grab += 1
-                if self.ind_continuous_grab > 1:
-                    try:
-                        for ind, dic in enumerate(datas):
-                            dic['data'] = [((self.ind_continuous_grab - 1) * self.current_datas[ind]['data'][
-                                ind_channel] + dic['data'][ind_channel]) / self.ind_continuous_grab for ind_channel in
-                                           range(len(dic['data']))]
-                    except Exception as e:
-                        self.logger.exception(str(e))
+                try:
+                    if self.ind_continuous_grab == 1:
+                        self.live_accumulators = [utils.DataAccumulator() for dic in datas]
+                    for accumulator, dic in zip(self.live_accumulators, datas):
+                        accumulator.add(dic['data'])
+                    if self.ind_continuous_grab > 1:
+                        for accumulator, dic in zip(self.live_accumulators, datas):
+                            dic['data'] = accumulator.average()
+                except Exception as e:
+                    self.logger.exception(str(e))
 
 
             #store raw data for further processing
@@ -1280,52 +1296,13 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
             acq_time = datetime.datetime.now().timestamp()
             name = self.title
             self.data_to_save_export = OrderedDict(Ndatas=Ndatas, acq_time_s=acq_time, name=name)
-            data0D = OrderedDict([])
-            data1D = OrderedDict([])
-            data2D = OrderedDict([])
-            dataND = OrderedDict([])
-
             for ind_data, data in enumerate(datas):
                 if 'external_h5' in data.keys():
                     self.data_to_save_export['external_h5'] = data.pop('external_h5')
-                data_tmp = copy.deepcopy(data)
-                data_dim = data_tmp['dim']
-                if data_dim.lower() != 'datand':
-                    self.set_xy_axis(data_tmp, ind_data)
-                data_arrays = data_tmp.pop('data')
-
-                name = data_tmp.pop('name')
-                for ind_sub_data, dat in enumerate(data_arrays):
-                    if 'labels' in data_tmp:
-                        data_tmp.pop('labels')
-                    subdata_tmp = utils.DataToExport(name=self.title, data=dat, **data_tmp)
-                    sub_name = f'{self.title}_{name}_CH{ind_sub_data:03}'
-                    if data_dim.lower() == 'data0d':
-                        subdata_tmp['data'] = subdata_tmp['data'][0]
-                        data0D[sub_name] = subdata_tmp
-                    elif data_dim.lower() == 'data1d':
-                        if 'x_axis' not in subdata_tmp:
-                            Nx = len(dat)
-                            x_axis = utils.Axis(data=np.linspace(0, Nx-1, Nx))
-                            subdata_tmp['x_axis'] = x_axis
-                        data1D[sub_name] = subdata_tmp
-                    elif data_dim.lower() == 'data2d':
-                        if 'x_axis' not in subdata_tmp:
-                            Nx = dat.shape[1]
-                            x_axis = utils.Axis(data=np.linspace(0, Nx-1, Nx))
-                            subdata_tmp['x_axis'] = x_axis
-                        if 'y_axis' not in subdata_tmp:
-                            Ny = dat.shape[0]
-                            y_axis = utils.Axis(data=np.linspace(0, Ny-1, Ny))
-                            subdata_tmp['y_axis'] = y_axis
-                        data2D[sub_name] = subdata_tmp
-                    elif data_dim.lower() == 'datand':
-                        dataND[sub_name] = subdata_tmp
-
-            self.data_to_save_export['data0D'] = data0D
-            self.data_to_save_export['data1D'] = data1D
-            self.data_to_save_export['data2D'] = data2D
-            self.data_to_save_export['dataND'] = dataND
+                if data['dim'].lower() != 'datand':
+                    self.set_xy_axis(data, ind_data)
+            # the data arrays are shared (as read only views) with the viewers, not copied
+            self.data_to_save_export.update(utils.datas_to_export(self.title, datas))
 
             if self.settings.child('main_settings', 'show_data').value():
                 self.received_data = 0  # so that data send back from viewers can be properly counted
@@ -1728,6 +1705,7 @@ class DAQ_Viewer(QtWidgets.QWidget, QObject):
             elif data_dim == "Data2D":
                 self.viewer_widgets.append(QtWidgets.QWidget())
                 self.ui.viewers.append(Viewer2D(self.viewer_widgets[-1]))
+                self.ui.viewers[-1].max_fps = self.settings.child('main_settings', 'max_fps').value()
                 self.ui.viewers[-1].set_scaling_axes(self.get_scaling_options())
                 self.ui.viewers[-1].ui.auto_levels_pb.click()
 
@@ -1781,6 +1759,7 @@ class DAQ_Detector(QObject):
         *average_done*              boolean
         *hardware_averaging*        boolean
         *show_averaging*            boolean
+        *std_error*                 boolean
         *wait_time*                 int
         *DAQ_type*                  string
         ========================= ==========================
@@ -1800,11 +1779,13 @@ class DAQ_Detector(QObject):
         self.grab_state = False
         self.single_grab = False
         self.datas = None
+        self.accumulators = []
         self.ind_average = 0
         self.Naverage = None
         self.average_done = False
         self.hardware_averaging = False
         self.show_averaging = False
+        self.std_error = settings_parameter.child('main_settings', 'std_error').value()
         self.wait_time = settings_parameter.child('main_settings', 'wait_time').value()
         self.DAQ_type = settings_parameter.child('main_settings', 'DAQ_type').value()
 
@@ -1992,27 +1973,35 @@ class DAQ_Detector(QObject):
                     dat['dim'] = dat['type']
                     dat['type'] = 'raw'
 
+        if self.hardware_averaging or self.Naverage is None or self.Naverage <= 1:
+            # the datas are emitted as is and then shared (as read-only views) by the viewers and the savers: copy them
+            # once here so that plugins reusing their acquisition buffers don't overwrite already emitted data. The
+            # averaged datas are new arrays computed by the accumulators
+            self.copy_datas(datas)
 
         if not(self.hardware_averaging): #to execute if the averaging has to be done software wise
             self.ind_average += 1
             if self.ind_average == 1:
                 self.datas = datas
-            else:
-                try:
-                    for indpannel, dic in enumerate(datas):
-                        self.datas[indpannel]['data'] =\
-                            [((self.ind_average-1)*self.datas[indpannel]['data'][ind]+datas[indpannel]['data'][ind])/
-                             self.ind_average for ind in range(len(datas[indpannel]['data']))]
-
-                    if self.show_averaging:
-                        self.emit_temp_data(self.datas)
+                self.accumulators = [utils.DataAccumulator(variance=self.std_error) for dat in datas]
+            try:
+                if self.Naverage is not None and self.Naverage > 1:
+                    # sums in place, the division being done only when the averaged datas are emitted
+                    for accumulator, dat in zip(self.accumulators, datas):
+                        accumulator.add(dat['data'])
+                    if self.ind_average > 1:
+                        if self.show_averaging or self.ind_average == self.Naverage:
+                            for dat, accumulator in zip(self.datas, self.accumulators):
+                                dat['data'] = accumulator.average()
+                        if self.show_averaging:
+                            self.emit_temp_data(self.datas + self.std_error_datas())
 
-                except Exception as e:
-                    self.logger.exception(str(e))
+            except Exception as e:
+                self.logger.exception(str(e))
 
             if self.ind_average == self.Naverage:
                 self.average_done = True
-                self.data_detector_sig.emit(self.datas)
+                self.data_detector_sig.emit(self.datas + self.std_error_datas())
                 self.ind_average = 0
         else:
             self.data_detector_sig.emit(datas)
@@ -2021,6 +2010,33 @@ class DAQ_Detector(QObject):
             #self.status_sig.emit(["Update_Status","Grabing braked"])
             self.detector.stop()
 
+    def std_error_datas(self):
+        """
+        Get the standard error of the mean of the software averaged datas (if enabled by the std_error setting when
+        the averaging started), each as a copy of the averaged DataFromPlugins named f'{name}_std_error', so that it is
+        displayed in its own viewer and exported and saved along the averaged datas
+
+        Returns
+        -------
+        list of DataFromPlugins: empty if no standard error has been computed
+        """
+        std_error_datas = []
+        if self.Naverage is not None and self.Naverage > 1:
+            for dat, accumulator in zip(self.datas, self.accumulators):
+                if accumulator.variance:
+                    std_error_dat = copy.copy(dat)
+                    std_error_dat['name'] = f"{dat['name']}_std_error"
+                    std_error_dat['data'] = accumulator.std_error()
+                    std_error_dat['labels'] = [f'{label} std error' for label in dat.get('labels', [])]
+                    std_error_datas.append(std_error_dat)
+        return std_error_datas
+
+    @staticmethod
+    def copy_datas(datas):
+        """Replace in place the arrays of a list of DataFromPlugins by copies owned by the data path"""
+        for dat in datas:
+            dat['data'] = [np.array(array, copy=True) for array in dat['data']]
+
     def single(self, Naverage=1, args_as_dict={}):
         """
             Call the grab method with Naverage parameter as an attribute.
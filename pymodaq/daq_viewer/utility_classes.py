@@ -37,8 +37,14 @@ params = [
         {'title': 'Nviewers:', 'name': 'Nviewers', 'type': 'int', 'value': 1, 'min': 1, 'default': 1, 'readonly': True},
         {'title': 'Controller ID:', 'name': 'controller_ID', 'type': 'int', 'value': 0, 'default': 0, 'readonly': True},
         {'title': 'Show data and process:', 'name': 'show_data', 'type': 'bool', 'value': True, },
+        {'title': 'Max display rate (fps):', 'name': 'max_fps', 'type': 'int', 'value': 25, 'default': 25, 'min': 0,
+         'tip': 'Images are rendered at most at this rate (0 for no limit), intermediate frames being still processed,'
+                ' saved and exported'},
         {'title': 'Naverage', 'name': 'Naverage', 'type': 'int', 'default': 1, 'value': 1, 'min': 1},
         {'title': 'Show averaging:', 'name': 'show_averaging', 'type': 'bool', 'default': False, 'value': False},
+        {'title': 'Std error:', 'name': 'std_error', 'type': 'bool', 'default': False, 'value': False,
+         'tip': 'Compute the standard error of the mean of the software averaged data, displayed, exported and saved'
+                ' as additional data named *_std_error'},
         {'title': 'Live averaging:', 'name': 'live_averaging', 'type': 'bool', 'default': False, 'value': False},
         {'title': 'N Live aver.:', 'name': 'N_live_averaging', 'type': 'int', 'default': 0, 'value': 0,
          'visible': False},
@@ -441,6 +447,9 @@ class DAQ_Viewer_TCP_server(DAQ_Viewer_base, TCPServer):
             data = custom_tree.parameter_to_xml_string(param)
             grabber_socket.send_string(data)
 
+        elif param.name() in ['codec', 'delta', 'shared_memory', 'shared_memory_slots']:
+            self.send_codec_request()
+
     def ini_detector(self, controller=None):
         """
             | Initialisation procedure of the detector updating the status dictionnary.
@@ -0,0 +1,36 @@
+"""
+Benchmark of the navigation maps integrated over a signal ROI (ViewerND.get_integrated_map), computed from the
+cumulative sums of signal_manager.IntegralCache against summing the data over the ROI
+
+run it from the package root with: python -m test.benchmarks.integral_cache_benchmark
+"""
+import time
+import numpy as np
+
+from pymodaq.daq_utils.plotting.viewerND.signal_manager import Signal, IntegralCache
+
+
+def timeit(function, *args, Nrepeat=5):
+    start = time.perf_counter()
+    for ind in range(Nrepeat):
+        function(*args)
+    return (time.perf_counter() - start) / Nrepeat
+
+
+def benchmark(shapes=((100, 100, 1000), (200, 200, 1000)), roi_fractions=(0.1, 0.5, 1)):
+    print('Navigation map integrated over a 1D signal ROI')
+    print(f'{"shape":>18} {"ROI":>5} {"sum (ms)":>9} {"cached (ms)":>12} {"cache build (ms)":>17}')
+    for shape in shapes:
+        signal = Signal(np.random.rand(*shape)).transpose(signal_axes=[0], navigation_axes=[1, 2])
+        for fraction in roi_fractions:
+            roi = slice(0, int(fraction * shape[-1]))
+            cache = IntegralCache(max_memory=1e9)
+            build_time = timeit(cache.integrate, 'key', signal, roi, Nrepeat=1)
+            sum_time = timeit(lambda: signal.isig[roi].sum((-1)).data)
+            cached_time = timeit(cache.integrate, 'key', signal, roi)
+            print(f'{str(shape):>18} {fraction:>5.1f} {sum_time * 1e3:>9.2f} {cached_time * 1e3:>12.3f}'
+                  f' {build_time * 1e3:>17.1f}')
+
+
+if __name__ == '__main__':
+    benchmark()
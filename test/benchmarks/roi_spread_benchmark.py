@@ -0,0 +1,65 @@
+"""
+Benchmark of the extraction of the spread points lying within a ROI (Viewer2D.roi_changed), see
+roi_manager.roi_contains_points and roi_manager.PointsGrid, against the former implementation calling
+roi.shape().contains for each point
+
+run it from the package root with: python -m test.benchmarks.roi_spread_benchmark
+"""
+import time
+import numpy as np
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QPointF
+
+from pymodaq.daq_utils.managers import roi_manager as rm
+
+
+def legacy_extraction(roi, spread_data):
+    xvals = []
+    yvals = []
+    data = []
+    for ind in range(spread_data.shape[0]):
+        if roi.shape().contains(QPointF(spread_data[ind, 0] - roi.pos().x(), spread_data[ind, 1] - roi.pos().y())):
+            xvals.append(spread_data[ind, 0])
+            yvals.append(spread_data[ind, 1])
+            data.append(spread_data[ind, 2])
+    return np.array(xvals), np.array(yvals), np.array(data)
+
+
+def vectorized_extraction(roi, spread_data, grid=None):
+    if grid is None:
+        indexes = np.arange(spread_data.shape[0])
+    else:
+        indexes = grid.indexes_in_bounds(*rm.roi_parent_bounds(roi))
+    indexes = indexes[rm.roi_contains_points(roi, spread_data[indexes, 0], spread_data[indexes, 1])]
+    return spread_data[indexes, 0], spread_data[indexes, 1], spread_data[indexes, 2]
+
+
+def timeit(function, *args, Nrepeat=5):
+    start = time.perf_counter()
+    for ind in range(Nrepeat):
+        function(*args)
+    return (time.perf_counter() - start) / Nrepeat
+
+
+def benchmark(sizes=(1000, 10000, 100000), max_legacy_size=10000):
+    rng = np.random.RandomState(0)
+    print('Time to extract the spread points within a ROI covering 1% of the points')
+    print(f'{"ROI":>10} {"Npoints":>10} {"legacy (ms)":>12} {"numpy (ms)":>11} {"grid (ms)":>10} {"grid build (ms)":>16}')
+    for roi_class in (rm.RectROI, rm.EllipseROI):
+        roi = roi_class(pos=[0, 0], size=[10, 10])
+        for Npts in sizes:
+            spread_data = np.stack((rng.uniform(-50, 50, Npts), rng.uniform(-50, 50, Npts), rng.rand(Npts)), axis=1)
+            start = time.perf_counter()
+            grid = rm.PointsGrid(spread_data[:, 0], spread_data[:, 1])
+            build_time = time.perf_counter() - start
+
+            legacy = timeit(legacy_extraction, roi, spread_data, Nrepeat=1) if Npts <= max_legacy_size else np.nan
+            numpy_time = timeit(vectorized_extraction, roi, spread_data)
+            grid_time = timeit(vectorized_extraction, roi, spread_data, grid)
+            print(f'{roi_class.__name__:>10} {Npts:>10} {legacy * 1e3:>12.2f} {numpy_time * 1e3:>11.3f}'
+                  f' {grid_time * 1e3:>10.3f} {build_time * 1e3:>16.2f}')
+
+
+if __name__ == '__main__':
+    app = QtWidgets.QApplication([])
+    benchmark()
@@ -0,0 +1,83 @@
+"""
+Benchmarks of the scan definitions of pymodaq.daq_utils.scanner against their former pure python implementations
+
+run it from the package root with: python -m test.benchmarks.scanner_benchmark [max_positions]
+"""
+import sys
+import timeit
+import numpy as np
+
+from pymodaq.daq_utils import scanner
+from test.daq_utils_test.scanner_test import legacy_get_info_from_positions, legacy_set_scan_linear, \
+    legacy_set_scan_spiral, legacy_set_scan_sequential
+
+
+def get_positions_2D(Npositions):
+    Nx = int(np.sqrt(Npositions))
+    Ny = Npositions // Nx
+    xx, yy = np.meshgrid(np.linspace(-1, 1, Nx), np.linspace(0, 10, Ny), indexing='ij')
+    return np.stack((xx.ravel(), yy.ravel()), axis=1)
+
+
+def time_it(func, number=1):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def print_header(title):
+    print(title)
+    print(f'{"Npositions":>12} {"legacy (s)":>12} {"vectorized (s)":>16} {"speedup":>10}')
+
+
+def print_timing(Npositions, func, legacy_func, max_legacy_positions):
+    t_vect = time_it(func)
+    if Npositions <= max_legacy_positions:
+        t_legacy = time_it(legacy_func)
+        print(f'{Npositions:>12d} {t_legacy:>12.4f} {t_vect:>16.4f} {t_legacy / t_vect:>10.0f}')
+    else:
+        print(f'{Npositions:>12d} {"-":>12} {t_vect:>16.4f} {"-":>10}')
+
+
+def benchmark_get_info_from_positions(max_positions=int(1e7), max_legacy_positions=int(1e5)):
+    scan_parameters = scanner.ScanParameters(starts=[0.], stops=[1.], steps=[0.1])
+    print_header('get_info_from_positions (2D positions)')
+    Npositions = int(1e4)
+    while Npositions <= max_positions:
+        positions = get_positions_2D(Npositions)
+        print_timing(Npositions, lambda: scan_parameters.get_info_from_positions(positions),
+                     lambda: legacy_get_info_from_positions(positions), max_legacy_positions)
+        Npositions *= 10
+
+
+def benchmark_scans(max_positions=int(1e7), max_legacy_positions=int(1e6)):
+    print_header('set_scan_linear (back and forth)')
+    Npositions = int(1e4)
+    while Npositions <= max_positions:
+        Nlin = int(np.sqrt(Npositions))
+        args = ([0., 0.], [1., 1.], [1 / (Nlin - 1), 1 / (Nlin - 1)], True, Npositions)
+        print_timing(Npositions, lambda: scanner.set_scan_linear(*args), lambda: legacy_set_scan_linear(*args),
+                     max_legacy_positions)
+        Npositions *= 10
+
+    print_header('set_scan_spiral')
+    Npositions = int(1e4)
+    while Npositions <= max_positions:
+        Nlin = int(np.sqrt(Npositions) / 2)
+        args = (np.array([0., 0.]), np.array([1., 1.]), np.array([1 / Nlin, 1 / Nlin]), None, Npositions)
+        print_timing(Npositions, lambda: scanner.set_scan_spiral(*args), lambda: legacy_set_scan_spiral(*args),
+                     max_legacy_positions)
+        Npositions *= 10
+
+    print_header('set_scan_sequential (3 axes)')
+    Npositions = int(1e4)
+    while Npositions <= max_positions:
+        Nlin = int(np.round(Npositions ** (1 / 3)))
+        args = ([0., 0., 0.], [1., 1., 1.], [1 / (Nlin - 1)] * 3)
+        print_timing(Npositions, lambda: scanner.set_scan_sequential(*args),
+                     lambda: legacy_set_scan_sequential(*args), max_legacy_positions)
+        Npositions *= 10
+
+
+if __name__ == '__main__':
+    max_positions = int(float(sys.argv[1])) if len(sys.argv) > 1 else int(1e7)
+    benchmark_get_info_from_positions(max_positions)
+    benchmark_scans(max_positions)
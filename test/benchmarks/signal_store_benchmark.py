@@ -0,0 +1,59 @@
+"""
+Benchmark of the reductions of a Signal backed by a HDF5 dataset (see signal_manager.LazyArray) against the same
+reductions on the array loaded in memory: time and peak memory allocated by numpy
+
+run it from the package root with: python -m test.benchmarks.signal_store_benchmark
+"""
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+
+from pymodaq.daq_utils.h5modules import H5Backend
+from pymodaq.daq_utils.plotting.viewerND.signal_manager import Signal
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak
+
+
+def integrated_map_loaded(node):
+    signal = Signal(node.read())
+    return signal.transpose(signal_axes=[0], navigation_axes=[1, 2]).sum((-1)).data
+
+
+def integrated_map_store(node):
+    signal = Signal(node.array)
+    return signal.transpose(signal_axes=[0], navigation_axes=[1, 2]).sum((-1)).data
+
+
+def benchmark(shapes=((50, 50, 2000), (100, 100, 2000)), backend='tables'):
+    print(f'Navigation map integrated over the signal axis ({backend} backend, one signal per chunk)')
+    print(f'{"shape":>18} {"size (MB)":>10} {"loaded (s)":>11} {"peak (MB)":>10} {"store (s)":>10} {"peak (MB)":>10}')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for shape in shapes:
+            bck = H5Backend(backend)
+            bck.open_file(Path(tmp_dir).joinpath(f'{backend}.h5'), 'w')
+            node = bck.create_carray(bck.root(), 'Data', shape=shape, dtype=np.float64,
+                                     chunk_shape=(1, 1, shape[-1]))
+            for ind in range(shape[0]):
+                node[ind] = np.random.rand(*shape[1:])
+            bck.flush()
+
+            loaded_time, loaded_peak = measure(integrated_map_loaded, node)
+            store_time, store_peak = measure(integrated_map_store, node)
+            assert np.allclose(integrated_map_loaded(node), integrated_map_store(node))
+            print(f'{str(shape):>18} {np.prod(shape) * 8e-6:>10.0f} {loaded_time:>11.2f} {loaded_peak * 1e-6:>10.1f}'
+                  f' {store_time:>10.2f} {store_peak * 1e-6:>10.1f}')
+            bck.close_file()
+
+
+if __name__ == '__main__':
+    benchmark()
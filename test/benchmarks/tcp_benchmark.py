@@ -0,0 +1,163 @@
+"""
+Benchmark of the array transfer of pymodaq.daq_utils.tcp_server_client.Socket over the loopback interface, against
+the former implementation (header sent field by field, payload copied by tobytes and received by growing a bytes
+object 4096 bytes at a time)
+
+Also benchmark the payload codecs (see Socket.set_codec) on simulated detector frames: compression ratio, transfer
+time over loopback and estimated transfer time over a 1 GbE link, and the same host shared memory transport (see
+Socket.set_shared_memory)
+
+run it from the package root with: python -m test.benchmarks.tcp_benchmark [max_legacy_size_MB]
+"""
+import sys
+import socket
+import threading
+import time
+import numpy as np
+
+from pymodaq.daq_utils.tcp_server_client import Socket, payload_codecs
+
+
+class LegacySocket(Socket):
+    def check_received_length(self, length):
+        l = 0
+        data_bytes = b''
+        while l < length:
+            if l < length - 4096:
+                data_bytes_tmp = self.socket.recv(4096)
+            else:
+                data_bytes_tmp = self.socket.recv(length - l)
+            l += len(data_bytes_tmp)
+            data_bytes += data_bytes_tmp
+        return data_bytes
+
+    def send_array(self, data_array):
+        data_type = data_array.dtype.descr[0][1]
+        data_shape = data_array.shape
+        data_bytes = data_array.reshape(np.prod(data_shape)).tobytes()
+        cmd_bytes, cmd_length_bytes = self.message_to_bytes(data_type)
+        self.check_sended(cmd_length_bytes)
+        self.check_sended(cmd_bytes)
+        self.check_sended(self.int_to_bytes(len(data_bytes)))
+        self.check_sended(self.int_to_bytes(len(data_shape)))
+        for Nxxx in data_shape:
+            self.check_sended(self.int_to_bytes(Nxxx))
+        self.check_sended(data_bytes)
+
+
+def get_socket_pair():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    client = socket.create_connection(listener.getsockname())
+    server, _ = listener.accept()
+    listener.close()
+    return server, client
+
+
+def time_transfer(socket_class, array, Nframes):
+    server, client = get_socket_pair()
+    sender = socket_class(server)
+    receiver = socket_class(client)
+
+    def send():
+        for ind in range(Nframes):
+            sender.send_array(array)
+
+    thread = threading.Thread(target=send)
+    tstart = time.perf_counter()
+    thread.start()
+    for ind in range(Nframes):
+        data = receiver.get_array()
+    thread.join()
+    duration = (time.perf_counter() - tstart) / Nframes
+    assert np.all(data == array)
+    server.close()
+    client.close()
+    return duration
+
+
+def benchmark_arrays(sizes_MB=(1, 10, 100), max_legacy_size_MB=10):
+    print('Socket.send_array/get_array over loopback')
+    print(f'{"size (MB)":>10} {"legacy (ms)":>12} {"legacy (MB/s)":>14} {"new (ms)":>10} {"new (MB/s)":>11}')
+    for size in sizes_MB:
+        array = np.random.rand(int(size * 1e6 / 8))
+        Nframes = max(1, int(100 / size))
+        t_new = time_transfer(Socket, array, Nframes)
+        if size <= max_legacy_size_MB:
+            t_legacy = time_transfer(LegacySocket, array, max(1, Nframes // 10))
+            legacy = f'{t_legacy * 1000:>12.1f} {size / t_legacy:>14.0f}'
+        else:
+            legacy = f'{"-":>12} {"-":>14}'
+        print(f'{size:>10d} {legacy} {t_new * 1000:>10.1f} {size / t_new:>11.0f}')
+
+
+def camera_frames(Nframes=20, shape=(1024, 1024)):
+    """16 bits camera images of a slowly drifting gaussian beam with shot and read noise"""
+    x = np.arange(shape[1])
+    y = np.arange(shape[0])[:, None]
+    frames = []
+    for ind in range(Nframes):
+        beam = 3000 * np.exp(-((x - shape[1] / 2 - ind) ** 2 + (y - shape[0] / 2) ** 2) / (2 * 100 ** 2))
+        frame = np.random.poisson(beam) + 100 + np.random.normal(0, 2, shape)
+        frames.append(np.clip(frame, 0, 4095).astype(np.uint16))
+    return frames
+
+
+def spectra_frames(Nframes=20, Npts=2048):
+    """float64 spectra of a slowly shifting line with noise"""
+    x = np.linspace(0, 1, Npts)
+    return [np.exp(-(x - 0.5 - 0.001 * ind) ** 2 / 0.01) + np.random.normal(0, 0.01, Npts) for ind in range(Nframes)]
+
+
+def time_codec(frames, codec, delta, shared_memory=False):
+    server, client = get_socket_pair()
+    sender = Socket(server)
+    receiver = Socket(client)
+    sender.set_codec(codec, delta)
+    sender.set_shared_memory(shared_memory, Nslots=4)
+    receiver.allow_shared_memory(shared_memory)
+    sizes = []
+
+    def send():
+        for frame in frames:
+            sender.send_array(frame)
+
+    thread = threading.Thread(target=send)
+    tstart = time.perf_counter()
+    thread.start()
+    for frame in frames:
+        data_type = receiver.get_string()
+        data_len = receiver.get_int()
+        shape = tuple([receiver.get_int() for ind in range(receiver.get_int())])
+        data_bytes = receiver.check_received_length(data_len)
+        data = receiver.decode_array(data_type, data_bytes, shape) if ';' in data_type else \
+            np.frombuffer(data_bytes, dtype=data_type)
+        sizes.append(data_len)
+    thread.join()
+    duration = (time.perf_counter() - tstart) / len(frames)
+    assert np.all(data.reshape(shape) == frames[-1])
+    sender.close()
+    receiver.close()
+    return duration, frames[-1].nbytes * len(frames) / sum(sizes), np.mean(sizes)
+
+
+def benchmark_codecs(link_rate_MBs=125):
+    for name, frames in [('1024x1024 uint16 camera frames', camera_frames()),
+                         ('2048 points float64 spectra', spectra_frames(200))]:
+        print(f'\nPayload codecs, {name}')
+        print(f'{"codec":>8} {"delta":>6} {"ratio":>6} {"loopback (ms)":>14} {"1 GbE estimate (ms)":>20}')
+        for codec in payload_codecs:
+            for delta in [False, True]:
+                duration, ratio, size = time_codec(frames, codec, delta)
+                # the codec time is part of the loopback time, the link transfer time adds to it
+                estimate = duration + size / (link_rate_MBs * 1e6)
+                print(f'{codec:>8} {str(delta):>6} {ratio:>6.2f} {duration * 1000:>14.2f} {estimate * 1000:>20.2f}')
+        duration, ratio, size = time_codec(frames, 'none', False, shared_memory=True)
+        print(f'{"shm":>8} {"-":>6} {"-":>6} {duration * 1000:>14.2f} {"-":>20}')
+
+
+if __name__ == '__main__':
+    max_legacy_size_MB = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    benchmark_arrays(max_legacy_size_MB=max_legacy_size_MB)
+    benchmark_codecs()
@@ -0,0 +1,50 @@
+"""
+Benchmark of the rendering of spread data (TriangulationItem.render) when points are added one at a time, as during an
+adaptive scan: incremental triangulation with cached polygons (plot_utils.IncrementalTriangulation) and only the new
+triangles colored and recorded, against the former full triangulation and polygon building at each update
+
+run it from the package root with: python -m test.benchmarks.triangulation_benchmark
+"""
+import time
+import numpy as np
+from PyQt5 import QtWidgets
+from scipy.spatial import Delaunay
+
+from pymodaq.daq_utils.plotting.plot_utils import makePolygons
+from pymodaq.daq_utils.plotting.graph_items import TriangulationItem
+
+
+def legacy_render(data):
+    tri = Delaunay(data[:, :2])
+    tri_data = np.zeros((len(tri.simplices),))
+    for ind, pts in enumerate(tri.simplices):
+        tri_data[ind] = np.mean(data[pts, 2])
+    return makePolygons(tri)
+
+
+def benchmark(sizes=(1000, 5000, 20000), Nupdates=10):
+    rng = np.random.RandomState(0)
+    print(f'Time to render spread data after adding a point (mean over {Nupdates} updates)')
+    print(f'{"Npoints":>10} {"legacy (ms)":>12} {"incremental (ms)":>17}')
+    for Npts in sizes:
+        data = np.stack((rng.rand(Npts + Nupdates), rng.rand(Npts + Nupdates), rng.rand(Npts + Nupdates)), axis=1)
+        item = TriangulationItem()
+        item.setImage(data[:Npts])
+        item.render()
+
+        start = time.perf_counter()
+        for ind in range(Nupdates):
+            legacy_render(data[:Npts + ind + 1])
+        legacy_time = (time.perf_counter() - start) / Nupdates
+
+        start = time.perf_counter()
+        for ind in range(Nupdates):
+            item.setImage(data[:Npts + ind + 1])
+            item.render()
+        incremental_time = (time.perf_counter() - start) / Nupdates
+        print(f'{Npts:>10} {legacy_time * 1e3:>12.1f} {incremental_time * 1e3:>17.1f}')
+
+
+if __name__ == '__main__':
+    app = QtWidgets.QApplication([])
+    benchmark()
@@ -0,0 +1,94 @@
+"""
+Benchmark of the memory allocated per frame when converting the datas emitted by a detector into the DataToExport
+dictionaries used by the savers (DAQ_Viewer.show_data), see daq_utils.datas_to_export, against the former
+implementation (deepcopy of each DataFromPlugins and new default axes for each frame)
+
+run it from the package root with: python -m test.benchmarks.viewer_export_benchmark
+"""
+import copy
+import time
+import tracemalloc
+from collections import OrderedDict
+import numpy as np
+
+from pymodaq.daq_utils import daq_utils as utils
+
+
+def legacy_datas_to_export(title, datas):
+    data0D = OrderedDict([])
+    data1D = OrderedDict([])
+    data2D = OrderedDict([])
+    dataND = OrderedDict([])
+
+    for ind_data, data in enumerate(datas):
+        data_tmp = copy.deepcopy(data)
+        data_dim = data_tmp['dim']
+        data_arrays = data_tmp.pop('data')
+
+        name = data_tmp.pop('name')
+        for ind_sub_data, dat in enumerate(data_arrays):
+            if 'labels' in data_tmp:
+                data_tmp.pop('labels')
+            subdata_tmp = utils.DataToExport(name=title, data=dat, **data_tmp)
+            sub_name = f'{title}_{name}_CH{ind_sub_data:03}'
+            if data_dim.lower() == 'data0d':
+                subdata_tmp['data'] = subdata_tmp['data'][0]
+                data0D[sub_name] = subdata_tmp
+            elif data_dim.lower() == 'data1d':
+                if 'x_axis' not in subdata_tmp:
+                    Nx = len(dat)
+                    x_axis = utils.Axis(data=np.linspace(0, Nx - 1, Nx))
+                    subdata_tmp['x_axis'] = x_axis
+                data1D[sub_name] = subdata_tmp
+            elif data_dim.lower() == 'data2d':
+                if 'x_axis' not in subdata_tmp:
+                    Nx = dat.shape[1]
+                    x_axis = utils.Axis(data=np.linspace(0, Nx - 1, Nx))
+                    subdata_tmp['x_axis'] = x_axis
+                if 'y_axis' not in subdata_tmp:
+                    Ny = dat.shape[0]
+                    y_axis = utils.Axis(data=np.linspace(0, Ny - 1, Ny))
+                    subdata_tmp['y_axis'] = y_axis
+                data2D[sub_name] = subdata_tmp
+            elif data_dim.lower() == 'datand':
+                dataND[sub_name] = subdata_tmp
+    return OrderedDict(data0D=data0D, data1D=data1D, data2D=data2D, dataND=dataND)
+
+
+def camera_datas(shape=(2048, 2048)):
+    """a 4 MP 16 bits camera frame"""
+    return [utils.DataFromPlugins(name='camera', data=[np.random.randint(0, 4096, shape, dtype=np.uint16)],
+                                  dim='Data2D')]
+
+
+def spectrometer_datas(Npts=2048, Nchannels=4):
+    return [utils.DataFromPlugins(name='spectro', data=[np.random.rand(Npts) for ind in range(Nchannels)],
+                                  dim='Data1D')]
+
+
+def measure(function, datas, Nframes=30):
+    function('det', datas)  # warm up (default axes cache)
+    tracemalloc.start()
+    tstart = time.perf_counter()
+    for ind in range(Nframes):
+        snapshot_before = tracemalloc.get_traced_memory()[0]
+        exported = function('det', datas)
+        allocated = tracemalloc.get_traced_memory()[0] - snapshot_before
+        del exported
+    duration = (time.perf_counter() - tstart) / Nframes
+    tracemalloc.stop()
+    return allocated, duration
+
+
+def benchmark():
+    print('Memory kept allocated by the exported datas of one frame (traced with tracemalloc)')
+    print(f'{"datas":>30} {"legacy (kB)":>12} {"new (kB)":>10} {"legacy (ms)":>12} {"new (ms)":>10}')
+    for name, datas in [('4 MP uint16 camera', camera_datas()), ('4x2048 pts spectrometer', spectrometer_datas())]:
+        legacy_bytes, legacy_time = measure(legacy_datas_to_export, datas)
+        new_bytes, new_time = measure(utils.datas_to_export, datas)
+        print(f'{name:>30} {legacy_bytes / 1e3:>12.1f} {new_bytes / 1e3:>10.1f} {legacy_time * 1e3:>12.2f}'
+              f' {new_time * 1e3:>10.2f}')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -5,6 +5,9 @@ from pymodaq.daq_utils import daq_utils as utils
 from pyqtgraph.parametertree import Parameter
 from pathlib import Path
 import datetime
+import threading
+import time
+from PyQt5 import QtCore
 
 
 class TestJsonConverter:
@@ -100,6 +103,35 @@ def test_ThreadCommand():
     assert threadcomm.command is command
     assert threadcomm.attributes is attributes
 
+class TestEventWaiter:
+    def test_set_before_wait(self, qtbot):
+        waiter = utils.EventWaiter()
+        assert not waiter.is_set()
+        waiter.set()
+        assert waiter.is_set()
+        assert waiter.wait(timeout=10)
+        waiter.clear()
+        assert not waiter.is_set()
+
+    def test_set_while_waiting(self, qtbot):
+        waiter = utils.EventWaiter()
+        QtCore.QTimer.singleShot(50, waiter.set)
+        assert waiter.wait(timeout=5000)
+
+    def test_set_from_thread(self, qtbot):
+        waiter = utils.EventWaiter()
+        thread = threading.Timer(0.05, waiter.set)
+        thread.start()
+        assert waiter.wait(timeout=5000)
+        thread.join()
+
+    def test_timeout(self, qtbot):
+        waiter = utils.EventWaiter()
+        tstart = time.perf_counter()
+        assert not waiter.wait(timeout=100)
+        assert time.perf_counter() - tstart >= 0.09
+
+
 def test_Axis():
     ax = utils.Axis()
     assert 'data' in ax
@@ -239,6 +271,197 @@ def test_get_new_file_name(tmp_path):
     assert file == f'{base_name}_000'
 
 
+class TestDatasToExport:
+    def test_datas_to_export(self):
+        data2D = np.random.rand(20, 30)
+        data1D = np.random.rand(50)
+        x_axis = utils.Axis(data=np.linspace(-1, 1, 50), label='x', units='m')
+        datas = [utils.DataFromPlugins(name='cam', data=[data2D, data2D], dim='Data2D'),
+                 utils.DataFromPlugins(name='spectro', data=[data1D], dim='Data1D', x_axis=x_axis,
+                                       labels=['spectrum']),
+                 utils.DataFromPlugins(name='meter', data=[np.array([1.5])], dim='Data0D'),
+                 utils.DataFromPlugins(name='stack', data=[np.zeros((2, 3, 4))], dim='DataND')]
+        export = utils.datas_to_export('det', datas)
+        assert list(export.keys()) == ['data0D', 'data1D', 'data2D', 'dataND']
+        assert list(export['data2D'].keys()) == ['det_cam_CH000', 'det_cam_CH001']
+
+        data = export['data2D']['det_cam_CH000']
+        assert isinstance(data, utils.DataToExport)
+        assert data['name'] == 'det'
+        assert np.shares_memory(data['data'], data2D)
+        assert not data['data'].flags.writeable
+        assert data2D.flags.writeable
+        assert np.all(data['x_axis']['data'] == np.linspace(0, 29, 30))
+        assert np.all(data['y_axis']['data'] == np.linspace(0, 19, 20))
+        # default axes are cached
+        assert export['data2D']['det_cam_CH001']['x_axis']['data'] is data['x_axis']['data']
+
+        data = export['data1D']['det_spectro_CH000']
+        assert data['x_axis'] is x_axis
+        assert 'labels' not in data
+        assert export['data0D']['det_meter_CH000']['data'] == 1.5
+        assert export['dataND']['det_stack_CH000']['data'].shape == (2, 3, 4)
+
+        # the original datas are untouched
+        assert datas[1]['labels'] == ['spectrum']
+        assert datas[0]['data'][0] is data2D
+
+
+class TestDataAccumulator:
+    def test_average(self):
+        datas = [[np.random.randint(0, 4096, (20, 30), dtype=np.uint16), np.random.rand(50), np.array([ind])]
+                 for ind in range(10)]
+        accumulator = utils.DataAccumulator()
+        for data in datas:
+            accumulator.add(data)
+        assert accumulator.count == 10
+        for ind, average in enumerate(accumulator.average()):
+            assert average.dtype == np.float64
+            assert np.allclose(average, np.mean([data[ind] for data in datas], axis=0))
+
+        accumulator = utils.DataAccumulator(dtype=np.int64)
+        for data in datas:
+            accumulator.add(data[:1])
+        assert np.all(accumulator._sums[0] == np.sum([data[0] for data in datas], axis=0))
+
+        with pytest.raises(ValueError):
+            accumulator.add([np.zeros((2, 3))])
+        with pytest.raises(ValueError):
+            accumulator.std_error()
+        accumulator.reset()
+        accumulator.add([np.zeros((2, 3))])
+        assert accumulator.count == 1
+
+    def test_variance(self):
+        datas = [[np.random.normal(10, 2, (20, 30)), np.random.randint(0, 100, 50)] for ind in range(20)]
+        accumulator = utils.DataAccumulator(dtype=np.int32, variance=True)
+        assert accumulator.dtype == np.float64
+        for data in datas:
+            accumulator.add(data)
+        for ind, (average, variance, std_error) in enumerate(zip(accumulator.average(), accumulator.get_variance(),
+                                                                 accumulator.std_error())):
+            channels = np.array([data[ind] for data in datas])
+            assert np.allclose(average, np.mean(channels, axis=0))
+            assert np.allclose(variance, np.var(channels, axis=0, ddof=1))
+            assert np.allclose(std_error, np.std(channels, axis=0, ddof=1) / np.sqrt(20))
+
+
+class TestRingBuffer:
+    def test_append(self):
+        history = utils.RingBuffer(5)
+        assert len(history) == 0 and history.data.size == 0
+        for ind in range(3):
+            history.append(ind)
+        assert np.all(history.data == [0, 1, 2])
+        for ind in range(3, 12):
+            history.append(ind)
+        assert len(history) == 5 and history.Ntotal == 12
+        assert np.all(history.data == np.arange(7, 12))
+        assert np.all(history.indexes() == np.arange(7, 12))
+        assert not history.data.flags.writeable
+        history.clear()
+        assert len(history) == 0
+        with pytest.raises(ValueError):
+            utils.RingBuffer(0)
+
+    def test_extend_resize(self):
+        history = utils.RingBuffer(10)
+        history.extend(np.arange(4))
+        history.extend(np.arange(4, 27))
+        assert history.Ntotal == 27
+        assert np.all(history.data == np.arange(17, 27))
+        history.resize(4)
+        assert np.all(history.data == np.arange(23, 27)) and history.Ntotal == 27
+        history.resize(8)
+        history.append(27)
+        assert np.all(history.data == np.arange(23, 28))
+        assert np.all(history.indexes() == np.arange(23, 28))
+
+    def test_decimated(self):
+        history = utils.RingBuffer(1000)
+        history.extend(np.arange(1500))
+        indexes, data = history.decimated(100)
+        assert len(data) <= 100
+        assert np.all(indexes == data) and np.all(indexes % 10 == 0)
+        history.append(1500)
+        assert np.all(history.decimated(100)[1] == np.arange(510, 1501, 10))
+        indexes, data = history.decimated(10000)
+        assert np.all(data == history.data)
+
+    def test_decimated_peak(self):
+        history = utils.RingBuffer(100000)
+        data = np.random.rand(150000)
+        data[140000] = 10
+        history.extend(data)
+        indexes, decimated = history.decimated(1000, peak=True)
+        assert len(decimated) <= 1000
+        assert np.max(decimated) == 10 and np.min(decimated) == np.min(data[50000:])
+        assert indexes[0] == 50000 and indexes[-1] == 149999
+        assert np.all(np.diff(indexes) >= 0)
+
+
+class TestGrowingBuffer:
+    def test_append(self):
+        buffer = utils.GrowingBuffer(capacity=2)
+        assert len(buffer) == 0 and buffer.data.size == 0
+        rows = np.random.rand(11, 3)
+        for row in rows:
+            buffer.append(row)
+        assert len(buffer) == 11 and buffer.data.shape == (11, 3)
+        assert np.all(buffer.data == rows)
+        assert buffer._buffer.shape[0] == 16
+        assert not buffer.data.flags.writeable
+        with pytest.raises(ValueError):
+            buffer.append([1, 2])
+        buffer.clear()
+        buffer.append(5.)
+        assert buffer.data.shape == (1,) and buffer.data[0] == 5.
+
+    def test_extend(self):
+        buffer = utils.GrowingBuffer(capacity=4, dtype=np.int64)
+        buffer.extend(np.arange(3))
+        view = buffer.data
+        buffer.extend(np.arange(3, 20))
+        assert np.all(view == [0, 1, 2])
+        assert np.all(buffer.data == np.arange(20)) and buffer.data.dtype == np.int64
+
+
+class TestScanTiming:
+    def test_record(self):
+        timing = utils.ScanTiming(Npoints=2)
+        assert timing.Npoints == 0
+        assert timing.summary()['Npoints'] == 0
+        for ind in range(20):  # more than the preallocated size
+            timing.start_point(ind, 0)
+            for stamp in utils.ScanTiming.stamps[1:]:
+                timing.stamp(stamp)
+            timing.end_point()
+        assert timing.Npoints == 20
+        assert timing.timings.dtype == utils.ScanTiming.dtype
+        assert np.all(timing.timings['ind_scan'] == np.arange(20))
+        assert np.all(np.diff(timing.timings['start']) >= 0)
+        durations = timing.durations()
+        assert list(durations.keys()) == utils.ScanTiming.stages
+        for stage in durations:
+            assert np.all(durations[stage] >= 0)
+        summary = timing.summary()
+        assert summary['throughput'] > 0
+        assert 0 <= summary['dead_time'] <= 1
+        assert isinstance(timing.summary_as_str(), str)
+        array = timing.to_array()
+        assert array.shape == (20, len(utils.ScanTiming.dtype.names))
+
+    def test_missing_stamps(self):
+        timing = utils.ScanTiming()
+        timing.start_point(0)
+        timing.stamp('moved')
+        timing.end_point()
+        durations = timing.durations()
+        assert np.isfinite(durations['move'][0])
+        assert np.isnan(durations['grab'][0])
+        assert np.isnan(timing.summary()['grab'])
+
+
 class TestMath():
     def test_my_moment(self):
         x = utils.linspace_step(0, 100, 1)
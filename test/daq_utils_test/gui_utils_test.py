@@ -24,3 +24,30 @@ class TestDockArea:
         assert self.moved is True
 
 
+
+
+class TestDisplayThrottle:
+    def test_throttle(self, qtbot):
+        displayed = []
+        throttle = gutils.DisplayThrottle(displayed.append, max_fps=20)
+        throttle.submit(1)
+        assert displayed == [1]
+        throttle.submit(2)
+        throttle.submit(3)
+        assert displayed == [1]  # too early, the latest one is pending
+        qtbot.waitUntil(lambda: displayed == [1, 3], timeout=1000)
+        assert throttle.Ndropped == 1
+
+        throttle.submit(4)
+        throttle.flush()
+        assert displayed == [1, 3, 4]
+        qtbot.wait(100)
+        assert displayed == [1, 3, 4]
+
+    def test_no_limit(self, qtbot):
+        displayed = []
+        throttle = gutils.DisplayThrottle(displayed.append, max_fps=0)
+        for ind in range(10):
+            throttle.submit(ind)
+        assert displayed == list(range(10))
+        assert throttle.Ndropped == 0
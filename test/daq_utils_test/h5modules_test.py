@@ -10,7 +10,9 @@ from pyqtgraph.parametertree import parameterTypes, Parameter
 from pymodaq.daq_utils import custom_parameter_tree as ctree
 from pymodaq.daq_utils.h5modules import H5Saver, H5Backend, H5BrowserUtil, H5Browser, save_types, group_types, \
     group_data_types, data_types, data_dimensions, scan_types, InvalidGroupType, InvalidDataDimension, InvalidDataType, \
-    InvalidGroupDataType, InvalidSave, InvalidScanType, CARRAY, EARRAY, VLARRAY, StringARRAY, Node, Attributes
+    InvalidGroupDataType, InvalidSave, InvalidScanType, CARRAY, EARRAY, VLARRAY, StringARRAY, Node, Attributes, \
+    get_chunk_shape, H5Writer, H5WriterError
+from pymodaq.daq_utils.plotting.viewerND.signal_manager import LazyArray, Signal
 import csv
 
 tested_backend = ['tables', 'h5py', 'h5pyd']
@@ -230,6 +232,30 @@ class TestH5Backend:
         array1 = bck.create_carray(g1, 'carray1', obj=array_data)
         assert np.all(array1.read() == pytest.approx(array_data))
 
+    def test_carray_lazy(self, get_backend):
+        bck = get_backend
+        g1 = bck.get_set_group(bck.root(), 'g1')
+        shape = (4, 3, 10, 12)
+        chunk_shape = get_chunk_shape(shape[:2], shape[2:], np.float64, min_chunk_size=0)
+        assert chunk_shape == (1, 1, 10, 12)
+        array = bck.create_carray(g1, 'carray', shape=shape, dtype=np.float64, chunk_shape=chunk_shape)
+        assert array.attrs['CLASS'] == 'CARRAY'
+        assert array.attrs['dtype'] == 'float64'
+        utils.check_vals_in_iterable(array.attrs['shape'], shape)
+        utils.check_vals_in_iterable(array.chunk_shape, chunk_shape)
+        assert np.all(array.read() == 0.)
+        data = np.random.rand(*shape[2:])
+        array[2, 1] = data
+        assert np.all(array[2, 1] == pytest.approx(data))
+        assert np.all(array[2, 0] == 0.)
+        bck.close_file()
+
+    def test_get_chunk_shape(self):
+        assert get_chunk_shape([10, 20], [512, 512], np.float64) == (1, 1, 512, 512)
+        assert get_chunk_shape([10, 20], [1], np.float64, min_chunk_size=80) == (1, 10, 1)
+        assert get_chunk_shape([10, 5], [1], np.float64, min_chunk_size=80) == (1, 5, 1)
+        assert get_chunk_shape([], [10], np.float64) == (10,)
+
     def test_earray(self, get_backend):
         bck = get_backend
         g1 = bck.get_set_group(bck.root(), 'g1')
@@ -256,6 +282,38 @@ class TestH5Backend:
         utils.check_vals_in_iterable(array1.attrs['shape'], expected_shape)
         bck.close_file()
 
+    def test_earray_buffer(self, get_backend):
+        bck = get_backend
+        g1 = bck.get_set_group(bck.root(), 'g1')
+        array_shape = (10, 3)
+        dtype = np.uint32
+        array = bck.create_earray(g1, 'array', dtype=dtype, data_shape=array_shape, buffer_size=4)
+        assert array.buffer_size == 4
+        datas = [generate_random_data(array_shape, dtype) for ind in range(6)]
+        for data in datas[:3]:
+            array.append(data)
+        assert array.array.shape[0] == 0  # still in the buffer
+        array.append(datas[3])
+        assert array.array.shape[0] == 4  # buffer full => committed
+        utils.check_vals_in_iterable(array.attrs['shape'], (4, *array_shape))
+        array.append(datas[4])
+        assert np.all(array[-1, :, :] == pytest.approx(datas[4]))  # reading commits the buffer
+        array.append(datas[5])
+        bck.flush()
+        assert np.all(array.read() == pytest.approx(np.array(datas)))
+        utils.check_vals_in_iterable(array.attrs['shape'], (6, *array_shape))
+
+        array.append_rows(np.array(datas[:2]))
+        utils.check_vals_in_iterable(array.attrs['shape'], (8, *array_shape))
+
+        array1 = bck.create_earray(g1, 'array1', dtype=dtype, buffer_size=100)
+        for ind in range(5):
+            array1.append(np.array([ind]))
+        bck.close_file()  # closing commits the buffers
+        bck.open_file(bck.file_path, 'r')
+        assert np.all(bck.get_node('/g1/array1').read() == np.arange(5))
+        bck.close_file()
+
     @pytest.mark.parametrize('compression', ['gzip', 'zlib'])
     @pytest.mark.parametrize('comp_level', list(range(0, 10, 3)))
     def test_earray_comp(self, get_backend, compression, comp_level):
@@ -464,6 +522,8 @@ class TestH5Saver:
         assert array.attrs['data_dimension'] == '2D'
         assert array.attrs['scan_type'] == 'scan1D'
         assert np.all(h5saver.read(array).shape == (len(nav_x_axis['data']), len(xaxis['data']), len(yaxis['data'])))
+        # small data: points along the scan dimension are grouped within a chunk
+        utils.check_vals_in_iterable(array.chunk_shape, (len(nav_x_axis['data']), len(xaxis['data']), len(yaxis['data'])))
         assert h5saver.is_node_in_group(CH_group1, 'X_axis')
         xnode = h5saver.get_node(CH_group1, 'X_axis')
         assert xnode.attrs['type'] == 'axis'
@@ -497,6 +557,144 @@ class TestH5Saver:
 
 
 
+class TestH5Writer:
+
+    def test_write(self, get_backend):
+        bck = get_backend
+        g1 = bck.get_set_group(bck.root(), 'g1')
+        shape = (20, 5)
+        carray = bck.create_carray(g1, 'carray', shape=shape, dtype=np.float64)
+        earray = bck.create_earray(g1, 'earray', dtype=np.float64)
+        writer = H5Writer(bck, queue_size=3, flush_points=4, flush_time=0.1)
+        writer.start()
+        datas = [np.random.rand(shape[1]) for ind in range(shape[0])]
+        for ind, data in enumerate(datas):
+            writer.put_point([(carray, (ind,), data), (earray, None, np.array([float(ind)]))])
+        writer.stop()
+        assert not writer.isRunning()
+        assert writer.Npoints_written == shape[0]
+        assert np.all(carray.read() == pytest.approx(np.array(datas)))
+        assert np.all(earray.read() == pytest.approx(np.arange(shape[0])))
+        utils.check_vals_in_iterable(earray.attrs['shape'], (shape[0],))
+        bck.close_file()
+
+    def test_reused_buffer(self, get_backend):
+        bck = get_backend
+        g1 = bck.get_set_group(bck.root(), 'g1')
+        carray = bck.create_carray(g1, 'carray', shape=(10, 5), dtype=np.float64)
+        writer = H5Writer(bck, queue_size=20)
+        buffer = np.zeros((5,))
+        for ind in range(10):  # all the points are queued before the thread starts writing
+            buffer[:] = ind
+            writer.put_point([(carray, (ind,), buffer)])
+        writer.start()
+        writer.stop()
+        assert np.all(carray.read() == np.repeat(np.arange(10.)[:, None], 5, axis=1))
+        bck.close_file()
+
+    def test_error(self, get_backend):
+        bck = get_backend
+        g1 = bck.get_set_group(bck.root(), 'g1')
+        carray = bck.create_carray(g1, 'carray', shape=(2, 5), dtype=np.float64)
+        writer = H5Writer(bck)
+        writer.start()
+        writer.put_point([(carray, (10,), np.zeros((5,)))])  # out of bounds index
+        with pytest.raises(H5WriterError):
+            writer.stop()
+        with pytest.raises(H5WriterError):
+            writer.put_point([(carray, (0,), np.zeros((5,)))])
+        bck.close_file()
+
+
+@pytest.mark.parametrize('backend', ['tables', 'h5py'])
+class TestLazyArray:
+    def create_file(self, tmp_path, backend, data):
+        bck = H5Backend(backend)
+        bck.open_file(tmp_path.joinpath('h5file.h5'), 'w')
+        group = bck.get_set_group(bck.root(), 'Agroup')
+        carray = bck.create_carray(group, 'Data', obj=data, chunk_shape=(1, 1, 3, 6))
+        carray.attrs['type'] = 'data'
+        carray.attrs['data_dimension'] = '2D'
+        bck.close_file()
+        return tmp_path.joinpath('h5file.h5')
+
+    def test_slicing(self, tmp_path, backend):
+        data = np.random.rand(4, 1, 5, 6)
+        bck = H5Backend(backend)
+        bck.open_file(self.create_file(tmp_path, backend, data), 'r')
+        lazy = LazyArray(bck.get_node('/Agroup/Data'))
+        squeezed = np.squeeze(data)
+        assert lazy.shape == (4, 5, 6) and lazy.ndim == 3 and lazy.size == squeezed.size
+        assert lazy.chunk_shape == (1, 3, 6)
+        for item in [(1,), (slice(1, 3), 2), (Ellipsis, 4), (-1, slice(None, None, -2), slice(1, 5, 2)), 2]:
+            assert np.all(lazy[item] == squeezed[item])
+        transposed = lazy.transpose((2, 0, 1))
+        assert transposed.shape == (6, 4, 5)
+        assert np.all(transposed[1:4, 2] == squeezed.transpose((2, 0, 1))[1:4, 2])
+        assert np.all(np.asarray(lazy.transpose()) == squeezed.T)
+        with pytest.raises(IndexError):
+            lazy[4]
+        bck.close_file()
+
+    def test_signal(self, tmp_path, backend):
+        data = np.random.rand(4, 1, 5, 6)
+        bck = H5Backend(backend)
+        bck.open_file(self.create_file(tmp_path, backend, data), 'r')
+        squeezed = np.squeeze(data)
+        signal = Signal(LazyArray(bck.get_node('/Agroup/Data')))
+        signal = signal.transpose(signal_axes=[0, 1], navigation_axes=[2])
+        assert isinstance(signal.data, LazyArray)
+        assert np.all(signal.inav[3].data == squeezed[3])
+        assert np.all(signal.isig[2, 1:3].sum((-1)).data == pytest.approx(squeezed[:, 1:3, 2].sum(-1)))
+        bck.close_file()
+
+    @pytest.mark.parametrize('function', [np.sum, np.mean, np.max, np.min, np.std, np.var])
+    def test_reduce(self, tmp_path, backend, function):
+        data = np.random.rand(4, 1, 5, 6)
+        bck = H5Backend(backend)
+        bck.open_file(self.create_file(tmp_path, backend, data), 'r')
+        lazy = LazyArray(bck.get_node('/Agroup/Data'))
+        squeezed = np.squeeze(data)
+        max_memory = 2 * 5 * 6 * 8  # blocks of two rows
+        assert len(list(lazy.iter_blocks(0, max_memory))) == 2
+        for axis in [None, 0, 2, (1, 2), (0, 2)]:
+            assert np.allclose(lazy.reduce(function, axis, max_memory=max_memory), function(squeezed, axis=axis))
+        assert np.allclose(lazy.transpose((2, 0, 1)).reduce(function, (1, 2), max_memory),
+                           function(squeezed, axis=(0, 1)))
+        bck.close_file()
+
+    def test_signal_store(self, tmp_path, backend):
+        data = np.random.rand(4, 1, 5, 6)
+        bck = H5Backend(backend)
+        bck.open_file(self.create_file(tmp_path, backend, data), 'r')
+        signal = Signal(bck.get_node('/Agroup/Data').array)
+        assert isinstance(signal.data, LazyArray)
+        signal = signal.transpose(signal_axes=[0, 1], navigation_axes=[2, 3])
+        assert np.allclose(signal.isig[2:4, 1:3].sum((-1, -2)).data, data[:, :, 1:3, 2:4].sum((-1, -2)))
+        assert np.allclose(signal.std((-1, -2)).data, data.std((-1, -2)))
+        bck.close_file()
+
+        memmap = np.memmap(tmp_path.joinpath('memmap.dat'), dtype=np.float64, mode='w+', shape=data.shape)
+        memmap[:] = data
+        signal = Signal(memmap)
+        assert isinstance(signal.data, LazyArray)
+        assert np.allclose(signal.mean((0, 1)).data, Signal(data).mean((0, 1)).data)
+
+    def test_get_h5_data(self, tmp_path, backend):
+        data = np.random.rand(4, 1, 5, 6)
+        h5utils = H5BrowserUtil(backend)
+        h5utils.open_file(self.create_file(tmp_path, backend, data), 'r')
+        lazy, axes, nav_axes, is_spread = h5utils.get_h5_data('/Agroup/Data', lazy=True)
+        assert isinstance(lazy, LazyArray)
+        assert '/Agroup/Data' in h5utils._axes_cache
+        loaded, axes_loaded, nav_axes, is_spread = h5utils.get_h5_data('/Agroup/Data')
+        assert isinstance(loaded, np.ndarray)
+        assert np.all(loaded == np.asarray(lazy))
+        assert axes_loaded.keys() == axes.keys()
+        h5utils.close_file()
+        assert h5utils._axes_cache == dict([])
+
+
 @pytest.fixture(params=tested_backend)
 def create_test_file(request, qtbot):
     bck = H5Saver(backend=request.param)
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from scipy.spatial import Delaunay
+from pymodaq.daq_utils.plotting.plot_utils import MinMaxDecimator, IncrementalTriangulation, makeAlphaTriangles
+from pymodaq.daq_utils.plotting.graph_items import TriangulationItem
+
+
+class TestMinMaxDecimator:
+    def test_not_decimated(self):
+        decimator = MinMaxDecimator(min_points=100)
+        x = np.linspace(0, 1, 100)
+        y = np.random.rand(100)
+        decimator.set_data(x, y)
+        assert decimator.decimate(0, 1, 10)[1] is y
+        x = np.random.rand(1000)
+        decimator.set_data(x, np.random.rand(1000))
+        assert not decimator.decimable
+        assert decimator.decimate(0, 1, 10)[0] is x
+
+    def test_full_range(self):
+        Npts = 1000000
+        x = np.linspace(-5, 5, Npts)
+        y = np.random.normal(0, 1, Npts)
+        y[123457] = 100
+        y[765431] = -100
+        decimator = MinMaxDecimator()
+        decimator.set_data(x, y)
+        x_display, y_display = decimator.decimate(-np.inf, np.inf, 1000)
+        assert 1000 <= len(y_display) <= 4000
+        assert np.max(y_display) == 100 and np.min(y_display) == -100
+        assert x_display[0] == x[0] and x_display[-1] == x[-1]
+        assert np.all(np.diff(x_display) >= 0)
+        assert decimator.decimate(-np.inf, np.inf, 1000)[1] is y_display  # cached
+
+    def test_view_range(self):
+        Npts = 1000000
+        x = np.arange(Npts, dtype=float)
+        y = np.random.rand(Npts)
+        decimator = MinMaxDecimator()
+        decimator.set_data(x, y)
+        x_display, y_display = decimator.decimate(500000, 600000, 500)
+        visible = (x_display >= 500000) & (x_display <= 600000)
+        assert 500 <= np.count_nonzero(visible) <= 2000
+        assert x_display[0] == 0 and x_display[-1] == Npts - 1
+        assert np.min(y_display) == np.min(y) and np.max(y_display) == np.max(y)
+        assert np.all(np.diff(x_display) >= 0)
+
+        x_display, y_display = decimator.decimate(1000, 1100, 500)  # less samples than pixels: raw samples
+        ind_start = np.argmax(x_display == 999)
+        assert np.all(y_display[ind_start:ind_start + 103] == y[999:1102])
+
+
+def sorted_simplices(simplices):
+    simplices = np.sort(simplices, axis=1)
+    return simplices[np.lexsort(simplices.T[::-1])]
+
+
+class TestIncrementalTriangulation:
+    def test_set_points(self):
+        points = np.random.RandomState(0).rand(300, 2)
+        triangulator = IncrementalTriangulation()
+        tri = triangulator.set_points(points[:100])
+        assert triangulator.set_points(points[:100]) is tri
+        for Npts in (101, 180, 300):
+            assert triangulator.set_points(points[:Npts]) is tri
+            assert tri.npoints == Npts
+            assert np.all(sorted_simplices(tri.simplices) == sorted_simplices(Delaunay(points[:Npts]).simplices))
+        assert triangulator.Nrebuilds == 1
+        triangulator.set_points(points[:50])
+        assert triangulator.Nrebuilds == 2 and triangulator.triangulation.npoints == 50
+
+    def test_polygons(self, qtbot):
+        points = np.random.RandomState(0).rand(200, 2)
+        triangulator = IncrementalTriangulation()
+        triangulator.set_points(points[:150])
+        polygons = dict(zip(triangulator.simplices_keys(), triangulator.polygons()))
+        tri = triangulator.set_points(points)
+        new_polygons = triangulator.polygons()
+        assert len(new_polygons) == len(tri.simplices)
+        kept = 0
+        for key, polygon, simplex in zip(triangulator.simplices_keys(), new_polygons, tri.simplices):
+            assert np.allclose([(pt.x(), pt.y()) for pt in polygon][:3], tri.points[simplex])
+            if key in polygons:
+                assert polygon is polygons[key]
+                kept += 1
+        assert 0 < kept < len(new_polygons)
+
+    def test_make_alpha_triangles(self):
+        data = np.random.RandomState(0).rand(50, 3)
+        tri, tri_data, rgba, alpha = makeAlphaTriangles(data, levels=[0, 1])
+        assert np.allclose(tri_data, [np.mean(data[simplex, 2]) for simplex in tri.simplices])
+        assert rgba.shape == (len(tri.simplices), 4)
+        tri_inc = IncrementalTriangulation().set_points(data)
+        assert makeAlphaTriangles(data, levels=[0, 1], tri=tri_inc)[0] is tri_inc
+        indexes = np.array([3, 0, 7])
+        tri, tri_data_subset, rgba_subset, alpha = makeAlphaTriangles(data, levels=[0, 1], simplices=indexes)
+        assert np.allclose(tri_data_subset, tri_data[indexes])
+        assert np.all(rgba_subset == rgba[indexes])
+
+    def test_triangulation_item(self, qtbot):
+        data = np.random.RandomState(0).rand(300, 3)
+        item = TriangulationItem()
+        item.setImage(data[:200], levels=[0, 1])
+        item.render()
+        assert len(item.pictures) == 1
+        for Npts in (201, 202, 210):
+            item.setImage(data[:Npts], levels=[0, 1])
+            item.render()
+        assert len(item.pictures) == 4  # only the new triangles are recorded
+        assert np.allclose(item.tri_data, [np.mean(data[simplex, 2]) for simplex in item.triangulation.simplices])
+        item.setImage(data[:211], levels=[0, 0.5])  # new colors of all the triangles
+        item.render()
+        assert len(item.pictures) == 1
+        item.setImage(data[:300], levels=[0, 0.5])
+        item.render()
+        assert len(item.pictures) == 2
+        item.setImage(data[:300], levels=[0, 0.5])  # too many triangles drawn on top of the first picture
+        item.render()
+        assert len(item.pictures) == 1
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from PyQt5.QtCore import QPointF
+from pyqtgraph import ROI as pgROI
+from pymodaq.daq_utils.managers import roi_manager as rm
+
+
+def contains_qt(roi, xs, ys):
+    """reference implementation: map each point in the ROI coordinates and use its QPainterPath"""
+    return np.array([roi.shape().contains(roi.mapFromParent(QPointF(x, y))) for x, y in zip(xs, ys)], dtype=bool)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.RandomState(0)
+    return rng.uniform(-20, 20, 2000), rng.uniform(-20, 20, 2000)
+
+
+class TestROIContainsPoints:
+    @pytest.mark.parametrize('roi_class', [rm.RectROI, rm.EllipseROI])
+    @pytest.mark.parametrize('angle', [0, 30, -110])
+    def test_closed_form(self, qtbot, points, roi_class, angle):
+        xs, ys = points
+        roi = roi_class(pos=[-3.3, 2.1], size=[12.7, 6.4])
+        roi.setAngle(angle)
+        inside = rm.roi_contains_points(roi, xs, ys)
+        assert np.any(inside)
+        assert np.all(inside == contains_qt(roi, xs, ys))
+
+    def test_polygon_fallback(self, qtbot, points):
+        xs, ys = points
+        roi = pgROI(pos=[-5, -2], size=[10, 15])
+        roi.setAngle(45)
+        assert not hasattr(roi, 'contains_local_points')
+        assert np.all(rm.roi_contains_points(roi, xs, ys) == contains_qt(roi, xs, ys))
+
+    def test_points_in_polygon(self):
+        triangle = np.array([[0, 0], [4, 0], [0, 4]])
+        xs = np.array([1, 3, 5, -1, 1.5])
+        ys = np.array([1, 3, 0, 1, 2])
+        assert np.all(rm.points_in_polygon(xs, ys, triangle) == [True, False, False, False, True])
+        assert not np.any(rm.points_in_polygon(xs, ys, triangle[:2]))
+
+
+class TestPointsGrid:
+    def test_indexes_in_bounds(self, qtbot, points):
+        xs, ys = points
+        grid = rm.PointsGrid(xs, ys)
+        assert grid.has_points(xs, ys)
+        assert not grid.has_points(xs[:-1], ys[:-1])
+        roi = rm.EllipseROI(pos=[2, 3], size=[6, 8])
+        roi.setAngle(20)
+        indexes = grid.indexes_in_bounds(*rm.roi_parent_bounds(roi))
+        assert np.all(np.diff(indexes) > 0)
+        assert len(indexes) < len(xs) / 4
+        inside = rm.roi_contains_points(roi, xs, ys)
+        assert np.all(np.isin(np.nonzero(inside)[0], indexes))
+
+    def test_out_of_bounds(self, points):
+        xs, ys = points
+        grid = rm.PointsGrid(xs, ys)
+        assert len(grid.indexes_in_bounds(30, 40, 0, 10)) == 0
+        assert len(grid.indexes_in_bounds(-100, 100, -100, 100)) == len(xs)
+        assert len(rm.PointsGrid(np.array([]), np.array([])).indexes_in_bounds(0, 1, 0, 1)) == 0
+
+
+class TestROIArrayRegion:
+    @pytest.mark.parametrize('axis_order', ['col-major', 'row-major'])
+    @pytest.mark.parametrize('roi_class', [rm.RectROI, rm.EllipseROI])
+    def test_same_as_array_region(self, qtbot, roi_class, axis_order):
+        from pymodaq.daq_utils.plotting.graph_items import ImageItem
+        data = np.random.rand(40, 60)
+        img = ImageItem()
+        img.setOpts(axisOrder=axis_order)
+        img.setImage(data)
+        roi = roi_class(pos=[7, 5], size=[12, 9])
+        (slice0, slice1), mask = rm.roi_array_region(roi, data.shape, axis_order)
+        region = data[slice0, slice1] if mask is None else data[slice0, slice1] * mask
+        array_region, coords = roi.getArrayRegion(data, img, (0, 1), returnMappedCoords=True)
+        assert region.shape == array_region.shape
+        assert np.allclose(region, array_region)
+        assert np.allclose(np.arange(slice0.start, slice0.stop), coords[0, :, 0])
+        assert np.allclose(np.arange(slice1.start, slice1.stop), coords[1, 0, :])
+
+    def test_default_col_major(self, qtbot):
+        roi = rm.RectROI(pos=[7, 5], size=[12, 9])
+        assert rm.roi_array_region(roi, (40, 60))[0] == (slice(7, 19), slice(5, 14))
+        assert rm.roi_array_region(roi, (40, 60), 'row-major')[0] == (slice(5, 14), slice(7, 19))
+
+    def test_clipping(self, qtbot):
+        roi = rm.EllipseROI(pos=[35, -4], size=[10, 10])
+        (slice0, slice1), mask = rm.roi_array_region(roi, (40, 60))
+        assert (slice0, slice1) == (slice(35, 40), slice(0, 6))
+        assert np.all(mask == roi.region_mask(10, 10)[:5, 4:])
+        roi.setPos([100, 100])
+        (slice0, slice1), mask = rm.roi_array_region(roi, (40, 60))
+        assert np.zeros((40, 60))[slice0, slice1].size == 0 and mask.size == 0
+
+    def test_rotated(self, qtbot):
+        roi = rm.RectROI(pos=[0, 0], size=[10, 10])
+        assert rm.roi_array_region(roi, (40, 60))[1] is None
+        roi.setAngle(10)
+        assert rm.roi_array_region(roi, (40, 60)) is None
@@ -3,6 +3,140 @@ import pytest
 
 import pymodaq.daq_utils
 from pymodaq.daq_utils import scanner
+from pymodaq.daq_utils import daq_utils as utils
+
+
+# former pure python implementations, used as references for the vectorized ones
+
+def legacy_get_info_from_positions(positions):
+    if len(positions.shape) == 1:
+        positions = np.expand_dims(positions, 1)
+    axes_unique = []
+    for ax in positions.T:
+        axes_unique.append(np.unique(ax))
+    axes_indexes = np.zeros_like(positions, dtype=np.int)
+    for ind in range(positions.shape[0]):
+        for ind_pos, pos in enumerate(positions[ind]):
+            axes_indexes[ind, ind_pos] = utils.find_index(axes_unique[ind_pos], pos)[0][0]
+    return axes_unique, axes_indexes
+
+
+def legacy_set_scan_linear(starts, stops, steps, back_and_force=False, oversteps=10000):
+    starts = np.array(starts)
+    stops = np.array(stops)
+    steps = np.array(steps)
+
+    if np.any(np.abs(steps) < 1e-12) or \
+            np.any(np.sign(stops - starts) != np.sign(steps)) or \
+            np.any(starts == stops):
+        return np.array([starts])
+
+    else:
+        axis_1_unique = utils.linspace_step(starts[0], stops[0], steps[0])
+        len1 = len(axis_1_unique)
+
+        axis_2_unique = utils.linspace_step(starts[1], stops[1], steps[1])
+        len2 = len(axis_2_unique)
+        if len1 * len2 > oversteps:
+            axis_1_unique = axis_1_unique[:int(np.ceil(np.sqrt(oversteps * len1 / len2)))]
+            axis_2_unique = axis_2_unique[:int(np.ceil(np.sqrt(oversteps * len2 / len1)))]
+
+        positions = []
+        for ind_x, pos1 in enumerate(axis_1_unique):
+            if back_and_force:
+                for ind_y, pos2 in enumerate(axis_2_unique):
+                    if not utils.odd_even(ind_x):
+                        positions.append([pos1, pos2])
+                    else:
+                        positions.append([pos1, axis_2_unique[len(axis_2_unique) - ind_y - 1]])
+            else:
+                for ind_y, pos2 in enumerate(axis_2_unique):
+                    positions.append([pos1, pos2])
+
+        return np.array(positions)
+
+
+def legacy_set_scan_spiral(starts, rmaxs, rsteps, nsteps=None, oversteps=10000):
+    if np.isscalar(rmaxs):
+        rmaxs = np.ones(starts.shape) * rmaxs
+    else:
+        rmaxs = np.array(rmaxs)
+    if np.isscalar(rsteps):
+        rsteps = np.ones(starts.shape) * rsteps
+    else:
+        rsteps = np.array(rsteps)
+
+    starts = np.array(starts)
+
+    if nsteps is not None:
+        rmaxs = np.rint(nsteps / 2) * rsteps
+
+    if np.any(np.array(rmaxs) == 0) or np.any(np.abs(rmaxs) < 1e-12) or np.any(np.abs(rsteps) < 1e-12):
+        positions = np.array([starts])
+        return positions
+
+    ind = 0
+    flag = True
+    oversteps = utils.greater2n(oversteps)
+
+    Nlin = np.trunc(rmaxs / rsteps)
+    Nlin = Nlin[0]
+
+    axis_1_indexes = [0]
+    axis_2_indexes = [0]
+    while flag:
+        if utils.odd_even(ind):
+            step = 1
+        else:
+            step = -1
+        if flag:
+            for ind_step in range(ind):
+                axis_1_indexes.append(axis_1_indexes[-1] + step)
+                axis_2_indexes.append(axis_2_indexes[-1])
+                if len(axis_1_indexes) >= (2 * Nlin + 1) ** 2 or len(axis_1_indexes) >= oversteps:
+                    flag = False
+                    break
+        if flag:
+            for ind_step in range(ind):
+                axis_1_indexes.append(axis_1_indexes[-1])
+                axis_2_indexes.append(axis_2_indexes[-1] + step)
+                if len(axis_1_indexes) >= (2 * Nlin + 1) ** 2 or len(axis_1_indexes) >= oversteps:
+                    flag = False
+                    break
+        ind += 1
+
+    positions = []
+    for ind in range(len(axis_1_indexes)):
+        positions.append(np.array([axis_1_indexes[ind] * rsteps[0] + starts[0],
+                                   axis_2_indexes[ind] * rsteps[1] + starts[1]]))
+
+    return np.array(positions)
+
+
+def legacy_set_scan_sequential(starts, stops, steps):
+    all_positions = [starts[:]]
+    positions = starts[:]
+    state = scanner.pos_above_stops(positions, steps, stops)
+    while not state[0]:
+        if not np.any(np.array(state)):
+            positions[-1] += steps[-1]
+
+        else:
+            indexes_true = np.where(np.array(state))
+            positions[indexes_true[-1][0]] = starts[indexes_true[-1][0]]
+            positions[indexes_true[-1][0]-1] += steps[indexes_true[-1][0]-1]
+
+        state = scanner.pos_above_stops(positions, steps, stops)
+        if not np.any(np.array(state)):
+            all_positions.append(positions[:])
+
+    return np.array(all_positions)
+
+
+def assert_identical(positions, legacy_positions):
+    assert positions.dtype == legacy_positions.dtype
+    assert positions.shape == legacy_positions.shape
+    assert positions.tobytes() == legacy_positions.tobytes()  # bit identical
 
 class TestScans:
 
@@ -71,3 +205,143 @@ class TestScans:
         assert positions_r.shape == positions.shape
         for pos in positions_r:
             assert pos in positions
+
+
+class TestLegacyScans:
+    @pytest.mark.parametrize('back_and_force', [False, True])
+    @pytest.mark.parametrize('starts, stops, steps, oversteps', [
+        ([0, 0], [1, -21], [0.1, -0.3], 10000),
+        ([0, 0], [1, -21], [0.01, -0.03], 10000),
+        ([0, 0], [1, -21], [0.01, -0.03], 1000),
+        ([-0.37, 5.1], [1.22, 21.3], [0.013, 0.7], 10000),
+        ([0, 0], [1, 21], [0., 0.3], 10000),
+        ([0, 0], [0, 21], [0.1, 0.3], 10000),
+    ])
+    def test_set_scan_linear(self, starts, stops, steps, oversteps, back_and_force):
+        assert_identical(scanner.set_scan_linear(starts, stops, steps, back_and_force, oversteps),
+                         legacy_set_scan_linear(starts, stops, steps, back_and_force, oversteps))
+
+    @pytest.mark.parametrize('starts, rmaxs, rsteps, nsteps, oversteps', [
+        (np.array([10.1, -5.87]), None, np.array([0.12, 1]), 10, 10000),
+        (np.array([10.1, -5.87]), None, np.array([0.12, 1]), 11, 10000),
+        (np.array([0.3, 0.7]), np.array([1.3, 2.6]), np.array([0.1, 0.2]), None, 10000),
+        (np.array([0.3, 0.7]), np.array([1.3, 2.6]), np.array([0.1, 0.2]), None, 100),
+        (np.array([0., 0.]), np.array([0.05, 0.05]), np.array([0.1, 0.1]), None, 10000),
+        (np.array([0., 0.]), np.array([0, 0.05]), np.array([0.1, 0.1]), None, 10000),
+        (np.array([0, 0]), np.array([100, 100]), np.array([1, 1]), None, 10000),
+    ])
+    def test_set_scan_spiral(self, starts, rmaxs, rsteps, nsteps, oversteps):
+        assert_identical(scanner.set_scan_spiral(starts, rmaxs, rsteps, nsteps, oversteps),
+                         legacy_set_scan_spiral(starts, rmaxs, rsteps, nsteps, oversteps))
+
+    @pytest.mark.parametrize('starts, stops, steps', [
+        ([0., 0., 0.], [1., 2., 3.], [0.1, 0.3, 0.7]),
+        ([0.1, -2.], [-0.5, 0.33], [-0.1, 0.11]),
+        ([0., 1.], [1., 1.], [0.25, 0.1]),
+        ([0, 0], [3, 4], [1, 2]),
+        ([0.5], [0.9], [0.1]),
+        ([0., 5.], [1., 2.], [0.1, 0.3]),
+        ([2., 0.], [1., 2.], [0.1, 0.3]),
+    ])
+    def test_set_scan_sequential(self, starts, stops, steps):
+        assert_identical(scanner.set_scan_sequential(starts[:], stops, steps),
+                         legacy_set_scan_sequential(starts[:], stops, steps))
+
+    def test_get_info_from_positions(self):
+        scan_param = scanner.ScanParameters(starts=[0.], stops=[1.], steps=[0.1])
+        positions = scanner.set_scan_spiral(np.array([0.3, 0.7]), np.array([1.3, 2.6]), np.array([0.1, 0.2]))
+        np.random.shuffle(positions)
+        info = scan_param.get_info_from_positions(positions)
+        axes_unique, axes_indexes = legacy_get_info_from_positions(positions)
+        assert_identical(info.axes_indexes, axes_indexes)
+        for ax_unique, legacy_ax_unique in zip(info.axes_unique, axes_unique):
+            assert_identical(ax_unique, legacy_ax_unique)
+
+
+class TestScanParameters:
+    def test_get_info_from_positions(self):
+        scan_param = scanner.ScanParameters(starts=[0.], stops=[1.], steps=[0.1])
+        positions = np.array([[0.5, -1], [0.1, 2], [0.5, 2], [-3., -1], [0.1, 0.]])
+        info = scan_param.get_info_from_positions(positions)
+        assert info.Nsteps == 5
+        assert np.all(info.axes_unique[0] == np.array([-3., 0.1, 0.5]))
+        assert np.all(info.axes_unique[1] == np.array([-1., 0., 2.]))
+        assert np.all(info.axes_indexes == np.array([[2, 0], [1, 2], [2, 2], [0, 0], [1, 1]]))
+        for ind_ax in range(2):
+            assert np.all(info.axes_unique[ind_ax][info.axes_indexes[:, ind_ax]] == positions[:, ind_ax])
+
+        info = scan_param.get_info_from_positions(np.array([0.2, 0.1, 0.2]))
+        assert info.positions.shape == (3, 1)
+        assert np.all(info.axes_indexes[:, 0] == np.array([1, 0, 1]))
+
+
+class TestScanPlan:
+    def test_plan(self):
+        positions = np.array([[0.5, -1], [0.1, 2], [0.5, 2], [-3., -1], [0.1, 0.]])
+        plan = scanner.ScanPlan(positions, chunk_size=2)
+        assert not plan.is_lazy
+        assert plan.Nsteps == len(plan) == 5
+        assert plan.Naxes == 2
+        assert np.all(plan.axes_indexes == np.array([[2, 0], [1, 2], [2, 2], [0, 0], [1, 1]]))
+        for ind, pos, indexes in plan:
+            assert np.all(pos == positions[ind])
+            assert np.all(plan.get_position(ind) == positions[ind])
+            assert np.all(indexes == plan.axes_indexes[ind])
+            assert np.all(plan.get_indexes(ind) == indexes)
+        assert [start for start, pos, indexes in plan.iter_chunks()] == [0, 2, 4]
+        assert np.all(plan.get_axis_positions(1) == positions[:, 1])
+        assert np.all(plan.get_scan_positions(0, step=2) == positions[0::2, 0])
+        with pytest.raises(IndexError):
+            plan.get_position(5)
+
+    @pytest.mark.parametrize('back_and_forth', [False, True])
+    def test_grid_plan(self, back_and_forth):
+        axes = [np.linspace(0, 1, 7), np.linspace(2, -1, 5), np.array([0.3, 0.1])]
+        plan = scanner.GridScanPlan(axes, back_and_forth=back_and_forth, chunk_size=4)
+        assert plan.is_lazy
+        assert plan.Nsteps == 7 * 5 * 2
+        for axis_unique, axis in zip(plan.axes_unique, axes):
+            assert np.all(axis_unique == np.sort(axis))
+        assert plan._positions is None  # nothing computed yet
+
+        positions = []
+        for ind, pos, indexes in plan:
+            positions.append(pos)
+            for ind_ax in range(3):
+                assert plan.axes_unique[ind_ax][indexes[ind_ax]] == pos[ind_ax]
+            assert np.all(plan.get_position(ind) == pos)
+        assert plan._positions is None
+        assert np.all(np.array(positions) == plan.positions)
+
+        reference = scanner.ScanPlan(plan.positions)
+        assert np.all(reference.axes_indexes == plan.axes_indexes)
+        assert np.all(plan.get_axis_positions(1) == plan.axes_unique[1])
+        for ind_ax in range(3):
+            assert np.all(plan.get_scan_positions(ind_ax) == reference.get_scan_positions(ind_ax))
+            assert np.all(plan.get_scan_positions(ind_ax, step=3) == reference.get_scan_positions(ind_ax, step=3))
+
+    def test_grid_plan_back_and_forth(self):
+        plan = scanner.GridScanPlan([np.array([0., 1., 2.]), np.array([10., 20.])], back_and_forth=True)
+        assert np.all(plan.positions == np.array([[0., 10.], [0., 20.], [1., 20.], [1., 10.], [2., 10.], [2., 20.]]))
+
+    def test_large_scan(self):
+        scan_param = scanner.ScanParameters(Naxes=2, scan_type='Scan2D', scan_subtype='Linear',
+                                            starts=[0., 0.], stops=[2999., 2999.], steps=[1., 1.])
+        assert scan_param.Nsteps == 3000 ** 2  # no oversteps limit
+        assert scan_param.plan.is_lazy
+        assert np.all(scan_param.plan.get_position(3000 ** 2 - 1) == np.array([2999., 2999.]))
+        assert np.all(scan_param.plan.get_indexes(3001) == np.array([1, 1]))
+        assert scan_param.plan._positions is None
+
+    def test_scan_parameters(self):
+        starts, stops, steps = [0., 0.], [1., -21.], [0.1, -0.3]
+        scan_param = scanner.ScanParameters(Naxes=2, scan_type='Scan2D', scan_subtype='Back&Forth',
+                                            starts=starts, stops=stops, steps=steps)
+        assert_identical(scan_param.positions, scanner.set_scan_linear(starts, stops, steps, True, oversteps=None))
+
+        starts, stops, steps = [0., 0., 0.], [1., 2., 3.], [0.1, 0.3, 0.7]
+        scan_param = scanner.ScanParameters(Naxes=3, scan_type='Sequential', scan_subtype='Linear',
+                                            starts=starts, stops=stops, steps=steps)
+        assert_identical(scan_param.positions, legacy_set_scan_sequential(starts[:], stops, steps))
+        info = scan_param.get_info_from_positions(scan_param.positions)
+        assert_identical(scan_param.axes_indexes, info.axes_indexes)
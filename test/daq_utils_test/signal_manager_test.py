@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from pymodaq.daq_utils.plotting.viewerND.signal_manager import Signal, IntegralCache, LazyArray
+
+
+@pytest.fixture
+def data():
+    return np.random.RandomState(0).rand(6, 7, 20, 15)
+
+
+class TestIntegralCache:
+    @pytest.mark.parametrize('slices', [slice(None), slice(3, 11), slice(2.2, 8.7), slice(-5, None)])
+    def test_integrate_1D(self, data, slices):
+        cache = IntegralCache()
+        signal = Signal(data).transpose(signal_axes=[0], navigation_axes=[1, 2, 3])
+        assert np.allclose(cache.integrate('key', signal, slices), signal.isig[slices].sum((-1)).data)
+        assert np.allclose(cache.integrate('key', signal, slices, average=True), signal.isig[slices].mean((-1)).data)
+        assert len(cache) == 1
+
+    @pytest.mark.parametrize('slices', [(slice(None), slice(None)), (slice(2, 9), slice(4, 11)),
+                                        (slice(1.5, 4), slice(0, 3))])
+    def test_integrate_2D(self, data, slices):
+        cache = IntegralCache()
+        signal = Signal(data).transpose(signal_axes=[0, 1], navigation_axes=[2, 3])
+        assert np.allclose(cache.integrate('key', signal, slices), signal.isig[slices].sum((-1, -2)).data)
+
+    def test_integers(self):
+        data = np.random.RandomState(0).randint(0, 1000, (30, 40), dtype=np.int32)
+        signal = Signal(data).transpose(signal_axes=[0], navigation_axes=[1])
+        result = IntegralCache().integrate('key', signal, slice(5, 35))
+        assert result.dtype == np.int64
+        assert np.all(result == signal.isig[5:35].sum((-1)).data)
+
+    def test_lazy(self, data, tmp_path):
+        memmap = np.memmap(tmp_path.joinpath('memmap.dat'), dtype=np.float64, mode='w+', shape=data.shape)
+        memmap[:] = data
+        signal = Signal(LazyArray(memmap)).transpose(signal_axes=[0], navigation_axes=[1, 2, 3])
+        reference = Signal(data).transpose(signal_axes=[0], navigation_axes=[1, 2, 3])
+        cache = IntegralCache()
+        assert np.allclose(cache.integrate('key', signal, slice(2, 9)), reference.isig[2:9].sum((-1)).data)
+
+    def test_unsupported(self, data):
+        cache = IntegralCache()
+        signal = Signal(data).transpose(signal_axes=[0], navigation_axes=[1, 2, 3])
+        assert cache.integrate('key', signal, slice(8, 3)) is None
+        assert cache.integrate('key', signal, slice(0, 10, 2)) is None
+        assert len(cache) == 0
+
+    def test_lru(self, data):
+        signal = Signal(data).transpose(signal_axes=[0], navigation_axes=[1, 2, 3])
+        cumsum_size = 6 * 7 * 20 * 16 * 8
+        cache = IntegralCache(max_memory=2.5 * cumsum_size)
+        for key in ['a', 'b', 'a', 'c']:
+            cache.integrate(key, signal, slice(None))
+        assert 'b' not in cache and 'a' in cache and 'c' in cache
+        assert cache.memory == 2 * cumsum_size
+        cache.max_memory = cumsum_size / 2
+        cache.clear()
+        assert cache.integrate('a', signal, slice(3, 6)) is None
+        assert len(cache) == 0
+
+    def test_build_after(self, data):
+        signal = Signal(data).transpose(signal_axes=[0], navigation_axes=[1, 2, 3])
+        cache = IntegralCache(build_after=2)
+        assert cache.integrate('key', signal, slice(3, 6)) is None
+        assert cache.integrate('key', signal, slice(3, 6)) is None
+        assert np.allclose(cache.integrate('key', signal, slice(3, 6)), signal.isig[3:6].sum((-1)).data)
+        cache.clear()
+        assert cache.integrate('key', signal, slice(3, 6)) is None
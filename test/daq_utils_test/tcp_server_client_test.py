@@ -1,9 +1,11 @@
 import pytest
+import os
 import numpy as np
 import socket as native_socket
 from pymodaq.daq_utils import daq_utils as utils
 from PyQt5.QtCore import QThread, pyqtSignal, QObject
-from pymodaq.daq_utils.tcp_server_client import MockServer, TCPServer, TCPClient, Socket
+from pymodaq.daq_utils.tcp_server_client import MockServer, TCPServer, TCPClient, Socket, SharedMemoryRing, \
+    SharedMemorySlot, payload_codecs
 
 from pyqtgraph.parametertree import Parameter, ParameterTree
 import pyqtgraph.parametertree.parameterTypes as pTypes
@@ -65,6 +67,27 @@ class TestTCPIP:
         client.close()
         server.stop()
 
+    def test_check_received_length_closed(self):
+        string = 'this is a message'
+        server = SimpleServer(('127.0.0.1', 0), handle_fun=
+                                                lambda x: Socket(x).check_sended(string.encode()))
+        server.start()
+        client = Socket(socket.create_connection(('127.0.0.1', server.server_port)))
+        with pytest.raises(ConnectionError):
+            client.check_received_length(len(string.encode()) + 10)
+        client.close()
+        server.stop()
+
+    def test_check_sended_buffers(self):
+        buffers = [b'header', np.arange(10, dtype=np.uint16).reshape((2, 5)), b'', np.zeros((0, 3))]
+        server = SimpleServer(('127.0.0.1', 0), handle_fun=
+                                                lambda x: Socket(x).check_sended_buffers(buffers))
+        server.start()
+        client = Socket(socket.create_connection(('127.0.0.1', server.server_port)))
+        assert client.check_received_length(26) == b'header' + np.arange(10, dtype=np.uint16).tobytes()
+        client.close()
+        server.stop()
+
     def test_send_string(self):
         string = 'this is a message'
         server = SimpleServer(('127.0.0.1', 0), handle_fun=
@@ -178,6 +201,128 @@ class TestTCPIP:
         client.close()
         server.stop()
 
+    def test_get_large_array(self):
+        arrays = [np.random.rand(512, 1024, 2),
+                  np.asfortranarray(np.random.rand(128, 256)),
+                  np.arange(1000000, dtype=np.uint16)[::2],
+                  np.zeros((0, 4)),
+                  ]
+        server = SimpleServer(('127.0.0.1', 0), handle_fun=
+                              lambda x: [Socket(x).send_array(array) for array in arrays])
+        server.start()
+        client = Socket(socket.create_connection(('127.0.0.1', server.server_port)))
+        for array in arrays:
+            data = client.get_array()
+            assert data.shape == array.shape
+            assert data.dtype == array.dtype
+            assert np.all(data == array)
+        client.close()
+        server.stop()
+
+    @pytest.mark.parametrize('codec', list(payload_codecs.keys()))
+    @pytest.mark.parametrize('delta', [False, True])
+    def test_get_array_codecs(self, codec, delta):
+        frame = np.random.randint(0, 4096, (64, 128), dtype=np.uint16)
+        frames = [frame,
+                  frame + 1,
+                  np.linspace(0, 1, 100),
+                  frame + 2,
+                  np.zeros((0, 4)),
+                  np.asfortranarray(np.random.rand(12, 5)),
+                  ]
+        sender, receiver = [Socket(sock) for sock in native_socket.socketpair()]
+        sender.set_codec(codec, delta)
+        for array in frames:
+            sender.send_array(array)
+            data = receiver.get_array()
+            assert data.shape == array.shape
+            assert data.dtype == array.dtype
+            assert np.all(data == array)
+
+        sender.set_codec()  # back to the legacy format, readable by any receiver
+        sender.send_array(frame)
+        assert receiver.get_string() == frame.dtype.descr[0][1]
+        sender.close()
+        receiver.close()
+
+    def test_shared_memory(self):
+        frames = [np.random.rand(64, 32), np.arange(100, dtype=np.uint16), np.random.rand(256, 256),
+                  np.zeros((0, 4)), np.asfortranarray(np.random.rand(12, 5))]
+        listener = native_socket.socket(native_socket.AF_INET, native_socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        sender = Socket(native_socket.create_connection(listener.getsockname()))
+        receiver = Socket(listener.accept()[0])
+        listener.close()
+        assert sender.is_local()
+
+        sender.set_shared_memory(True, Nslots=2)
+        sender.send_array(frames[0])
+        with pytest.raises(IOError):  # not requested by the receiver
+            receiver.get_array()
+        receiver.allow_shared_memory()
+        for array in frames:
+            sender.send_array(array)
+            data = receiver.get_array()
+            assert data.shape == array.shape
+            assert data.dtype == array.dtype
+            assert np.all(data == array)
+        path = sender.shared_memory.path
+        assert os.path.isfile(path)
+
+        del data
+
+        # received arrays are read-only views on the shared memory, their slot being released once collected
+        sender.send_array(frames[0])
+        kept = receiver.get_array()[1:]
+        assert not kept.flags.writeable
+        base = kept.base
+        while isinstance(base, np.ndarray):
+            base = base.base
+        assert isinstance(base, SharedMemorySlot)
+        del base
+        # the slot of the kept array is not overwritten, the second and third arrays are sent within the payload
+        Nwritten = sender.shared_memory.Nwritten
+        for ind in range(3):
+            sender.send_array(frames[1] + ind)
+        assert sender.shared_memory.Nwritten == Nwritten + 1
+        for ind in range(3):
+            assert np.all(receiver.get_array() == frames[1] + ind)
+        assert np.all(kept == frames[0][1:])
+        assert int(sender.shared_memory._released[0]) == Nwritten - 1  # released in order only
+        del kept
+        assert int(sender.shared_memory._released[0]) == Nwritten + 1
+
+        sender.close()
+        receiver.close()
+        assert not os.path.isfile(path)
+
+    def test_shared_memory_location(self, tmp_path):
+        receiver = Socket()
+        receiver.allow_shared_memory()
+        for descriptor in [b'1:64', b'1:64:' + str(tmp_path.joinpath('pymodaq_file.shm')).encode(),
+                           b'1:64:' + os.path.join(SharedMemoryRing.shared_dir, 'not_pymodaq.shm').encode()]:
+            with pytest.raises(IOError):
+                receiver.decode_array('<f8;shm', descriptor, (1,))
+
+    def test_set_codec(self):
+        sock = Socket()
+        with pytest.raises(ValueError):
+            sock.set_codec('not_a_codec')
+
+        client = TCPClient()
+        client.socket = sock
+        client.get_data('set_codec;zlib;delta')
+        assert sock.codec == 'zlib'
+        assert sock.delta
+        client.get_data('set_codec;not_a_codec')
+        assert sock.codec == 'none'
+        assert not sock.delta
+        client.get_data('set_codec;none;shm:4')
+        assert sock.shared_memory.Nslots == 4
+        client.get_data('set_codec;none')
+        assert sock.shared_memory is None
+
     def test_send_list(self):
         listing = [np.random.rand(7, 2),
                     'Hello World',
@@ -339,6 +484,36 @@ class TestMockServer:
         server.read_info_xml(None, path, custom_tree.parameter_to_xml_string(one_param))
         assert server.settings.child('settings_client', 'infos').value() == 'another_info'
 
+    def test_listen_client(self, get_server, qtbot):
+        server = get_server()
+        server.socket_types = socket_types
+        server.message_list = ["Quit", "Done", "Info", "Infos", "Info_xml"]
+        server.settings.child(('socket_ip')).setValue('127.0.0.1')  # local host
+        server.settings.child(('port_id')).setValue(0)  # any free port
+        server.init_server()
+        port = server.serversocket.getsockname()[1]
+
+        server.settings.child(('codec')).setValue('zlib')
+        client = Socket(native_socket.create_connection(('127.0.0.1', port)))
+        client.send_string('GRABBER')
+        qtbot.waitUntil(lambda: server.find_socket_within_connected_clients('GRABBER') is not None, timeout=1000)
+        assert client.get_string() == 'set_codec;zlib'
+
+        # messages are processed as soon as received, without any polling period
+        client.send_string('Info')
+        client.send_string('an_info')
+        client.send_string('an info value')
+        qtbot.waitUntil(lambda: 'an_info' in custom_tree.iter_children(server.settings.child(('infos')), []),
+                        timeout=50)
+        assert server.settings.child('infos', 'an_info').value() == 'an info value'
+
+        client.close()
+        qtbot.waitUntil(lambda: server.find_socket_within_connected_clients('GRABBER') is None, timeout=1000)
+        assert len(server.notifiers) == 1
+
+        server.close_server()
+        assert len(server.notifiers) == 0
+
     #
 
 class ClientObjectManager(QObject):